@@ -0,0 +1,116 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Measures end to end throughput and tail latency of the Client against a
+FakeDeltaServer, either in process or over HTTP on a local port.
+
+Each operation creates a secret, reads it back and shares it with a second
+identity, for example::
+
+    python benchmarks/client_throughput.py --workers 32 --latency 0.02 \\
+        --sigma 0.5 --error-rate 0.01 --http
+"""
+
+from __future__ import division, print_function
+
+import argparse
+import time
+from multiprocessing.pool import ThreadPool
+
+from covata.delta import ApiClient, Client, FakeDeltaServer, InMemoryTransport
+from covata.delta import fakeserver
+from support import MemoryKeyStore
+
+
+def percentile(samples, p):
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def run(client, alice, bob, content, workers, total):
+    def operation(_):
+        start = time.time()
+        try:
+            secret = alice.create_secret(content)
+            secret.get_content()
+            secret.share_with(bob.id)
+            return time.time() - start, False
+        except Exception:
+            return time.time() - start, True
+
+    pool = ThreadPool(workers)
+    try:
+        start = time.time()
+        results = pool.map(operation, range(total))
+        elapsed = time.time() - start
+    finally:
+        pool.close()
+    latencies = sorted(latency for latency, _ in results)
+    errors = sum(1 for _, failed in results if failed)
+    return total / elapsed, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--operations", type=int, default=500)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--size", type=int, default=1024,
+                        help="secret size in bytes")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="median server latency in seconds")
+    parser.add_argument("--sigma", type=float, default=0.0,
+                        help="log-normal spread of the server latency")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="probability of an injected 503 per request")
+    parser.add_argument("--rate-limit", type=float, default=None,
+                        help="requests per second allowed per identity")
+    parser.add_argument("--http", action="store_true",
+                        help="send requests over HTTP instead of in process")
+    args = parser.parse_args()
+
+    latency = None
+    if args.latency > 0:
+        latency = fakeserver.lognormal(args.latency, args.sigma) \
+            if args.sigma > 0 else fakeserver.constant(args.latency)
+    server = FakeDeltaServer(latency=latency, rate_limit=args.rate_limit)
+    if args.error_rate > 0:
+        server.inject_error(503, probability=args.error_rate)
+
+    key_store = MemoryKeyStore()
+    if args.http:
+        api_client = ApiClient(key_store, base_url=server.start())
+    else:
+        api_client = ApiClient(key_store, InMemoryTransport(server.handle))
+    client = Client(dict(key_store=key_store, api_client=api_client))
+    alice = client.create_identity()
+    bob = client.create_identity()
+    content = b"x" * args.size
+
+    print("{:>8} {:>8} {:>8} {:>8} {:>8} {:>8}".format(
+        "workers", "ops/s", "p50 ms", "p99 ms", "max ms", "errors"))
+    try:
+        for workers in args.workers:
+            throughput, latencies, errors = run(
+                client, alice, bob, content, workers, args.operations)
+            print("{:>8} {:>8.1f} {:>8.1f} {:>8.1f} {:>8.1f} {:>8}".format(
+                workers, throughput,
+                percentile(latencies, 0.5) * 1000,
+                percentile(latencies, 0.99) * 1000,
+                latencies[-1] * 1000, errors))
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
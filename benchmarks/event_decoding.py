@@ -0,0 +1,101 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Measures the number of audit events decoded per second, building every
+field of each event with strptime as Client.get_events used to, and
+decoding events lazily, reading either a few fields or every field, and
+building NumPy columns of every field without any Event objects, for
+example::
+
+    python benchmarks/event_decoding.py --events 1000000
+"""
+
+from __future__ import division, print_function
+
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime
+
+from covata.delta import Event, EventDetails
+from covata.delta import columnar
+
+
+def responses(count):
+    owner = str(uuid.uuid4())
+    return json.loads(json.dumps([dict(
+        eventDetails=dict(baseSecretId=None, requesterId=owner,
+                          rsaKeyOwnerId=owner, secretId=str(uuid.uuid4()),
+                          secretOwnerId=owner),
+        host="delta.covata.io",
+        id=str(uuid.uuid4()),
+        sourceIp="202.54.112.42",
+        timestamp="2017-02-28T22:20:{:02d}.{:03d}Z".format(i % 60, i % 1000),
+        type="access_success_event") for i in range(count)]))
+
+
+def eager(event):
+    details = event["eventDetails"]
+    return Event(
+        event_details=EventDetails(
+            base_secret_id=details.get("baseSecretId"),
+            requestor_id=details.get("requesterId"),
+            rsa_key_owner_id=details.get("rsaKeyOwnerId"),
+            secret_id=details.get("secretId"),
+            secret_owner_id=details.get("secretOwnerId")),
+        host=event["host"],
+        id=event["id"],
+        source_ip=event["sourceIp"],
+        timestamp=datetime.strptime(event["timestamp"],
+                                    "%Y-%m-%dT%H:%M:%S.%fZ"),
+        event_type=event["type"])
+
+
+def lazy_some_fields(event):
+    event = Event.from_response(event)
+    return event.timestamp_us, event.event_type
+
+
+def lazy_all_fields(event):
+    event = Event.from_response(event)
+    return (event.event_details, event.host, event.id, event.source_ip,
+            event.timestamp, event.event_type)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--events", type=int, default=1000000)
+    args = parser.parse_args()
+    events = responses(args.events)
+
+    print("{:>18} {:>14}".format("decoding", "events/s"))
+    for name, decode in [("eager strptime", eager),
+                         ("lazy, 2 fields", lazy_some_fields),
+                         ("lazy, all fields", lazy_all_fields)]:
+        start = time.time()
+        for event in events:
+            decode(event)
+        print("{:>18} {:>14,.0f}".format(
+            name, len(events) / (time.time() - start)))
+    if columnar.numpy is not None:
+        start = time.time()
+        columnar.event_columns(events)
+        print("{:>18} {:>14,.0f}".format(
+            "columnar", len(events) / (time.time() - start)))
+
+
+if __name__ == "__main__":
+    main()
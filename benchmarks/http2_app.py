@@ -0,0 +1,53 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+A local stand-in for Delta used by benchmarks/http2_throughput.py: a
+FakeDeltaServer served as a WSGI application, so that any HTTP/2 capable
+WSGI server can host it, for example::
+
+    hypercorn --bind localhost:8000 benchmarks/http2_app:app
+
+Hypercorn speaks cleartext HTTP/2 to clients with prior knowledge, and
+HTTP/2 over TLS when given ``--certfile`` and ``--keyfile``. Signatures are
+not verified, so the benchmark can sign one request and send it repeatedly.
+"""
+
+from covata.delta import FakeDeltaServer
+
+server = FakeDeltaServer(verify_signatures=False)
+
+
+def app(environ, start_response):
+    url = "{}://{}{}".format(
+        environ["wsgi.url_scheme"],
+        environ.get("HTTP_HOST", environ["SERVER_NAME"]),
+        environ.get("RAW_URI") or environ.get("PATH_INFO", "") + (
+            "?" + environ["QUERY_STRING"]
+            if environ.get("QUERY_STRING") else ""))
+    headers = dict((k[5:].replace("_", "-").lower(), v)
+                   for k, v in environ.items() if k.startswith("HTTP_"))
+    if environ.get("CONTENT_TYPE"):
+        headers["content-type"] = environ["CONTENT_TYPE"]
+    length = int(environ.get("CONTENT_LENGTH") or 0)
+    body = environ["wsgi.input"].read(length) if length else None
+
+    response = server.handle(environ["REQUEST_METHOD"], url, headers, body,
+                             source_ip=environ.get("REMOTE_ADDR", ""))
+    content = response.content
+    start_response("{} {}".format(response.status, "OK"
+                                  if response.status < 400 else "Error"),
+                   [(k, v) for k, v in response.headers.items()] +
+                   [("content-length", str(len(content)))])
+    return [content]
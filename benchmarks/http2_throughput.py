@@ -0,0 +1,136 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Compares request throughput of pooled HTTP/1.1 connections against the
+multiplexing :class:`~covata.delta.Http2Adapter` at increasing concurrency.
+
+Run it against the FakeDeltaServer stand-in of benchmarks/http2_app.py,
+hosted by an HTTP/2 capable server such as hypercorn, for example::
+
+    hypercorn --bind localhost:8000 benchmarks/http2_app:app
+    python benchmarks/http2_throughput.py http://localhost:8000/v1 \
+        --prior-knowledge
+
+or, with TLS and a self-signed certificate::
+
+    hypercorn --certfile cert.pem --keyfile key.pem --bind localhost:8000 \
+        benchmarks/http2_app:app
+    python benchmarks/http2_throughput.py https://localhost:8000/v1 --insecure
+
+Each request fetches an identity registered by the benchmark, with a
+signature computed once up front, so that the client does not spend its
+time signing.
+"""
+
+from __future__ import print_function
+
+import argparse
+import time
+from multiprocessing.pool import ThreadPool
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from covata.delta import ApiClient, Http2Adapter, RequestsTransport, crypto
+from covata.delta.transport import TransportRequest
+from support import MemoryKeyStore
+
+
+def signed_request(url, verify):
+    """
+    Registers an identity with the stand-in and signs a request fetching it,
+    which the stand-in accepts every time as it does not verify signatures.
+    """
+    session = requests.Session()
+    session.verify = verify
+    key_store = MemoryKeyStore()
+    api_client = ApiClient(key_store, RequestsTransport(session),
+                           base_url=url)
+    private_key = crypto.generate_private_key()
+    public_key = crypto.serialize_public_key(private_key.public_key())
+    identity_id = api_client.register_identity(public_key, public_key)
+    key_store.store_keys(identity_id, private_key, private_key)
+
+    request = TransportRequest("GET", "{}{}/{}".format(
+        url.rstrip("/"), ApiClient.RESOURCE_IDENTITIES, identity_id))
+    api_client.signer(identity_id)(request)
+    session.close()
+    return request.url, request.headers
+
+
+def http1_session(concurrency, verify):
+    session = requests.Session()
+    session.verify = verify
+    session.mount("https://", HTTPAdapter(pool_connections=1,
+                                          pool_maxsize=concurrency))
+    session.mount("http://", HTTPAdapter(pool_connections=1,
+                                         pool_maxsize=concurrency))
+    return session
+
+
+def http2_session(concurrency, verify, prior_knowledge):
+    session = requests.Session()
+    adapter = Http2Adapter(verify=verify, http1=not prior_knowledge,
+                           limits=httpx.Limits(max_connections=concurrency))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def run(session, url, headers, concurrency, total):
+    pool = ThreadPool(concurrency)
+    try:
+        start = time.time()
+        statuses = pool.map(
+            lambda _: session.get(url, headers=headers).status_code,
+            range(total))
+        elapsed = time.time() - start
+    finally:
+        pool.close()
+        session.close()
+    errors = sum(1 for status in statuses if status >= 400)
+    return total / elapsed, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("url", help="the base url of the local stand-in")
+    parser.add_argument("--requests", type=int, default=2048,
+                        help="requests to send per run")
+    parser.add_argument("--concurrency", type=int, nargs="+",
+                        default=[1, 16, 256])
+    parser.add_argument("--insecure", action="store_true",
+                        help="skip TLS verification (self-signed stand-in)")
+    parser.add_argument("--prior-knowledge", action="store_true",
+                        help="speak cleartext HTTP/2 (h2c) to the stand-in")
+    args = parser.parse_args()
+    url, headers = signed_request(args.url, not args.insecure)
+
+    print("{:>12} {:>10} {:>12} {:>8}".format(
+        "concurrency", "transport", "requests/s", "errors"))
+    for concurrency in args.concurrency:
+        for name, session in [
+                ("http/1.1", http1_session(concurrency, not args.insecure)),
+                ("http/2", http2_session(concurrency, not args.insecure,
+                                         args.prior_knowledge))]:
+            throughput, errors = run(session, url, headers, concurrency,
+                                     args.requests)
+            print("{:>12} {:>10} {:>12.1f} {:>8}".format(
+                concurrency, name, throughput, errors))
+
+
+if __name__ == "__main__":
+    main()
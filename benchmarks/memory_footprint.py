@@ -0,0 +1,95 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Measures the memory held per secret descriptor when holding many of them,
+such as for a reconciliation, with the slotted Secret and EncryptionDetails
+classes and their interned ids, and for comparison with plain classes that
+keep a dictionary and their own copy of every id per instance, for
+example::
+
+    python benchmarks/memory_footprint.py --objects 1000000 --owners 100
+"""
+
+from __future__ import division, print_function
+
+import argparse
+import gc
+import tracemalloc
+import uuid
+
+from covata.delta import EncryptionDetails, Secret
+
+
+class PlainEncryptionDetails:
+    def __init__(self, symmetric_key, initialisation_vector):
+        self.symmetric_key = symmetric_key
+        self.initialisation_vector = initialisation_vector
+
+
+class PlainSecret:
+    def __init__(self, parent, id, created, rsa_key_owner, created_by,
+                 encryption_details, base_secret_id=None):
+        self.parent = parent
+        self.id = id
+        self.created = created
+        self.rsa_key_owner = rsa_key_owner
+        self.created_by = created_by
+        self.encryption_details = encryption_details
+        self.base_secret_id = base_secret_id
+
+
+def copy(value):
+    # a new string per descriptor, as parsed from a response
+    return value.encode("utf-8").decode("utf-8")
+
+
+def measure(secret_class, details_class, count, owners):
+    parent = object()
+    key = "k" * 684
+    iv = "v" * 24
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    secrets = []
+    for i in range(count):
+        owner = owners[i % len(owners)]
+        secrets.append(secret_class(
+            parent, str(uuid.UUID(int=i)), copy("2017-06-01T00:00:00Z"),
+            copy(owner), copy(owner), details_class(copy(key), copy(iv))))
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del secrets
+    return used / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--objects", type=int, default=1000000)
+    parser.add_argument("--owners", type=int, default=100,
+                        help="number of distinct identities owning secrets")
+    args = parser.parse_args()
+    owners = [str(uuid.uuid4()) for _ in range(args.owners)]
+
+    print("{:>8} {:>14}".format("classes", "bytes/object"))
+    for name, secret_class, details_class in [
+            ("plain", PlainSecret, PlainEncryptionDetails),
+            ("slotted", Secret, EncryptionDetails)]:
+        print("{:>8} {:>14.0f}".format(
+            name, measure(secret_class, details_class, args.objects,
+                          owners)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Measures the latency of Client.share_secret against a FakeDeltaServer that
+adds latency to every request, running the independent steps of the share
+concurrently and, for comparison, one after the other, for example::
+
+    python benchmarks/share_latency.py --latency 0.02 --shares 50
+"""
+
+from __future__ import division, print_function
+
+import argparse
+import time
+from concurrent.futures import Executor, Future
+
+from covata.delta import ApiClient, Client, FakeDeltaServer, InMemoryTransport
+from covata.delta import fakeserver
+from support import MemoryKeyStore
+
+
+class SynchronousExecutor(Executor):
+    """
+    Runs each task as it is submitted, so the steps of a share run one after
+    the other as they did before they were made concurrent.
+    """
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+def percentile(samples, p):
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def run(client, alice, bob, content, shares):
+    secret = alice.create_secret(content)
+    latencies = []
+    for _ in range(shares):
+        start = time.time()
+        client.share_secret(alice.id, bob.id, secret.id)
+        latencies.append(time.time() - start)
+    return sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--shares", type=int, default=50)
+    parser.add_argument("--size", type=int, default=1024,
+                        help="secret size in bytes")
+    parser.add_argument("--latency", type=float, default=0.02,
+                        help="server latency in seconds")
+    args = parser.parse_args()
+
+    server = FakeDeltaServer(latency=fakeserver.constant(args.latency))
+    key_store = MemoryKeyStore()
+    api_client = ApiClient(key_store, InMemoryTransport(server.handle))
+    content = b"x" * args.size
+
+    print("{:>12} {:>8} {:>8} {:>8}".format(
+        "pipeline", "p50 ms", "p99 ms", "max ms"))
+    for name, executor in [("sequential", SynchronousExecutor()),
+                           ("concurrent", None)]:
+        client = Client(dict(key_store=key_store, api_client=api_client,
+                             executor=executor))
+        alice = client.create_identity()
+        bob = client.create_identity()
+        latencies = run(client, alice, bob, content, args.shares)
+        print("{:>12} {:>8.1f} {:>8.1f} {:>8.1f}".format(
+            name,
+            percentile(latencies, 0.5) * 1000,
+            percentile(latencies, 0.99) * 1000,
+            latencies[-1] * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Helpers shared by the benchmarks.
+"""
+
+from covata.delta import DeltaKeyStore
+
+
+class MemoryKeyStore(DeltaKeyStore):
+    """
+    Holds the keys of the identities created by a benchmark in memory.
+    """
+
+    def __init__(self):
+        self.keys = {}
+
+    def store_keys(self, identity_id, private_signing_key,
+                   private_encryption_key):
+        self.keys[identity_id] = (private_signing_key, private_encryption_key)
+
+    def get_private_signing_key(self, identity_id):
+        return self.keys[identity_id][0]
+
+    def get_private_encryption_key(self, identity_id):
+        return self.keys[identity_id][1]
@@ -15,10 +15,33 @@
 from __future__ import absolute_import
 
 from .client import Client, Identity, Secret, EncryptionDetails, \
-    Event, EventDetails
+    Event, EventDetails, ShareResult, ProvisionResult, IdentityRef, SecretRef
 from .apiclient import ApiClient, SecretLookupType
-from .keystore import DeltaKeyStore, FileSystemKeyStore
+from .keystore import DeltaKeyStore, FileSystemKeyStore, CachingKeyStore
+from .transport import DeltaTransport, RequestsTransport, \
+    InMemoryTransport, TransportResponse, Http2Adapter
+from .fakeserver import FakeDeltaServer
+from .limiter import ConcurrencyLimiter, ConcurrencyLimitExceeded
+from .ratelimit import RateLimiter, RateLimitExceeded, TokenBucket
+from .circuitbreaker import CircuitBreaker, CircuitBreakerRegistry, \
+    CircuitOpenError, CircuitState
+from .deadline import Deadline, DeadlineExceeded
+from .routing import Endpoint, EndpointRouter
+from .cache import LruCache, PublicKeyCache, SecretKeyCache, ContentCache
+from .reservoir import KeyReservoir
+from .journal import IdentityJournal
+from .columnar import EventColumns
 
 __all__ = ["Client", "Identity", "Secret", "EncryptionDetails", "Event",
-           "EventDetails", "ApiClient", "FileSystemKeyStore", "DeltaKeyStore",
-           "SecretLookupType"]
+           "EventDetails", "ShareResult", "ProvisionResult", "IdentityRef",
+           "SecretRef", "ApiClient", "FileSystemKeyStore",
+           "DeltaKeyStore", "CachingKeyStore", "SecretLookupType",
+           "DeltaTransport", "RequestsTransport",
+           "InMemoryTransport", "TransportResponse", "Http2Adapter",
+           "FakeDeltaServer", "ConcurrencyLimiter",
+           "ConcurrencyLimitExceeded", "RateLimiter", "RateLimitExceeded",
+           "TokenBucket", "CircuitBreaker", "CircuitBreakerRegistry",
+           "CircuitOpenError", "CircuitState", "Deadline", "DeadlineExceeded",
+           "Endpoint", "EndpointRouter", "LruCache", "PublicKeyCache",
+           "SecretKeyCache", "ContentCache", "KeyReservoir",
+           "IdentityJournal", "EventColumns"]
@@ -14,9 +14,20 @@
 
 from __future__ import absolute_import
 
+import hashlib
+import json
+import timeit
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+import six
+import six.moves.urllib as urllib
 
-from . import signer, utils
+from . import compression, signer, utils
+from .circuitbreaker import CircuitOpenError
+from .deadline import Deadline
+from .routing import EndpointRouter
+from .transport import RequestsTransport, TransportRequest
 
 from enum import Enum
 
@@ -51,22 +62,136 @@ class ApiClient:
     RESOURCE_IDENTITIES = '/identities'             # type: str
     RESOURCE_SECRETS = '/secrets'                   # type: str
     RESOURCE_EVENTS = '/events'                     # type: str
-
-    def __init__(self, key_store):
+    COMPRESSION_THRESHOLD = 8192                    # type: int
+    DEFAULT_TIMEOUT = 30.0                          # type: float
+    DROPPED_STATUSES = frozenset([429, 502, 503, 504])  # type: frozenset
+    FAILOVER_STATUSES = frozenset([502, 503, 504])  # type: frozenset
+    IDEMPOTENT_METHODS = frozenset(["GET", "PUT", "DELETE"])  # type: frozenset
+
+    def __init__(self, key_store, transport=None, content_encoding=None,
+                 compression_threshold=COMPRESSION_THRESHOLD,
+                 base_url=DELTA_URL, concurrency_limiter=None,
+                 rate_limiters=None, circuit_breakers=None,
+                 timeout=DEFAULT_TIMEOUT, endpoint_router=None):
         """
         Constructs a new Delta API client with the given configuration.
 
+        Requests are built and signed by the client and then handed to the
+        transport. By default they are sent over the connection pool of a
+        :class:`~.RequestsTransport`.
+
+        Request bodies of at least ``compression_threshold`` bytes are
+        compressed with the given content encoding. The CVT1 signature always
+        covers the uncompressed payload. If the server rejects a compressed
+        body with ``415 Unsupported Media Type``, or advertises an
+        ``Accept-Encoding`` that excludes the encoding, the request is sent
+        uncompressed and compression is switched off for this client.
+        Responses are always requested with ``gzip`` or ``deflate``.
+
         :param key_store: the DeltaKeyStore object
         :type key_store: :class:`DeltaKeyStore`
+        :param transport: the transport used to send requests
+        :type transport: :class:`~.DeltaTransport` | None
+        :param content_encoding:
+            the content encoding for request bodies, one of ``gzip``,
+            ``deflate`` or ``zstd``; or None to send bodies uncompressed
+        :type content_encoding: str | None
+        :param int compression_threshold:
+            the minimum body size in bytes to compress
+        :param base_url:
+            the versioned base url of the Delta API, such as the url of a
+            :class:`~.FakeDeltaServer`; or the base urls of several
+            endpoints, such as regional deployments, to route requests to the
+            fastest healthy one
+        :type base_url: str | list[str]
+        :param concurrency_limiter:
+            the limiter shared by all requests of this client, adapting the
+            number of requests in flight to the latency and error rate of the
+            service; requests over the limit wait for admission before they
+            are signed
+        :type concurrency_limiter: :class:`~.ConcurrencyLimiter` | None
+        :param rate_limiters:
+            the rate limiters, keyed by requestor identity or resource, that
+            every request must pass before it is signed
+        :type rate_limiters: list[:class:`~.RateLimiter`] | None
+        :param circuit_breakers:
+            the registry of circuit breakers protecting each host and
+            resource; while a breaker is open requests fail fast with
+            :class:`~.CircuitOpenError` instead of being signed and sent
+        :type circuit_breakers: :class:`~.CircuitBreakerRegistry` | None
+        :param timeout:
+            the default time budget in seconds of a request made without a
+            deadline, covering queueing, signing and the connect and read
+            timeouts of the transport; or None to wait indefinitely
+        :type timeout: float | None
+        :param endpoint_router:
+            the router choosing the endpoint of each request, overriding the
+            default router over ``base_url``
+        :type endpoint_router: :class:`~.EndpointRouter` | None
         """
+        if content_encoding is not None and \
+                content_encoding not in compression.supported_encodings():
+            raise ValueError("content_encoding must be one of {}".format(
+                compression.supported_encodings()))
+
         self.__key_store = key_store
+        self.__transport = RequestsTransport() if transport is None \
+            else transport
+        self.__content_encoding = content_encoding
+        self.__compression_threshold = compression_threshold
+        if endpoint_router is None:
+            endpoint_router = EndpointRouter(
+                [base_url] if isinstance(base_url, six.string_types)
+                else base_url)
+        self.__endpoint_router = endpoint_router
+        self.__concurrency_limiter = concurrency_limiter
+        self.__rate_limiters = list(rate_limiters or [])
+        self.__circuit_breakers = circuit_breakers
+        self.__timeout = timeout
 
     @property
     def key_store(self):
         return self.__key_store
 
+    @property
+    def transport(self):
+        return self.__transport
+
+    @property
+    def content_encoding(self):
+        return self.__content_encoding
+
+    @property
+    def base_url(self):
+        """
+        The base url of the first endpoint.
+
+        :rtype: str
+        """
+        return self.endpoint_router.endpoints[0].url
+
+    @property
+    def endpoint_router(self):
+        return self.__endpoint_router
+
+    @property
+    def concurrency_limiter(self):
+        return self.__concurrency_limiter
+
+    @property
+    def rate_limiters(self):
+        return self.__rate_limiters
+
+    @property
+    def circuit_breakers(self):
+        return self.__circuit_breakers
+
+    @property
+    def timeout(self):
+        return self.__timeout
+
     def register_identity(self, public_encryption_key, public_signing_key,
-                          external_id=None, metadata=None):
+                          external_id=None, metadata=None, deadline=None):
         """
         Creates a new identity in Delta with the provided metadata
         and external id.
@@ -79,6 +204,10 @@ class ApiClient:
         :type external_id: str | None
         :param metadata: the metadata to associate with the identity
         :type metadata: dict[str, str] | None
+        :param deadline:
+            the deadline of the request, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
         :return: the id of the newly created identity
         :rtype: str
         """
@@ -88,31 +217,35 @@ class ApiClient:
             externalId=external_id,
             metadata=metadata)
 
-        response = requests.post(
-            url=self.DELTA_URL + self.RESOURCE_IDENTITIES,
-            json=dict((k, v) for k, v in body.items() if v is not None))
-        response.raise_for_status()
+        response = self.__execute(
+            "POST", self.RESOURCE_IDENTITIES,
+            json_body=dict((k, v) for k, v in body.items() if v is not None),
+            deadline=deadline)
         identity_id = response.json()['identityId']
 
         return identity_id
 
     @utils.check_id("requestor_id, identity_id")
-    def get_identity(self, requestor_id, identity_id):
+    def get_identity(self, requestor_id, identity_id, deadline=None):
         """
         Gets the identity matching the given identity id.
 
         :param str requestor_id: the authenticating identity id
         :param str identity_id: the identity id to retrieve
+        :param deadline:
+            the deadline of the request, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
         :return: the retrieved identity
         :rtype: dict[str, any]
         """
-        response = requests.get(
-            url="{base_url}{resource}/{identity_id}".format(
-                base_url=self.DELTA_URL,
+        response = self.__execute(
+            "GET",
+            "{resource}/{identity_id}".format(
                 resource=self.RESOURCE_IDENTITIES,
                 identity_id=identity_id),
-            auth=self.signer(requestor_id))
-        response.raise_for_status()
+            requestor_id=requestor_id,
+            deadline=deadline)
         identity = response.json()
         return identity
 
@@ -123,7 +256,8 @@ class ApiClient:
         lambda x: x is not None and dict(x),
         "must be a non-empty dict[str, str]")
     def get_identities_by_metadata(self, requestor_id, metadata,
-                                   page=None, page_size=None):
+                                   page=None, page_size=None, stream=False,
+                                   deadline=None):
         """
         Gets a list of identities matching the given metadata key and value
         pairs, bound by the pagination parameters.
@@ -135,23 +269,32 @@ class ApiClient:
         :type page: int | None
         :param page_size: the page size
         :type page_size: int | None
-        :return: a list of identities satisfying the request
-        :rtype: list[dict[str, any]]
+        :param bool stream:
+            whether to parse the identities incrementally as the response
+            arrives, rather than after reading it into memory
+        :param deadline:
+            the deadline of the request, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
+        :return: a list of identities satisfying the request, or an iterable
+            of them if streamed
+        :rtype: list[dict[str, any]] | collections.Iterable[dict[str, any]]
         """
         metadata_ = dict(("metadata." + k, v) for k, v in metadata.items())
-        response = requests.get(
-            url="{base_url}{resource}".format(
-                base_url=self.DELTA_URL,
-                resource=self.RESOURCE_IDENTITIES),
+        response = self.__execute(
+            "GET",
+            self.RESOURCE_IDENTITIES,
+            requestor_id=requestor_id,
             params=dict(metadata_,
                         page=int(page) if page else None,
                         pageSize=int(page_size) if page_size else None),
-            auth=self.signer(requestor_id))
-        response.raise_for_status()
-        return response.json()
+            stream=stream,
+            deadline=deadline)
+        return self.__json_array(response, stream)
 
     @utils.check_id("requestor_id")
-    def create_secret(self, requestor_id, content, encryption_details):
+    def create_secret(self, requestor_id, content, encryption_details,
+                      deadline=None):
         """
         Creates a new secret in Delta. The key used for encryption should
         be encrypted with the key of the authenticating identity.
@@ -164,25 +307,79 @@ class ApiClient:
         :param str content: the contents of the secret
         :param encryption_details: the encryption details
         :type encryption_details: dict[str, str]
+        :param deadline:
+            the deadline of the request, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
         :return: the created base secret
         :rtype: dict[str, str]
         """
-        response = requests.post(
-            url="{base_url}{resource}".format(
-                base_url=self.DELTA_URL,
-                resource=self.RESOURCE_SECRETS),
-            json=dict(
+        response = self.__execute(
+            "POST",
+            self.RESOURCE_SECRETS,
+            requestor_id=requestor_id,
+            json_body=dict(
                 content=content,
                 encryptionDetails=encryption_details
             ),
-            auth=self.signer(requestor_id))
+            deadline=deadline)
+        return response.json()
 
-        response.raise_for_status()
+    @utils.check_id("requestor_id")
+    def create_secret_from_stream(self, requestor_id, content,
+                                  encryption_details, deadline=None):
+        """
+        Creates a new secret in Delta, streaming the contents in a chunked
+        request body instead of holding them in memory.
+
+        The contents are supplied by a function returning a new iterable
+        over the base64 encoded contents. It is called twice: once to compute
+        the payload hash for the request signature and once to send the body,
+        and must produce the same bytes both times.
+
+        :param str requestor_id: the authenticating identity id
+        :param content:
+            a function returning an iterable of base64 encoded content chunks
+        :type content: () -> collections.Iterable[bytes]
+        :param encryption_details: the encryption details
+        :type encryption_details: dict[str, str]
+        :param deadline:
+            the deadline of the request, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
+        :return: the created base secret
+        :rtype: dict[str, str]
+        """
+        # The body is emitted in the canonical form of the CVT1 payload hash
+        # (sorted keys, no whitespace), so the hash can be computed over the
+        # streamed bytes without parsing them.
+        trailer = json.dumps(dict(encryptionDetails=encryption_details),
+                             separators=(",", ":"),
+                             sort_keys=True)
+        trailer = '",{}'.format(trailer[1:]).encode("utf-8")
+
+        def body():
+            yield b'{"content":"'
+            for chunk in content():
+                yield chunk
+            yield trailer
+
+        digest = hashlib.sha256()
+        for chunk in body():
+            digest.update(chunk)
+
+        response = self.__execute(
+            "POST",
+            self.RESOURCE_SECRETS,
+            requestor_id=requestor_id,
+            body=body,
+            hashed_payload=digest.hexdigest(),
+            deadline=deadline)
         return response.json()
 
     @utils.check_id("requestor_id, base_secret_id, rsa_key_owner_id")
     def share_secret(self, requestor_id, content, encryption_details,
-                     base_secret_id, rsa_key_owner_id):
+                     base_secret_id, rsa_key_owner_id, deadline=None):
         """
         Shares the base secret with the specified target RSA key owner. The
         contents must be encrypted with the public encryption key of the
@@ -200,42 +397,48 @@ class ApiClient:
         :type encryption_details: dict[str, str]
         :param str base_secret_id: the id of the base secret
         :param str rsa_key_owner_id: the id of the rsa key owner
+        :param deadline:
+            the deadline of the request, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
         :return: the created derived secret
         :rtype: dict[str, str]
         """
-        response = requests.post(
-            url="{base_url}{resource}".format(
-                base_url=self.DELTA_URL,
-                resource=self.RESOURCE_SECRETS),
-            json=dict(
+        response = self.__execute(
+            "POST",
+            self.RESOURCE_SECRETS,
+            requestor_id=requestor_id,
+            json_body=dict(
                 content=content,
                 encryptionDetails=encryption_details,
                 baseSecret=base_secret_id,
                 rsaKeyOwner=rsa_key_owner_id
             ),
-            auth=self.signer(requestor_id))
-
-        response.raise_for_status()
+            deadline=deadline)
         return response.json()
 
     @utils.check_id("requestor_id, secret_id")
-    def delete_secret(self, requestor_id, secret_id):
+    def delete_secret(self, requestor_id, secret_id, deadline=None):
         """
         Deletes the secret with the given secret id.
 
         :param str requestor_id: the authenticating identity id
         :param str secret_id: the secret id to be deleted
+        :param deadline:
+            the deadline of the request, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
         """
-        response = requests.delete(
-            url="{base_url}{resource}/{secret_id}".format(
-                base_url=self.DELTA_URL,
+        self.__execute(
+            "DELETE",
+            "{resource}/{secret_id}".format(
                 resource=self.RESOURCE_SECRETS,
                 secret_id=secret_id),
-            auth=self.signer(requestor_id))
-        response.raise_for_status()
+            requestor_id=requestor_id,
+            deadline=deadline)
 
     @utils.check_id("requestor_id, secret_id")
-    def get_secret(self, requestor_id, secret_id):
+    def get_secret(self, requestor_id, secret_id, deadline=None):
         """
         Gets the given secret. This does not include the metadata and contents,
         they need to be made as separate requests,
@@ -244,59 +447,76 @@ class ApiClient:
 
         :param str requestor_id: the authenticating identity id
         :param str secret_id: the secret id to be retrieved
+        :param deadline:
+            the deadline of the request, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
         :return: the retrieved secret
         :rtype: dict[str, any]
         """
-        response = requests.get(
-            url="{base_url}{resource}/{secret_id}".format(
-                base_url=self.DELTA_URL,
+        response = self.__execute(
+            "GET",
+            "{resource}/{secret_id}".format(
                 resource=self.RESOURCE_SECRETS,
                 secret_id=secret_id),
-            auth=self.signer(requestor_id))
-        response.raise_for_status()
+            requestor_id=requestor_id,
+            deadline=deadline)
         return response.json()
 
     @utils.check_id("requestor_id, secret_id")
-    def get_secret_metadata(self, requestor_id, secret_id):
+    def get_secret_metadata(self, requestor_id, secret_id, deadline=None):
         """
         Gets the metadata key and value pairs for the given secret.
 
         :param str requestor_id: the authenticating identity id
         :param str secret_id: the secret id to be retrieved
+        :param deadline:
+            the deadline of the request, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
         :return: the retrieved secret metadata dictionary and version tuple
         :rtype: (dict[str, str], int)
         """
-        response = requests.get(
-            url="{base_url}{resource}/{secret_id}/metadata".format(
-                base_url=self.DELTA_URL,
+        response = self.__execute(
+            "GET",
+            "{resource}/{secret_id}/metadata".format(
                 resource=self.RESOURCE_SECRETS,
                 secret_id=secret_id),
-            auth=self.signer(requestor_id))
-
-        response.raise_for_status()
+            requestor_id=requestor_id,
+            deadline=deadline)
         metadata = dict(response.json())
-        version = int(response.headers["ETag"])
+        version = int(response.headers["etag"])
         return metadata, version
 
     @utils.check_id("requestor_id, secret_id")
-    def get_secret_content(self, requestor_id, secret_id):
+    def get_secret_content(self, requestor_id, secret_id, stream=False,
+                           deadline=None):
         """
         Gets the contents of the given secret.
 
+        If ``stream`` is True the contents are not read into memory; an
+        iterable of base64 encoded byte chunks is returned instead, which
+        reads the response incrementally as it is consumed.
+
         :param str requestor_id: the authenticating identity id
         :param str secret_id: the secret id to be retrieved
+        :param bool stream: whether to stream the contents
+        :param deadline:
+            the deadline of the request, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
         :return: the retrieved secret
-        :rtype: str
+        :rtype: str | collections.Iterable[bytes]
         """
-        response = requests.get(
-            url="{base_url}{resource}/{secret_id}/content".format(
-                base_url=self.DELTA_URL,
+        response = self.__execute(
+            "GET",
+            "{resource}/{secret_id}/content".format(
                 resource=self.RESOURCE_SECRETS,
                 secret_id=secret_id),
-            auth=self.signer(requestor_id))
-
-        response.raise_for_status()
-        return response.text
+            requestor_id=requestor_id,
+            stream=stream,
+            deadline=deadline)
+        return response.iter_content() if stream else response.text
 
     @utils.check_id("requestor_id, secret_id")
     @utils.check_metadata("metadata")
@@ -304,7 +524,8 @@ class ApiClient:
                                requestor_id,
                                secret_id,
                                metadata,
-                               version):
+                               version,
+                               deadline=None):
         """
         Updates the metadata of the given secret given the version number.
         The version of a secret's metadata can be obtained by calling
@@ -317,26 +538,30 @@ class ApiClient:
         :param metadata: metadata dictionary
         :type metadata: dict[str, str]
         :param int version: metadata version, required for optimistic locking
+        :param deadline:
+            the deadline of the request, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
         """
-        response = requests.put(
-            url="{base_url}{resource}/{secret_id}/metadata".format(
-                base_url=self.DELTA_URL,
+        self.__execute(
+            "PUT",
+            "{resource}/{secret_id}/metadata".format(
                 resource=self.RESOURCE_SECRETS,
                 secret_id=secret_id),
+            requestor_id=requestor_id,
             headers={
                 "if-match": str(version)
             },
-            json=metadata,
-            auth=self.signer(requestor_id))
-
-        response.raise_for_status()
+            json_body=metadata,
+            deadline=deadline)
 
     @utils.check_id("requestor_id, identity_id")
     def update_identity_metadata(self,
                                  requestor_id,
                                  identity_id,
                                  metadata,
-                                 version):
+                                 version,
+                                 deadline=None):
         """
         Updates the metadata of the given identity given the version number.
         The version of an identity's metadata can be obtained by calling
@@ -349,22 +574,27 @@ class ApiClient:
         :param metadata: metadata dictionary
         :type metadata: dict[str, str]
         :param int version: metadata version, required for optimistic locking
+        :param deadline:
+            the deadline of the request, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
         """
-        response = requests.put(
-            url="{base_url}{resource}/{identity_id}".format(
-                base_url=self.DELTA_URL,
+        self.__execute(
+            "PUT",
+            "{resource}/{identity_id}".format(
                 resource=self.RESOURCE_IDENTITIES,
                 identity_id=identity_id),
+            requestor_id=requestor_id,
             headers={
                 "if-match": str(version)
             },
-            json=dict(metadata=metadata),
-            auth=self.signer(requestor_id))
-        response.raise_for_status()
+            json_body=dict(metadata=metadata),
+            deadline=deadline)
 
     @utils.check_id("requestor_id")
     @utils.check_optional_id("secret_id, rsa_key_owner_id")
-    def get_events(self, requestor_id, secret_id=None, rsa_key_owner_id=None):
+    def get_events(self, requestor_id, secret_id=None, rsa_key_owner_id=None,
+                   stream=False, deadline=None):
         """
         Gets a list of events associated filtered by secret id or RSA key owner
         or both secret id and RSA key owner.
@@ -374,8 +604,15 @@ class ApiClient:
         :type secret_id: str | None
         :param rsa_key_owner_id: the rsa key owner id of interest
         :type rsa_key_owner_id: str | None
-        :return: a list of audit events
-        :rtype: list[dict[str, any]]
+        :param bool stream:
+            whether to parse the events incrementally as the response
+            arrives, rather than after reading it into memory
+        :param deadline:
+            the deadline of the request, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
+        :return: a list of audit events, or an iterable of them if streamed
+        :rtype: list[dict[str, any]] | collections.Iterable[dict[str, any]]
         """
         params = dict(purpose="AUDIT")
         if secret_id is not None:
@@ -383,14 +620,14 @@ class ApiClient:
         if rsa_key_owner_id is not None:
             params["rsaKeyOwner"] = str(rsa_key_owner_id)
 
-        response = requests.get(
-            url="{base_url}{resource}".format(
-                base_url=self.DELTA_URL,
-                resource=self.RESOURCE_EVENTS),
+        response = self.__execute(
+            "GET",
+            self.RESOURCE_EVENTS,
+            requestor_id=requestor_id,
             params=params,
-            auth=self.signer(requestor_id))
-        response.raise_for_status()
-        return response.json()
+            stream=stream,
+            deadline=deadline)
+        return self.__json_array(response, stream)
 
     @utils.check_id("requestor_id")
     @utils.check_optional_id("base_secret_id, created_by, rsa_key_owner_id")
@@ -411,7 +648,9 @@ class ApiClient:
                     metadata=None,
                     lookup_type=SecretLookupType.any,
                     page=None,
-                    page_size=None):
+                    page_size=None,
+                    stream=False,
+                    deadline=None):
         """
         Gets a list of secrets based on the query parameters, bound by the
         pagination parameters.
@@ -431,7 +670,15 @@ class ApiClient:
         :type page: int | None
         :param page_size: the page size
         :type page_size: int | None
-        :return:
+        :param bool stream:
+            whether to parse the secrets incrementally as the response
+            arrives, rather than after reading it into memory
+        :param deadline:
+            the deadline of the request, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
+        :return: a list of secrets, or an iterable of them if streamed
+        :rtype: list[dict[str, any]] | collections.Iterable[dict[str, any]]
         """
         params = dict(
             page=int(page) if page else None,
@@ -450,14 +697,66 @@ class ApiClient:
         elif lookup_type is SecretLookupType.derived:
             params["baseSecret"] = "true"
 
-        response = requests.get(
-            url="{base_url}{resource}".format(
-                base_url=self.DELTA_URL,
-                resource=self.RESOURCE_SECRETS),
+        response = self.__execute(
+            "GET",
+            self.RESOURCE_SECRETS,
+            requestor_id=requestor_id,
             params=params,
-            auth=self.signer(requestor_id))
-        response.raise_for_status()
-        return response.json()
+            stream=stream,
+            deadline=deadline)
+        return self.__json_array(response, stream)
+
+    def warm_up(self, connections=1, identity_ids=None, max_workers=32,
+                deadline=None):
+        """
+        Prepares the client for traffic, so the first requests do not pay
+        for connection setup or key loading. Opens ``connections`` pooled
+        connections to every endpoint, resolving host names and completing
+        TLS handshakes in parallel, and loads the private keys of the given
+        identities from the key store at the same time.
+
+        Loaded keys are only kept by a key store that caches them, such as a
+        :class:`~.CachingKeyStore`.
+
+        :param int connections: the number of connections per endpoint
+        :param identity_ids: the identities whose keys to load
+        :type identity_ids: list[str] | None
+        :param int max_workers:
+            the largest number of threads opening connections and loading
+            keys at the same time
+        :param deadline:
+            the deadline of the warm-up, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
+        :return: the number of connections opened, the number of identities
+            whose keys were loaded, and the number of seconds taken
+        :rtype: dict[str, int | float]
+        """
+        deadline = Deadline.of(deadline, self.timeout)
+        identity_ids = list(identity_ids or [])
+        endpoints = self.endpoint_router.endpoints
+        started = timeit.default_timer()
+
+        def load_keys(identity_id):
+            self.key_store.get_private_signing_key(identity_id)
+            self.key_store.get_private_encryption_key(identity_id)
+
+        executor = ThreadPoolExecutor(max_workers=max(1, min(
+            max_workers, len(endpoints) + len(identity_ids))))
+        try:
+            opened = [executor.submit(self.transport.warm_up, endpoint.url,
+                                      connections, deadline.timeout())
+                      for endpoint in endpoints]
+            loaded = [executor.submit(load_keys, identity_id)
+                      for identity_id in identity_ids]
+            report = dict(
+                connections=sum(deadline.result(f) for f in opened),
+                identities=len([deadline.result(f) for f in loaded]))
+        finally:
+            executor.shutdown(wait=False)
+
+        report["seconds"] = timeit.default_timer() - started
+        return report
 
     @utils.check_id("identity_id")
     def signer(self, identity_id):
@@ -469,10 +768,10 @@ class ApiClient:
 
         :param str identity_id: the authorizing identity id
         :return: the request signer function
-        :rtype: (:class:`PreparedRequest`) -> :class:`PreparedRequest`
+        :rtype: (:class:`~.TransportRequest`) -> :class:`~.TransportRequest`
         """
         def sign_request(r):
-            # type: (requests.PreparedRequest) -> requests.PreparedRequest
+            # type: (TransportRequest) -> TransportRequest
             signing_key = self.key_store.get_private_signing_key(identity_id)
             r.headers = signer.get_updated_headers(
                 identity_id=identity_id,
@@ -480,6 +779,182 @@ class ApiClient:
                 url=r.url,
                 headers=r.headers,
                 payload=r.body,
-                private_signing_key=signing_key)
+                private_signing_key=signing_key,
+                hashed_payload=getattr(r, "hashed_payload", None))
             return r
         return sign_request
+
+    def __json_array(self, response, stream):
+        # type: (TransportResponse, bool) -> any
+        if not stream:
+            return response.json()
+
+        def elements():
+            try:
+                for element in utils.iter_json_array(response.iter_content()):
+                    yield element
+            finally:
+                # releases the connection if the caller stops early
+                response.close()
+
+        return elements()
+
+    def __execute(self, method, resource, requestor_id=None, params=None,
+                  headers=None, json_body=None, body=None, hashed_payload=None,
+                  stream=False, deadline=None):
+        # type: (str, str, str, dict, dict, any, any, str, bool, any) -> \
+        #     TransportResponse
+        deadline = Deadline.of(deadline, self.timeout)
+        top_resource = "/" + resource.split("/")[1]
+        admitted = []
+        try:
+            for rate_limiter in self.rate_limiters:
+                rate_limiter.acquire(
+                    requestor_id, top_resource,
+                    timeout=deadline.timeout(cap=rate_limiter.timeout))
+                admitted.append(rate_limiter)
+        except Exception:
+            # the request is not made, so the limiters that admitted it get
+            # their tokens back
+            for rate_limiter in admitted:
+                rate_limiter.release(requestor_id, top_resource)
+            raise
+
+        if params:
+            query = urllib.parse.urlencode(
+                [(k, v) for k, v in params.items() if v is not None])
+            if query:
+                resource = "{}?{}".format(resource, query)
+
+        if json_body is not None:
+            body = json.dumps(json_body).encode("utf-8")
+
+        tried = []
+        while True:
+            endpoint = self.endpoint_router.select(exclude=tried)
+            tried.append(endpoint)
+            last = len(tried) == len(self.endpoint_router.endpoints)
+            try:
+                # a body given as a function returning a generator is created
+                # afresh for every endpoint tried, as a failed attempt may
+                # have consumed part of the previous one
+                response = self.__attempt(
+                    endpoint, method, top_resource, resource, requestor_id,
+                    headers, body() if callable(body) else body,
+                    hashed_payload, stream, deadline)
+            except CircuitOpenError:
+                if last:
+                    raise
+                continue
+            except requests.ConnectTimeout:
+                # the request never reached the endpoint
+                if last:
+                    raise
+                continue
+            except (requests.ConnectionError, requests.Timeout):
+                if last or method not in self.IDEMPOTENT_METHODS:
+                    raise
+                continue
+            if last or method not in self.IDEMPOTENT_METHODS or \
+                    response.status not in self.FAILOVER_STATUSES:
+                break
+            response.close()
+
+        if stream and response.status >= 400:
+            response.close()
+        response.raise_for_status()
+        return response
+
+    def __attempt(self, endpoint, method, top_resource, resource,
+                  requestor_id, headers, body, hashed_payload, stream,
+                  deadline):
+        # type: (Endpoint, str, str, str, str, dict, any, str, bool, \
+        #     Deadline) -> TransportResponse
+        breaker = None
+        if self.circuit_breakers is not None:
+            breaker = self.circuit_breakers.breaker(endpoint.host,
+                                                    top_resource)
+            breaker.acquire()
+
+        url = endpoint.url + resource
+        content_encoding = self.content_encoding
+        if not isinstance(body, bytes) or \
+                len(body) < self.__compression_threshold:
+            content_encoding = None
+
+        failed = None
+        # the time spent in the transport, excluding waits for limiters and
+        # signing, which say nothing about the health of the endpoint
+        latencies = []
+        try:
+            response = self.__limited_send(method, url, requestor_id,
+                                           headers, body, hashed_payload,
+                                           content_encoding, stream,
+                                           latencies, deadline)
+            if content_encoding is not None:
+                accepted = response.headers.get("accept-encoding")
+                if response.status == 415 or accepted is not None and \
+                        content_encoding not in accepted.lower():
+                    self.__content_encoding = None
+                if response.status == 415:
+                    response = self.__limited_send(
+                        method, url, requestor_id, headers, body,
+                        hashed_payload, None, stream, latencies, deadline)
+            failed = response.status >= 500
+            return response
+        except (requests.ConnectionError, requests.Timeout):
+            failed = True
+            raise
+        finally:
+            self.endpoint_router.record(
+                endpoint, sum(latencies), failed if latencies else None)
+            if breaker is not None:
+                breaker.release(failed)
+
+    def __send(self, method, url, requestor_id, headers, body, hashed_payload,
+               content_encoding, stream, latencies, deadline):
+        # type: (str, str, str, dict, any, str, str, bool, list, \
+        #     Deadline) -> TransportResponse
+        request = TransportRequest(method, url, headers, body)
+        request.hashed_payload = hashed_payload
+        request.headers["Accept-Encoding"] = compression.accept_encoding()
+        if body is not None:
+            request.headers["Content-Type"] = "application/json"
+        if content_encoding is not None:
+            request.headers["Content-Encoding"] = content_encoding
+
+        if requestor_id is not None:
+            # the signature covers the uncompressed payload
+            deadline.check()
+            self.signer(requestor_id)(request)
+
+        if content_encoding is not None:
+            request.body = compression.encode(body, content_encoding)
+
+        send = self.transport.stream if stream else self.transport.send
+        timeout = deadline.timeout()
+        started = timeit.default_timer()
+        try:
+            return send(request.method, request.url, request.headers,
+                        request.body, timeout=timeout)
+        finally:
+            latencies.append(timeit.default_timer() - started)
+
+    def __limited_send(self, *args):
+        # type: (...) -> TransportResponse
+        limiter = self.concurrency_limiter
+        if limiter is None:
+            return self.__send(*args)
+
+        deadline = args[-1]
+        started = limiter.acquire(deadline.timeout(cap=limiter.queue_timeout))
+        dropped = None
+        try:
+            response = self.__send(*args)
+            dropped = response.status in self.DROPPED_STATUSES
+            return response
+        except (requests.ConnectionError, requests.Timeout):
+            dropped = True
+            raise
+        finally:
+            limiter.release(started, dropped)
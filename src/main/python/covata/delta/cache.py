@@ -0,0 +1,651 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+from __future__ import absolute_import, division
+
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from . import crypto
+
+__all__ = ["LruCache", "PublicKeyCache", "SecretKeyCache", "ContentCache"]
+
+_replace = getattr(os, "replace", os.rename)
+
+
+class LruCache(object):
+    """
+    A thread-safe cache bounded by the number of entries it holds, evicting
+    the least recently used entry when full. Entries may also expire a fixed
+    number of seconds after they are added.
+    """
+
+    def __init__(self, max_entries, ttl=None, clock=time.time,
+                 on_evict=None):
+        """
+        Creates a new empty cache.
+
+        :param int max_entries: the largest number of entries held
+        :param ttl:
+            the number of seconds an entry is kept for, or None to keep
+            entries until they are evicted
+        :type ttl: float | None
+        :param clock: the function returning the current time in seconds
+        :param on_evict:
+            the function called with the key and value of every entry that
+            leaves the cache, whether evicted, expired, removed or cleared
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.__lock = threading.Lock()
+        self.__entries = OrderedDict()
+        self.__max_entries = max_entries
+        self.__ttl = ttl
+        self.__clock = clock
+        self.__on_evict = on_evict
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        self.__expirations = 0
+
+    @property
+    def max_entries(self):
+        return self.__max_entries
+
+    @property
+    def ttl(self):
+        return self.__ttl
+
+    @property
+    def metrics(self):
+        """
+        A snapshot of the hit and miss counts, the hit rate, the number of
+        entries held, and the number of entries evicted to make room or
+        dropped because they expired.
+
+        :rtype: dict[str, int | float]
+        """
+        with self.__lock:
+            lookups = self.__hits + self.__misses
+            return dict(hits=self.__hits,
+                        misses=self.__misses,
+                        hit_rate=self.__hits / lookups if lookups else 0.0,
+                        size=len(self.__entries),
+                        evictions=self.__evictions,
+                        expirations=self.__expirations)
+
+    def get(self, key):
+        """
+        Gets the value cached for the given key.
+
+        :param key: the key
+        :return: the value, or None if it is not cached or has expired
+        """
+        removed = None
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and entry[1] is not None \
+                    and self.__clock() >= entry[1]:
+                removed = self.__entries.pop(key)
+                self.__expirations += 1
+                entry = None
+            if entry is None:
+                self.__misses += 1
+            else:
+                self.__hits += 1
+                # re-inserted as the most recently used entry
+                self.__entries[key] = self.__entries.pop(key)
+        if removed is not None:
+            self.__evicted(key, removed[0])
+        return None if entry is None else entry[0]
+
+    def put(self, key, value, expires=None):
+        """
+        Caches a value, replacing any value cached for the key and evicting
+        the least recently used entries if the cache is full.
+
+        :param key: the key
+        :param value: the value
+        :param expires:
+            the time at which the entry expires, which defaults to ``ttl``
+            seconds from now
+        :type expires: float | None
+        """
+        if expires is None and self.__ttl is not None:
+            expires = self.__clock() + self.__ttl
+        removed = []
+        with self.__lock:
+            replaced = self.__entries.pop(key, None)
+            if replaced is not None and replaced[0] is not value:
+                removed.append((key, replaced[0]))
+            self.__entries[key] = (value, expires)
+            while len(self.__entries) > self.__max_entries:
+                evicted_key, evicted = self.__entries.popitem(last=False)
+                self.__evictions += 1
+                removed.append((evicted_key, evicted[0]))
+        for evicted_key, evicted in removed:
+            self.__evicted(evicted_key, evicted)
+
+    def pop(self, key):
+        """
+        Removes the entry for the given key, if any.
+
+        :param key: the key
+        """
+        with self.__lock:
+            entry = self.__entries.pop(key, None)
+        if entry is not None:
+            self.__evicted(key, entry[0])
+
+    def clear(self):
+        """
+        Removes every entry.
+        """
+        with self.__lock:
+            entries = list(self.__entries.items())
+            self.__entries.clear()
+        for key, entry in entries:
+            self.__evicted(key, entry[0])
+
+    def entries(self):
+        """
+        Gets a snapshot of the entries that have not expired, from the least
+        to the most recently used.
+
+        :return: the key, value and expiry time of each entry
+        :rtype: list[(any, any, float | None)]
+        """
+        with self.__lock:
+            now = self.__clock()
+            return [(key, value, expires)
+                    for key, (value, expires) in self.__entries.items()
+                    if expires is None or now < expires]
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __evicted(self, key, value):
+        if self.__on_evict is not None:
+            self.__on_evict(key, value)
+
+
+class PublicKeyCache(object):
+    """
+    Holds the parsed public encryption keys of identities, so the identity
+    lookup and key parsing of a share are skipped for recipients shared with
+    recently. Keys are kept for ``ttl`` seconds, so a rotated key is picked up
+    within that time, and the least recently used keys are evicted beyond
+    ``max_entries``.
+
+    Given a ``path``, the encoded keys are saved to that file at most every
+    ``save_interval`` seconds, and on :func:`~.PublicKeyCache.save`, and
+    loaded from it when the cache is created, so the cache stays warm across
+    restarts:
+
+    >>> client = Client(dict(key_store=key_store, api_client=api_client,
+    ...                      public_key_cache=PublicKeyCache(
+    ...                          path="~/.delta/public_keys.json")))
+    """
+
+    def __init__(self, max_entries=10000, ttl=3600.0, path=None,
+                 save_interval=60.0, clock=time.time):
+        """
+        Creates a new cache, loading the keys saved to ``path`` if the file
+        exists.
+
+        :param int max_entries: the largest number of keys held
+        :param ttl: the number of seconds a key is kept for
+        :type ttl: float | None
+        :param path: the file the keys are saved to, or None to keep them in
+            memory only
+        :type path: str | None
+        :param float save_interval:
+            the least number of seconds between saves when keys are added
+        :param clock: the function returning the current time in seconds
+        """
+        self.__cache = LruCache(max_entries, ttl=ttl, clock=clock)
+        self.__path = None if path is None else os.path.expanduser(path)
+        self.__save_interval = save_interval
+        self.__clock = clock
+        self.__save_lock = threading.Lock()
+        self.__saved = clock()
+        self.__dirty = False
+        if self.__path is not None:
+            self.load()
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def metrics(self):
+        """
+        A snapshot of the hit and miss counts, hit rate, size, evictions and
+        expirations of the cache.
+
+        :rtype: dict[str, int | float]
+        """
+        return self.__cache.metrics
+
+    def get(self, identity_id):
+        """
+        Gets the public encryption key of the given identity.
+
+        :param str identity_id: the identity id
+        :return: the public key, or None if it is not cached or has expired
+        :rtype: :class:`~rsa.RSAPublicKey` | None
+        """
+        entry = self.__cache.get(identity_id)
+        return None if entry is None else entry[0]
+
+    def put(self, identity_id, public_encryption_key):
+        """
+        Parses and caches the public encryption key of the given identity.
+
+        :param str identity_id: the identity id
+        :param str public_encryption_key:
+            the key as base64 encoded DER, as returned by Delta
+        :return: the public key
+        :rtype: :class:`~rsa.RSAPublicKey`
+        """
+        public_key = crypto.deserialize_public_key(public_encryption_key)
+        self.__cache.put(identity_id, (public_key, public_encryption_key))
+        self.__dirty = True
+        if self.__path is not None and \
+                self.__clock() - self.__saved >= self.__save_interval:
+            self.save()
+        return public_key
+
+    def invalidate(self, identity_id):
+        """
+        Removes the key of the given identity, so it is fetched again on the
+        next share.
+
+        :param str identity_id: the identity id
+        """
+        self.__cache.pop(identity_id)
+        self.__dirty = True
+
+    def clear(self):
+        """
+        Removes every key.
+        """
+        self.__cache.clear()
+        self.__dirty = True
+
+    def load(self):
+        """
+        Loads the keys saved to the file of this cache that have not
+        expired. A missing or unreadable file leaves the cache as it is.
+        """
+        try:
+            with open(self.__path) as f:
+                saved = json.load(f)["keys"]
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            return
+        now = self.__clock()
+        for identity_id, entry in saved.items():
+            try:
+                expires = entry["expires"]
+                if expires is not None and now >= expires:
+                    continue
+                public_key = crypto.deserialize_public_key(entry["key"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            self.__cache.put(identity_id, (public_key, entry["key"]),
+                             expires=expires)
+
+    def save(self):
+        """
+        Saves the keys to the file of this cache, replacing its contents
+        atomically. Does nothing if the cache has no file.
+        """
+        if self.__path is None:
+            return
+        with self.__save_lock:
+            self.__saved = self.__clock()
+            self.__dirty = False
+            keys = dict((identity_id, dict(key=encoded, expires=expires))
+                        for identity_id, (_, encoded), expires
+                        in self.__cache.entries())
+            directory = os.path.dirname(os.path.abspath(self.__path))
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(dict(version=1, keys=keys), f)
+                _replace(temp_path, self.__path)
+            except Exception:
+                _remove(temp_path)
+                raise
+
+    def close(self):
+        """
+        Saves any keys added since the last save.
+        """
+        if self.__dirty:
+            self.save()
+
+
+class SecretKeyCache(object):
+    """
+    Holds the unwrapped symmetric keys of secrets, so reading a secret again
+    costs only the AES-GCM decryption of its content rather than another RSA
+    decryption of its key.
+
+    Keys are held for at most ``ttl`` seconds, and the least recently used
+    keys are evicted beyond ``max_entries``. Each key is held in a
+    ``bytearray`` that is overwritten with zeros when it leaves the cache,
+    so it does not linger in memory once evicted. The cache is opt-in:
+
+    >>> client = Client(dict(key_store=key_store, api_client=api_client,
+    ...                      secret_key_cache=SecretKeyCache()))
+    """
+
+    def __init__(self, max_entries=1000, ttl=300.0, clock=time.time):
+        """
+        Creates a new empty cache.
+
+        :param int max_entries: the largest number of keys held
+        :param float ttl: the number of seconds a key is held for
+        :param clock: the function returning the current time in seconds
+        """
+        if ttl is None:
+            raise ValueError("ttl is required")
+        self.__lock = threading.Lock()
+        self.__cache = LruCache(max_entries, ttl=ttl, clock=clock,
+                                on_evict=SecretKeyCache.__zero)
+
+    @property
+    def metrics(self):
+        """
+        A snapshot of the hit and miss counts, hit rate, size, evictions and
+        expirations of the cache.
+
+        :rtype: dict[str, int | float]
+        """
+        return self.__cache.metrics
+
+    def get(self, identity_id, secret_id, wrapped_key):
+        """
+        Gets the unwrapped symmetric key of a secret.
+
+        :param str identity_id: the identity whose private key wraps the key
+        :param str secret_id: the secret id
+        :param str wrapped_key: the encrypted key encoded in base64
+        :return: the symmetric key, or None if it is not cached or expired
+        :rtype: bytes | None
+        """
+        with self.__lock:
+            buffer = self.__cache.get((identity_id, secret_id, wrapped_key))
+            # copied while locked, so the buffer cannot be zeroed underneath
+            return None if buffer is None else bytes(buffer)
+
+    def put(self, identity_id, secret_id, wrapped_key, secret_key):
+        """
+        Caches the unwrapped symmetric key of a secret.
+
+        :param str identity_id: the identity whose private key wraps the key
+        :param str secret_id: the secret id
+        :param str wrapped_key: the encrypted key encoded in base64
+        :param bytes secret_key: the unwrapped symmetric key
+        """
+        with self.__lock:
+            self.__cache.put((identity_id, secret_id, wrapped_key),
+                             bytearray(secret_key))
+
+    def clear(self):
+        """
+        Removes and zeroes every key.
+        """
+        with self.__lock:
+            self.__cache.clear()
+
+    @staticmethod
+    def __zero(_, buffer):
+        buffer[:] = b"\0" * len(buffer)
+
+
+class ContentCache(object):
+    """
+    Keeps the encrypted content of secrets on local disk, so repeated reads
+    of a secret skip the download. The content of a secret never changes
+    once created, and is useless without the private key of an identity it
+    is shared with, so it is safe to keep in a local directory.
+
+    Each secret is stored in a file named after the SHA-256 digest of its id.
+    The least recently read files are deleted once the cache grows beyond
+    ``max_bytes``. Cached content is memory-mapped rather than read, so large
+    secrets are decrypted straight from the page cache.
+
+    Reads served from the cache do not reach Delta, and so are not recorded
+    as access events:
+
+    >>> client = Client(dict(key_store=key_store, api_client=api_client,
+    ...                      content_cache=ContentCache("~/.delta/content")))
+    """
+
+    def __init__(self, directory, max_bytes=1024 ** 3):
+        """
+        Creates a cache in the given directory, keeping any content already
+        cached there.
+
+        :param str directory: the directory the content is stored in
+        :param int max_bytes: the largest total size of the cached content
+        """
+        self.__directory = os.path.expanduser(directory)
+        if not os.path.isdir(self.__directory):
+            os.makedirs(self.__directory)
+        self.__max_bytes = max_bytes
+        self.__lock = threading.Lock()
+        self.__files = OrderedDict()
+        self.__size = 0
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+        found = []
+        for name in os.listdir(self.__directory):
+            path = os.path.join(self.__directory, name)
+            if name.endswith(".tmp"):
+                # left behind by a write that did not complete
+                _remove(path)
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            found.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(found):
+            self.__files[name] = size
+            self.__size += size
+        self.__evict()
+
+    @property
+    def directory(self):
+        return self.__directory
+
+    @property
+    def max_bytes(self):
+        return self.__max_bytes
+
+    @property
+    def metrics(self):
+        """
+        A snapshot of the hit and miss counts, the hit rate, the number of
+        secrets and bytes cached, and the number of secrets evicted.
+
+        :rtype: dict[str, int | float]
+        """
+        with self.__lock:
+            lookups = self.__hits + self.__misses
+            return dict(hits=self.__hits,
+                        misses=self.__misses,
+                        hit_rate=self.__hits / lookups if lookups else 0.0,
+                        size=len(self.__files),
+                        bytes=self.__size,
+                        evictions=self.__evictions)
+
+    def get(self, secret_id):
+        """
+        Gets the encrypted content of a secret, memory-mapped from its file.
+
+        :param str secret_id: the secret id
+        :return: the encrypted content followed by its GCM authentication
+            tag, or None if the secret is not cached
+        :rtype: memoryview | None
+        """
+        name = self.__name(secret_id)
+        with self.__lock:
+            cached = name in self.__files
+            if not cached:
+                self.__misses += 1
+        if not cached:
+            return None
+
+        path = os.path.join(self.__directory, name)
+        try:
+            with open(path, "rb") as f:
+                # the mapping stays valid once the file is closed
+                content = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            os.utime(path, None)
+        except (IOError, OSError, ValueError):
+            # deleted by another process sharing the directory, or empty
+            with self.__lock:
+                self.__forget(name)
+                self.__misses += 1
+            return None
+
+        with self.__lock:
+            self.__hits += 1
+            if name in self.__files:
+                self.__files[name] = self.__files.pop(name)
+        try:
+            return memoryview(content)
+        except TypeError:
+            # python 2 maps do not support the buffer protocol
+            return memoryview(content[:])
+
+    def put(self, secret_id, content):
+        """
+        Caches the encrypted content of a secret.
+
+        :param str secret_id: the secret id
+        :param bytes content:
+            the encrypted content followed by its GCM authentication tag
+        """
+        if len(content) > self.__max_bytes:
+            return
+        fd, temp_path = tempfile.mkstemp(dir=self.__directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+        except Exception:
+            _remove(temp_path)
+            raise
+        self.__commit(secret_id, temp_path, len(content))
+
+    def tee(self, secret_id, chunks):
+        """
+        Caches the encrypted content of a secret as it is read, once every
+        chunk has been read. Nothing is cached if reading stops early.
+
+        :param str secret_id: the secret id
+        :param chunks: the encrypted content followed by its GCM
+            authentication tag, in chunks
+        :type chunks: collections.Iterable[bytes]
+        :return: the same chunks
+        :rtype: collections.Iterable[bytes]
+        """
+        fd, temp_path = tempfile.mkstemp(dir=self.__directory, suffix=".tmp")
+        committed = False
+        try:
+            size = 0
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    size += len(chunk)
+                    if size <= self.__max_bytes:
+                        f.write(chunk)
+                    yield chunk
+            if size <= self.__max_bytes:
+                self.__commit(secret_id, temp_path, size)
+                committed = True
+        finally:
+            if not committed:
+                _remove(temp_path)
+
+    def discard(self, secret_id):
+        """
+        Removes the content of a secret, such as when it was deleted or
+        failed authentication.
+
+        :param str secret_id: the secret id
+        """
+        name = self.__name(secret_id)
+        with self.__lock:
+            self.__forget(name)
+        _remove(os.path.join(self.__directory, name))
+
+    def clear(self):
+        """
+        Removes all cached content.
+        """
+        with self.__lock:
+            names = list(self.__files)
+            self.__files.clear()
+            self.__size = 0
+        for name in names:
+            _remove(os.path.join(self.__directory, name))
+
+    def __commit(self, secret_id, temp_path, size):
+        name = self.__name(secret_id)
+        _replace(temp_path, os.path.join(self.__directory, name))
+        with self.__lock:
+            self.__forget(name)
+            self.__files[name] = size
+            self.__size += size
+        self.__evict()
+
+    def __evict(self):
+        evicted = []
+        with self.__lock:
+            while self.__size > self.__max_bytes:
+                name, size = self.__files.popitem(last=False)
+                self.__size -= size
+                self.__evictions += 1
+                evicted.append(name)
+        for name in evicted:
+            _remove(os.path.join(self.__directory, name))
+
+    def __forget(self, name):
+        # must be called while holding the lock
+        size = self.__files.pop(name, None)
+        if size is not None:
+            self.__size -= size
+
+    @staticmethod
+    def __name(secret_id):
+        return hashlib.sha256(secret_id.encode("utf-8")).hexdigest()
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
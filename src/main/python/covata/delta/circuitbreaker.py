@@ -0,0 +1,288 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+from __future__ import absolute_import, division
+
+import threading
+import time
+from collections import deque
+
+from enum import Enum
+
+__all__ = ["CircuitState", "CircuitBreaker", "CircuitBreakerRegistry",
+           "CircuitOpenError"]
+
+
+class CircuitState(Enum):
+    """
+    Enumerates the states of a :class:`~.CircuitBreaker`.
+    """
+    closed = 1
+    """
+    Requests are sent and their outcomes recorded.
+    """
+
+    open = 2
+    """
+    Requests fail fast without being sent.
+    """
+
+    half_open = 3
+    """
+    A limited number of probe requests are sent to test for recovery.
+    """
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of sending a request while a :class:`~.CircuitBreaker` is
+    open. Callers may catch it to fall back to cached data.
+    """
+
+    def __init__(self, name, retry_after):
+        super(CircuitOpenError, self).__init__(
+            "circuit {} is open, retry in {:.1f}s".format(name, retry_after))
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker(object):
+    """
+    Fails requests fast once the error rate of an upstream endpoint crosses
+    a threshold, instead of signing and sending requests that are likely to
+    fail or time out.
+
+    The breaker opens when at least ``minimum_requests`` requests completed
+    within the last ``window`` seconds and the proportion of failures
+    reached ``failure_threshold``. After ``open_duration`` seconds it lets
+    ``half_open_probes`` requests through; if they all succeed the breaker
+    closes, otherwise it opens again.
+    """
+
+    def __init__(self, name=None, failure_threshold=0.5, minimum_requests=20,
+                 window=10.0, open_duration=30.0, half_open_probes=1,
+                 on_state_change=None, clock=time.time):
+        """
+        Creates a new, closed circuit breaker.
+
+        :param name: the name of the protected endpoint
+        :type name: str | None
+        :param float failure_threshold:
+            the proportion of failed requests that opens the breaker
+        :param int minimum_requests:
+            the number of requests in the window needed to open the breaker
+        :param float window: the number of seconds over which to measure
+        :param float open_duration:
+            the number of seconds the breaker stays open before probing
+        :param int half_open_probes:
+            the number of successful probes needed to close the breaker
+        :param on_state_change:
+            a function called with the breaker, the previous state and the
+            new state whenever the state changes
+        :type on_state_change:
+            ((:class:`~.CircuitBreaker`, :class:`~.CircuitState`,
+            :class:`~.CircuitState`) -> None) | None
+        :param clock: the function returning the current time in seconds
+        """
+        self.__lock = threading.RLock()
+        self.__name = name
+        self.__failure_threshold = failure_threshold
+        self.__minimum_requests = minimum_requests
+        self.__window = window
+        self.__open_duration = open_duration
+        self.__half_open_probes = half_open_probes
+        self.__on_state_change = on_state_change
+        self.__clock = clock
+        self.__state = CircuitState.closed
+        self.__opened = None
+        self.__buckets = deque()
+        self.__probes = 0
+        self.__probe_successes = 0
+        self.__rejections = 0
+
+    @property
+    def name(self):
+        return self.__name
+
+    @property
+    def state(self):
+        """
+        The current state of the breaker.
+
+        :rtype: :class:`~.CircuitState`
+        """
+        with self.__lock:
+            return self.__current_state()
+
+    @property
+    def metrics(self):
+        """
+        A snapshot of the state, the number of requests and failures in the
+        current window, and the number of requests rejected while open.
+
+        :rtype: dict[str, any]
+        """
+        with self.__lock:
+            total, failures = self.__counts(self.__clock())
+            return dict(state=self.__current_state().name,
+                        requests=total,
+                        failures=failures,
+                        rejections=self.__rejections)
+
+    def acquire(self):
+        """
+        Admits a request unless the breaker is open.
+
+        :raises CircuitOpenError: if the breaker is open, or half open with
+            all probes in flight
+        """
+        with self.__lock:
+            state = self.__current_state()
+            if state is CircuitState.closed:
+                return
+            if state is CircuitState.half_open and \
+                    self.__probes < self.__half_open_probes:
+                self.__probes += 1
+                return
+            self.__rejections += 1
+            retry_after = max(0.0, self.__opened + self.__open_duration -
+                              self.__clock())
+        raise CircuitOpenError(self.name, retry_after)
+
+    def release(self, failed):
+        """
+        Records the outcome of a request admitted by
+        :func:`~.CircuitBreaker.acquire`.
+
+        :param failed:
+            whether the request failed because the endpoint is unhealthy;
+            None if it failed for an unrelated reason and should not count
+        :type failed: bool | None
+        """
+        with self.__lock:
+            now = self.__clock()
+            state = self.__current_state()
+            if state is CircuitState.half_open:
+                self.__probes = max(0, self.__probes - 1)
+                if failed:
+                    self.__transition(CircuitState.open, now)
+                elif failed is not None:
+                    self.__probe_successes += 1
+                    if self.__probe_successes >= self.__half_open_probes:
+                        self.__transition(CircuitState.closed, now)
+                return
+            if failed is None or state is not CircuitState.closed:
+                return
+
+            self.__record(now, failed)
+            total, failures = self.__counts(now)
+            if total >= self.__minimum_requests and \
+                    failures >= total * self.__failure_threshold:
+                self.__transition(CircuitState.open, now)
+
+    def reset(self):
+        """
+        Closes the breaker and forgets the recorded outcomes.
+        """
+        with self.__lock:
+            self.__transition(CircuitState.closed, self.__clock())
+
+    def __current_state(self):
+        # type: () -> CircuitState
+        if self.__state is CircuitState.open and \
+                self.__clock() >= self.__opened + self.__open_duration:
+            self.__transition(CircuitState.half_open, self.__clock())
+        return self.__state
+
+    def __transition(self, state, now):
+        # type: (CircuitState, float) -> None
+        previous = self.__state
+        self.__state = state
+        self.__probes = 0
+        self.__probe_successes = 0
+        if state is CircuitState.open:
+            self.__opened = now
+        elif state is CircuitState.closed:
+            self.__buckets.clear()
+        if previous is not state and self.__on_state_change is not None:
+            self.__on_state_change(self, previous, state)
+
+    def __record(self, now, failed):
+        # type: (float, bool) -> None
+        second = int(now)
+        if not self.__buckets or self.__buckets[-1][0] != second:
+            self.__buckets.append([second, 0, 0])
+        bucket = self.__buckets[-1]
+        bucket[1] += 1
+        bucket[2] += 1 if failed else 0
+
+    def __counts(self, now):
+        # type: (float) -> (int, int)
+        while self.__buckets and self.__buckets[0][0] <= now - self.__window:
+            self.__buckets.popleft()
+        return (sum(bucket[1] for bucket in self.__buckets),
+                sum(bucket[2] for bucket in self.__buckets))
+
+
+class CircuitBreakerRegistry(object):
+    """
+    Creates and holds a :class:`~.CircuitBreaker` for each upstream host, or
+    each resource of each host, used by an :class:`~.ApiClient`:
+
+    >>> breakers = CircuitBreakerRegistry(open_duration=10)
+    >>> api_client = ApiClient(key_store, circuit_breakers=breakers)
+    >>> breakers.states()
+    {'delta.covata.io/secrets': <CircuitState.closed: 1>}
+    """
+
+    def __init__(self, per_resource=True, **breaker_options):
+        """
+        Creates a new registry.
+
+        :param bool per_resource:
+            whether each resource of a host, such as ``/secrets``, has its own
+            breaker rather than one breaker per host
+        :param breaker_options:
+            keyword arguments for each :class:`~.CircuitBreaker` created
+        """
+        self.__lock = threading.Lock()
+        self.__per_resource = per_resource
+        self.__breaker_options = breaker_options
+        self.__breakers = {}
+
+    def breaker(self, host, resource):
+        """
+        Gets the breaker protecting the given host and resource.
+
+        :param str host: the upstream host
+        :param str resource: the resource, such as ``/secrets``
+        :rtype: :class:`~.CircuitBreaker`
+        """
+        name = host + resource if self.__per_resource else host
+        with self.__lock:
+            breaker = self.__breakers.get(name)
+            if breaker is None:
+                breaker = self.__breakers[name] = CircuitBreaker(
+                    name, **self.__breaker_options)
+            return breaker
+
+    def states(self):
+        """
+        Gets the state of every breaker by name.
+
+        :rtype: dict[str, :class:`~.CircuitState`]
+        """
+        with self.__lock:
+            breakers = list(self.__breakers.values())
+        return dict((breaker.name, breaker.state) for breaker in breakers)
@@ -14,9 +14,20 @@
 
 from __future__ import absolute_import
 
+import mmap
+import os
+import tempfile
 from base64 import b64encode, b64decode
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from stat import S_ISREG
 
-from . import crypto
+from cryptography.exceptions import InvalidTag
+
+from . import crypto, utils
+from .columnar import event_columns
+from .deadline import Deadline
+from .reservoir import generate_private_key_der, load_private_key_der
+from .transport import CHUNK_SIZE
 from collections import namedtuple
 from datetime import datetime
 
@@ -39,11 +50,61 @@ class Client:
         """
         Creates a new DeltaClient instance from the provided configuration.
 
+        The optional ``timeout`` is the default time budget in seconds of
+        each operation, including every request, key store load and
+        cryptographic step it is made of. It defaults to the timeout of the
+        ``api_client``, so every request stays bounded; pass None for
+        operations without a time budget.
+
+        Independent steps of composite operations, such as the recipient
+        lookup and the content download of a share, run concurrently on the
+        ``executor``, a :class:`concurrent.futures.Executor` that defaults to
+        a thread pool of ``max_workers`` threads. Tasks running on the
+        executor must not wait for other tasks submitted to it. That thread
+        pool is shut down by :func:`close`, or on leaving the client as a
+        context manager; an executor given in the configuration is left to
+        its owner.
+
+        Secrets created or shared by the client are read back from Delta
+        unless ``read_after_write`` is False. They are then built from the
+        create response and the details known locally, and the creation date
+        is fetched on first access, saving a round trip per write.
+
+        Given a ``public_key_cache``, a :class:`~.PublicKeyCache`, the parsed
+        public keys of share recipients are reused while cached rather than
+        looked up on every share. A share may then wrap the secret key with a
+        recipient key up to the ``ttl`` of the cache old, so a rotated key is
+        only picked up once the cached one expires.
+
+        Given a ``secret_key_cache``, a :class:`~.SecretKeyCache`, the
+        symmetric keys of secrets are unwrapped once and reused while cached,
+        rather than decrypted with the private key on every read.
+
+        Given a ``content_cache``, a :class:`~.ContentCache`, the encrypted
+        content of secrets is kept on local disk once downloaded, and read
+        from there rather than downloaded again.
+
+        Given a ``key_reservoir``, a :class:`~.KeyReservoir`, new identities
+        take their key pairs from it, and only generate them when it has run
+        dry.
+
         :param config: the configuration for the client
         :type config: dict[str, any]
         """
         self.__key_store = config["key_store"]
         self.__api_client = config["api_client"]
+        self.__timeout = config["timeout"] if "timeout" in config \
+            else getattr(self.__api_client, "timeout", None)
+        self.__read_after_write = config.get("read_after_write", True)
+        self.__executor = config.get("executor")
+        self.__owns_executor = self.__executor is None
+        if self.__owns_executor:
+            self.__executor = ThreadPoolExecutor(
+                max_workers=config.get("max_workers", 8))
+        self.__public_key_cache = config.get("public_key_cache")
+        self.__secret_key_cache = config.get("secret_key_cache")
+        self.__content_cache = config.get("content_cache")
+        self.__key_reservoir = config.get("key_reservoir")
 
     @property
     def key_store(self):
@@ -53,7 +114,50 @@ class Client:
     def api_client(self):
         return self.__api_client
 
-    def create_identity(self, external_id=None, metadata=None):
+    @property
+    def timeout(self):
+        return self.__timeout
+
+    @property
+    def read_after_write(self):
+        return self.__read_after_write
+
+    @property
+    def executor(self):
+        return self.__executor
+
+    @property
+    def public_key_cache(self):
+        return self.__public_key_cache
+
+    @property
+    def secret_key_cache(self):
+        return self.__secret_key_cache
+
+    @property
+    def content_cache(self):
+        return self.__content_cache
+
+    @property
+    def key_reservoir(self):
+        return self.__key_reservoir
+
+    def close(self):
+        """
+        Shuts down the thread pool created by this client, waiting for the
+        tasks running on it. An executor given in the configuration is not
+        shut down.
+        """
+        if self.__owns_executor:
+            self.__executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def create_identity(self, external_id=None, metadata=None, deadline=None):
         """
         Creates a new identity in Delta.
 
@@ -61,11 +165,17 @@ class Client:
         :type external_id: str | None
         :param metadata: the metadata to associate with the identity
         :type metadata: dict[str, str] | None
+        :param deadline:
+            the deadline of the operation, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
         :return: the identity
         :rtype: :class:`~.Identity`
         """
-        private_signing_key = crypto.generate_private_key()
-        private_encryption_key = crypto.generate_private_key()
+        deadline = Deadline.of(deadline, self.timeout)
+        private_signing_key = self.__private_key()
+        private_encryption_key = self.__private_key()
+        deadline.check()
 
         public_signing_key = crypto.serialize_public_key(
             private_signing_key.public_key())
@@ -74,7 +184,8 @@ class Client:
 
         identity_id = self.api_client.register_identity(public_encryption_key,
                                                         public_signing_key,
-                                                        external_id, metadata)
+                                                        external_id, metadata,
+                                                        deadline=deadline)
 
         self.key_store.store_keys(identity_id=identity_id,
                                   private_signing_key=private_signing_key,
@@ -83,18 +194,163 @@ class Client:
         return Identity(self, identity_id, public_encryption_key,
                         external_id, metadata)
 
-    def get_identity(self, identity_id, identity_to_retrieve=None):
+    def create_identities(self, specs, workers=None, max_concurrency=8,
+                          batch_size=100, journal=None, deadline=None):
+        """
+        Creates many identities in Delta, such as when onboarding a fleet of
+        devices. The key pairs are generated by a pool of ``workers``
+        processes, up to ``max_concurrency`` identities are registered at a
+        time, and their keys are stored ``batch_size`` identities at a time
+        through :func:`~.DeltaKeyStore.store_keys_many`.
+
+        Given an :class:`~.IdentityJournal`, the progress of every identity
+        is recorded so that, if the call is interrupted, calling it again
+        with the same specs and journal completes the batch: identities whose
+        keys were stored are returned as they are, and identities that were
+        registered have their keys stored rather than being registered again.
+        An identity interrupted while being registered is registered again,
+        which may leave the first registration unused.
+
+        An identity that cannot be created does not stop the others: its
+        error is returned in its result.
+
+        :param specs: the external id and metadata of each identity, as
+            dictionaries with the optional keys ``external_id`` and
+            ``metadata``
+        :type specs: list[dict[str, any]]
+        :param workers: the number of processes generating key pairs, which
+            defaults to the number of processors
+        :type workers: int | None
+        :param int max_concurrency:
+            the number of identities registered at the same time
+        :param int batch_size: the number of identities whose keys are
+            stored together
+        :param journal: the journal recording the progress of the batch
+        :type journal: :class:`~.IdentityJournal` | None
+        :param deadline:
+            the deadline of the operation, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
+        :return: the result of each spec, in the order given
+        :rtype: list[:class:`~.ProvisionResult`]
+        """
+        deadline = Deadline.of(deadline, self.timeout)
+        specs = [spec or {} for spec in specs]
+        entries = {} if journal is None else journal.load()
+        for index, entry in entries.items():
+            if index >= len(specs) or \
+                    entry["external_id"] != specs[index].get("external_id"):
+                raise ValueError("the journal does not match the specs")
+        results = [None] * len(specs)
+
+        def register(index, private_signing_key, private_encryption_key):
+            spec = specs[index]
+            identity_id = self.api_client.register_identity(
+                crypto.serialize_public_key(
+                    private_encryption_key.public_key()),
+                crypto.serialize_public_key(private_signing_key.public_key()),
+                spec.get("external_id"), spec.get("metadata"),
+                deadline=deadline)
+            if journal is not None:
+                journal.registered(index, identity_id)
+            return index, identity_id, private_signing_key, \
+                private_encryption_key
+
+        def store(batch):
+            try:
+                self.key_store.store_keys_many(
+                    [(identity_id, signing_key, encryption_key)
+                     for _, identity_id, signing_key, encryption_key in batch])
+                stored = batch
+            except Exception:
+                # stored one at a time to tell which identities failed
+                stored = []
+                for item in batch:
+                    try:
+                        self.__store_keys_once(*item[1:])
+                        stored.append(item)
+                    except Exception as e:
+                        results[item[0]] = ProvisionResult(
+                            specs[item[0]], None, e)
+            if journal is not None and stored:
+                journal.stored([item[0] for item in stored])
+            for index, identity_id, _, private_encryption_key in stored:
+                results[index] = self.__provisioned(
+                    specs[index], identity_id, crypto.serialize_public_key(
+                        private_encryption_key.public_key()))
+            del batch[:]
+
+        registering = ThreadPoolExecutor(max_workers=max_concurrency)
+        generating = ProcessPoolExecutor(max_workers=workers)
+        registrations = []
+        unstored = []
+        new = [index for index in range(len(specs)) if index not in entries]
+        key_pairs = [(generating.submit(generate_private_key_der),
+                      generating.submit(generate_private_key_der))
+                     for _ in new]
+        try:
+            for index, entry in sorted(entries.items()):
+                keys = (entry["private_signing_key"],
+                        entry["private_encryption_key"])
+                if entry["stored"]:
+                    results[index] = self.__provisioned(
+                        specs[index], entry["identity_id"],
+                        entry["public_encryption_key"])
+                elif entry["identity_id"] is not None:
+                    unstored.append((index, entry["identity_id"]) + keys)
+                else:
+                    registrations.append(
+                        (index, registering.submit(register, index, *keys)))
+
+            for index, key_pair in zip(new, key_pairs):
+                try:
+                    keys = tuple(load_private_key_der(deadline.result(future))
+                                 for future in key_pair)
+                    if journal is not None:
+                        journal.generated(index, specs[index].get(
+                            "external_id"), *keys)
+                except Exception as e:
+                    results[index] = ProvisionResult(specs[index], None, e)
+                    continue
+                registrations.append(
+                    (index, registering.submit(register, index, *keys)))
+
+            for index, registration in registrations:
+                try:
+                    unstored.append(deadline.result(registration))
+                except Exception as e:
+                    results[index] = ProvisionResult(specs[index], None, e)
+                    continue
+                if len(unstored) >= batch_size:
+                    store(unstored)
+            if unstored:
+                store(unstored)
+        finally:
+            for key_pair in key_pairs:
+                for future in key_pair:
+                    future.cancel()
+            generating.shutdown(wait=True)
+            registering.shutdown(wait=False)
+        return results
+
+    def get_identity(self, identity_id, identity_to_retrieve=None,
+                     deadline=None):
         """
         Gets the identity matching the given identity id.
 
         :param str identity_id: the authenticating identity id
         :type identity_to_retrieve: str | None
+        :param deadline:
+            the deadline of the operation, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
         :return: the identity
         :rtype: :class:`~.Identity`
         """
         response = self.api_client.get_identity(
             identity_id,
-            identity_to_retrieve if identity_to_retrieve else identity_id)
+            identity_to_retrieve if identity_to_retrieve else identity_id,
+            deadline=Deadline.of(deadline, self.timeout))
 
         return Identity(self,
                         response["id"],
@@ -103,7 +359,7 @@ class Client:
                         response.get("metadata"))
 
     def get_identities_by_metadata(self, identity_id, metadata,
-                                   page=None, page_size=None):
+                                   page=None, page_size=None, deadline=None):
         """
         Gets a list of identities matching the given metadata key and value
         pairs, bound by the pagination parameters.
@@ -115,11 +371,16 @@ class Client:
         :type page: int | None
         :param page_size: the page size
         :type page_size: int | None
+        :param deadline:
+            the deadline of the operation, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
         :return: a list of :class:`~.Identity` objects satisfying the request
         :rtype: list[:class:`~.Identity`]
         """
         identities = self.api_client.get_identities_by_metadata(
-            identity_id, metadata, page, page_size)
+            identity_id, metadata, page, page_size, stream=True,
+            deadline=Deadline.of(deadline, self.timeout))
         for identity in identities:
             yield Identity(self,
                            identity["id"],
@@ -127,77 +388,189 @@ class Client:
                            identity.get("externalId"),
                            identity.get("metadata"))
 
-    def get_events(self, identity_id, secret_id=None, rsa_key_owner_id=None):
+    def get_events(self, identity_id, secret_id=None, rsa_key_owner_id=None,
+                   deadline=None):
         """
         Gets a list of events associated filtered by secret id or RSA key owner
         or both secret id and RSA key owner.
 
+        The events are parsed as the response arrives, so the first event is
+        yielded before the rest of the response is read, and memory use does
+        not grow with the number of events.
+
         :param str identity_id: the authenticating identity id
         :param secret_id: the secret id of interest
         :type secret_id: str | None
         :param rsa_key_owner_id: the rsa key owner id of interest
         :type rsa_key_owner_id: str | None
+        :param deadline:
+            the deadline of the operation, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
         :return: a list of audit events
         :rtype: list[:class:`~.Event`]
         """
         events = self.api_client.get_events(
-            identity_id, secret_id, rsa_key_owner_id)
+            identity_id, secret_id, rsa_key_owner_id, stream=True,
+            deadline=Deadline.of(deadline, self.timeout))
         for event in events:
-            details = event["eventDetails"]
-            timestamp = event["timestamp"]
-            yield Event(
-                event_details=EventDetails(
-                    base_secret_id=details.get("baseSecretId"),
-                    requestor_id=details.get("requesterId"),
-                    rsa_key_owner_id=details.get("rsaKeyOwnerId"),
-                    secret_id=details.get("secretId"),
-                    secret_owner_id=details.get("secretOwnerId")
-                ),
-                host=event["host"],
-                id=event["id"],
-                source_ip=event["sourceIp"],
-                timestamp=datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%S.%fZ"),
-                event_type=event["type"]
-            )
-
-    def create_secret(self, identity_id, content):
+            yield Event.from_response(event)
+
+    def get_events_columnar(self, identity_id, secret_id=None,
+                            rsa_key_owner_id=None, deadline=None):
+        """
+        Gets the events matching the same filters as
+        :func:`~.Client.get_events` as NumPy arrays, one per field, for
+        analysis with tools such as pandas. The columns are built from the
+        response as it arrives, without creating an :class:`~.Event` for
+        each entry.
+
+        Requires the optional ``numpy`` package.
+
+        :param str identity_id: the authenticating identity id
+        :param secret_id: the secret id of interest
+        :type secret_id: str | None
+        :param rsa_key_owner_id: the rsa key owner id of interest
+        :type rsa_key_owner_id: str | None
+        :param deadline:
+            the deadline of the operation, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
+        :return: the columns of the audit events
+        :rtype: :class:`~.EventColumns`
+        :raises ImportError: if numpy is not installed
+        """
+        events = self.api_client.get_events(
+            identity_id, secret_id, rsa_key_owner_id, stream=True,
+            deadline=Deadline.of(deadline, self.timeout))
+        return event_columns(events)
+
+    def create_secret(self, identity_id, content, deadline=None):
         """
         Creates a new secret in Delta with the given byte contents.
 
         :param str identity_id: the authenticating identity id
         :param bytes content: the secret contents
+        :param deadline:
+            the deadline of the operation, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
         :return: the secret
         :rtype: :class:`~.Secret`
         """
+        deadline = Deadline.of(deadline, self.timeout)
         secret_key = crypto.generate_secret_key()
         iv = crypto.generate_initialisation_vector()
 
         public_key = self.key_store.get_private_encryption_key(
             identity_id).public_key()
+        deadline.check()
 
         encrypted_key = crypto.encrypt_key_with_public_key(secret_key,
                                                            public_key)
         cipher_text, tag = crypto.encrypt(content, secret_key, iv)
+        deadline.check()
+        encryption_details = dict(
+            symmetricKey=b64encode(encrypted_key).decode('utf-8'),
+            initialisationVector=b64encode(iv).decode('utf-8'))
         response = self.api_client.create_secret(
             requestor_id=identity_id,
             content=b64encode(cipher_text + tag).decode('utf-8'),
-            encryption_details=dict(
-                symmetricKey=b64encode(encrypted_key).decode('utf-8'),
-                initialisationVector=b64encode(iv).decode('utf-8')
-            ))
+            encryption_details=encryption_details,
+            deadline=deadline)
 
-        return self.get_secret(identity_id, response["id"])
+        return self.__written_secret(response, identity_id, identity_id,
+                                     encryption_details, None, deadline)
 
-    def get_secret(self, identity_id, secret_id):
+    def create_secret_from_stream(self, identity_id, content,
+                                  chunk_size=CHUNK_SIZE, deadline=None):
+        """
+        Creates a new secret in Delta with contents read from a file-like
+        object or an iterable of byte chunks. The contents are encrypted and
+        uploaded incrementally, so the secret is never held in memory as a
+        whole.
+
+        Regular files are memory-mapped and read twice, once to compute the
+        request signature and once to upload. Other sources are read once and
+        their encrypted contents spooled to a temporary file.
+
+        :param str identity_id: the authenticating identity id
+        :param content: the secret contents
+        :type content: io.RawIOBase | collections.Iterable[bytes]
+        :param int chunk_size: the number of bytes to encrypt at a time
+        :param deadline:
+            the deadline of the operation, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
+        :return: the secret
+        :rtype: :class:`~.Secret`
+        """
+        deadline = Deadline.of(deadline, self.timeout)
+        secret_key = crypto.generate_secret_key()
+        iv = crypto.generate_initialisation_vector()
+
+        public_key = self.key_store.get_private_encryption_key(
+            identity_id).public_key()
+
+        encrypted_key = crypto.encrypt_key_with_public_key(secret_key,
+                                                           public_key)
+        encryption_details = dict(
+            symmetricKey=b64encode(encrypted_key).decode('utf-8'),
+            initialisationVector=b64encode(iv).decode('utf-8'))
+
+        def encrypted(chunks):
+            return utils.b64encode_stream(
+                crypto.encrypt_stream(chunks, secret_key, iv))
+
+        mapped = self.__mmap(content)
+        if mapped is not None:
+            contents, offset = mapped
+            try:
+                response = self.api_client.create_secret_from_stream(
+                    identity_id,
+                    lambda: encrypted(
+                        contents[i:i + chunk_size]
+                        for i in range(offset, len(contents), chunk_size)),
+                    encryption_details,
+                    deadline=deadline)
+            finally:
+                contents.close()
+        else:
+            chunks = content
+            if hasattr(content, "read"):
+                chunks = iter(lambda: content.read(chunk_size), b"")
+            with tempfile.TemporaryFile() as spool:
+                for chunk in encrypted(chunks):
+                    spool.write(chunk)
+                deadline.check()
+
+                def spooled():
+                    spool.seek(0)
+                    return iter(lambda: spool.read(chunk_size), b"")
+
+                response = self.api_client.create_secret_from_stream(
+                    identity_id, spooled, encryption_details,
+                    deadline=deadline)
+
+        return self.__written_secret(response, identity_id, identity_id,
+                                     encryption_details, None, deadline)
+
+    def get_secret(self, identity_id, secret_id, deadline=None):
         """
         Gets the given secret by id.
 
         :param str identity_id: the authenticating identity id
         :param str secret_id: the id of the secret to retrieve
+        :param deadline:
+            the deadline of the operation, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
         :return: the secret
         :rtype: :class:`~.Secret`
         """
-        response = self.api_client.get_secret(identity_id, secret_id)
+        response = self.api_client.get_secret(
+            identity_id, secret_id,
+            deadline=Deadline.of(deadline, self.timeout))
 
         return Secret(self,
                       response["id"],
@@ -210,7 +583,78 @@ class Client:
                       ),
                       response.get("baseSecretId"))
 
-    def get_secret_content_encrypted(self, identity_id, secret_id):
+    def secret_ref(self, identity_id, secret_id):
+        """
+        Gets a handle to the given secret without fetching it. The secret is
+        fetched when one of its fields is first accessed, or together with
+        other handles by :func:`~.Client.hydrate`; operations that only need
+        its id, such as sharing it, do not fetch it.
+
+        :param str identity_id: the authenticating identity id
+        :param str secret_id: the secret id
+        :return: the secret handle
+        :rtype: :class:`~.SecretRef`
+        """
+        return SecretRef(self, identity_id, secret_id)
+
+    def identity_ref(self, identity_id, requestor_id=None):
+        """
+        Gets a handle to the given identity without fetching it. The identity
+        is fetched when its public key, external id or metadata is first
+        accessed, or together with other handles by
+        :func:`~.Client.hydrate`.
+
+        :param str identity_id: the identity id
+        :param requestor_id: the authenticating identity id, which defaults to
+            the identity itself
+        :type requestor_id: str | None
+        :return: the identity handle
+        :rtype: :class:`~.IdentityRef`
+        """
+        return IdentityRef(self, identity_id, requestor_id)
+
+    def hydrate(self, refs, max_concurrency=8, deadline=None):
+        """
+        Fetches the secrets and identities of the given handles that have not
+        been fetched yet, up to ``max_concurrency`` at a time. Handles that
+        cannot be fetched are left as they are, and the first error is raised
+        once the others have been fetched.
+
+        :param refs: the handles
+        :type refs: list[:class:`~.SecretRef` | :class:`~.IdentityRef`]
+        :param int max_concurrency: the number of handles fetched at the same
+            time
+        :param deadline:
+            the deadline of the operation, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
+        :return: the handles
+        :rtype: list[:class:`~.SecretRef` | :class:`~.IdentityRef`]
+        """
+        deadline = Deadline.of(deadline, self.timeout)
+        refs = list(refs)
+        pending = [ref for ref in refs if not ref.hydrated]
+        if not pending:
+            return refs
+
+        def hydrate(ref):
+            try:
+                ref.hydrate(deadline=deadline)
+            except Exception as e:
+                return e
+
+        executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        try:
+            errors = [e for e in executor.map(hydrate, pending)
+                      if e is not None]
+        finally:
+            executor.shutdown(wait=False)
+        if errors:
+            raise errors[0]
+        return refs
+
+    def get_secret_content_encrypted(self, identity_id, secret_id,
+                                     deadline=None):
         """
         Gets the base64 encoded encrypted content given the secret id.
 
@@ -221,13 +665,19 @@ class Client:
 
         :param str identity_id: the authenticating identity id
         :param str secret_id: the secret id
+        :param deadline:
+            the deadline of the operation, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
         :return: the encrypted content encoded in base64
         :rtype: str
         """
-        return self.api_client.get_secret_content(identity_id, secret_id)
+        return self.api_client.get_secret_content(
+            identity_id, secret_id,
+            deadline=Deadline.of(deadline, self.timeout))
 
     def get_secret_content(self, identity_id, secret_id, symmetric_key,
-                           initialisation_vector):
+                           initialisation_vector, deadline=None):
         """
         Gets the plaintext content, given the symmetric key and
         initialisation vector used for encryption.
@@ -238,78 +688,199 @@ class Client:
             the symmetric key used for encryption encoded in base64
         :param str initialisation_vector:
             the initialisation vector encoded in base64
+        :param deadline:
+            the deadline of the operation, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
         :return: the plaintext content of the secret
         :rtype: bytes
         """
-        encrypted_content = b64decode(
-            self.get_secret_content_encrypted(identity_id, secret_id))
+        deadline = Deadline.of(deadline, self.timeout)
+        encrypted_content = self.__encrypted_content(identity_id, secret_id,
+                                                     deadline)
 
-        decrypted_key = crypto.decrypt_with_private_key(
-            b64decode(symmetric_key),
-            self.key_store.get_private_encryption_key(identity_id))
+        decrypted_key = self.__unwrap_key(identity_id, secret_id,
+                                          symmetric_key)
+        deadline.check()
 
-        return crypto.decrypt(encrypted_content[:-16],
-                              encrypted_content[-16:],
-                              decrypted_key,
+        return self.__decrypt(secret_id, encrypted_content, decrypted_key,
                               b64decode(initialisation_vector))
 
-    def share_secret(self, identity_id, recipient_id, secret_id):
+    def get_secret_content_into(self, identity_id, secret_id, symmetric_key,
+                                initialisation_vector, output,
+                                deadline=None):
+        """
+        Downloads, decodes and decrypts the content of a secret incrementally,
+        writing the plaintext to the given output as it arrives. Memory use
+        stays constant regardless of the size of the secret.
+
+        The GCM authentication tag is verified once the whole content has
+        been read. If verification fails, :class:`InvalidTag` is raised and
+        everything written to the output must be discarded.
+
+        :param str identity_id: the authenticating identity id
+        :param str secret_id: the secret id
+        :param str symmetric_key:
+            the symmetric key used for encryption encoded in base64
+        :param str initialisation_vector:
+            the initialisation vector encoded in base64
+        :param output: a writable file-like object or a bytearray to extend
+        :type output: io.RawIOBase | bytearray
+        :param deadline:
+            the deadline of the operation, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
+        :return: the number of plaintext bytes written
+        :rtype: int
+        """
+        deadline = Deadline.of(deadline, self.timeout)
+        decrypted_key = self.__unwrap_key(identity_id, secret_id,
+                                          symmetric_key)
+        deadline.check()
+
+        cache = self.content_cache
+        cached = None if cache is None else cache.get(secret_id)
+        if cached is not None:
+            encrypted_content = (cached[i:i + CHUNK_SIZE]
+                                 for i in range(0, len(cached), CHUNK_SIZE))
+        else:
+            encrypted_content = utils.b64decode_stream(
+                self.api_client.get_secret_content(identity_id, secret_id,
+                                                   stream=True,
+                                                   deadline=deadline))
+            if cache is not None:
+                encrypted_content = cache.tee(secret_id, encrypted_content)
+
+        write = output.extend if isinstance(output, bytearray) \
+            else output.write
+        written = 0
+        try:
+            for chunk in crypto.decrypt_stream(
+                    encrypted_content, decrypted_key,
+                    b64decode(initialisation_vector)):
+                write(chunk)
+                written += len(chunk)
+        except InvalidTag:
+            if cache is not None:
+                cache.discard(secret_id)
+            raise
+        return written
+
+    def share_secret(self, identity_id, recipient_id, secret_id,
+                     deadline=None):
         """
         Shares the base secret with the specified recipient. The contents will
         be encrypted with the public encryption key of the RSA key owner, and a
         new secret key and initialisation vector will be generated. This call
         will result in a new derived secret being created and returned.
 
+        With a ``public_key_cache`` configured, the public key of a recent
+        recipient is taken from the cache, and may be up to the ``ttl`` of
+        the cache old.
+
         :param str identity_id: the authenticating identity id
         :param str recipient_id: the target identity id to share the base secret
         :param str secret_id: the base secret id
+        :param deadline:
+            the deadline of the operation, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
         :return: the derived secret
         :rtype: :class:`~.Secret`
         """
-        recipient = self.get_identity(identity_id, recipient_id)
-        secret = self.get_secret(identity_id, secret_id)
-
+        deadline = Deadline.of(deadline, self.timeout)
         secret_key = crypto.generate_secret_key()
-        iv = crypto.generate_initialisation_vector()
-
-        public_key = crypto.deserialize_public_key(
-            recipient.public_encryption_key)
-
-        encrypted_key = crypto.encrypt_key_with_public_key(secret_key,
-                                                           public_key)
-        cipher_text, tag = crypto.encrypt(secret.get_content(), secret_key, iv)
-        response = self.api_client.share_secret(
-            requestor_id=identity_id,
-            content=b64encode(cipher_text + tag).decode('utf-8'),
-            encryption_details=dict(
-                symmetricKey=b64encode(encrypted_key).decode('utf-8'),
-                initialisationVector=b64encode(iv).decode('utf-8')),
-            base_secret_id=secret.id,
-            rsa_key_owner_id=recipient.id)
+        # the recipient lookup does not depend on the base secret, so it runs
+        # while the base secret is fetched and decrypted
+        wrapped = self.executor.submit(self.__wrap_secret_key, identity_id,
+                                       recipient_id, secret_key, deadline)
+        secret, content = self.__base_content(identity_id, secret_id, deadline)
+        rsa_key_owner_id, encrypted_key = deadline.result(wrapped)
+        return self.__share_content(identity_id, secret, content,
+                                    rsa_key_owner_id, secret_key,
+                                    encrypted_key, deadline)
+
+    def share_secret_with_many(self, identity_id, secret_id, recipient_ids,
+                               max_concurrency=8, deadline=None):
+        """
+        Shares the base secret with each of the specified recipients,
+        creating a derived secret per recipient. The base secret is
+        downloaded and decrypted once; it is then encrypted and shared with
+        up to ``max_concurrency`` recipients at a time.
 
-        return self.get_secret(recipient.id, response["id"])
+        A recipient that cannot be shared with does not stop the others: its
+        error is returned in its result. Errors fetching or decrypting the
+        base secret are raised.
 
-    def delete_secret(self, identity_id, secret_id):
+        :param str identity_id: the authenticating identity id
+        :param str secret_id: the base secret id
+        :param recipient_ids: the target identity ids
+        :type recipient_ids: list[str]
+        :param int max_concurrency:
+            the number of recipients shared with at the same time
+        :param deadline:
+            the deadline of the operation, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
+        :return: the result of each recipient, in the order given
+        :rtype: list[:class:`~.ShareResult`]
+        """
+        deadline = Deadline.of(deadline, self.timeout)
+        secret, content = self.__base_content(identity_id, secret_id, deadline)
+
+        def share(recipient_id):
+            try:
+                secret_key = crypto.generate_secret_key()
+                rsa_key_owner_id, encrypted_key = self.__wrap_secret_key(
+                    identity_id, recipient_id, secret_key, deadline)
+                return ShareResult(recipient_id, self.__share_content(
+                    identity_id, secret, content, rsa_key_owner_id, secret_key,
+                    encrypted_key, deadline), None)
+            except Exception as e:
+                return ShareResult(recipient_id, None, e)
+
+        executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        try:
+            return list(executor.map(share, recipient_ids))
+        finally:
+            executor.shutdown(wait=False)
+
+    def delete_secret(self, identity_id, secret_id, deadline=None):
         """
         Deletes the secret with the given secret id.
 
         :param str identity_id: the authenticating identity id
         :param str secret_id: the secret id
+        :param deadline:
+            the deadline of the operation, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
         """
-        self.api_client.delete_secret(identity_id, secret_id)
+        self.api_client.delete_secret(
+            identity_id, secret_id,
+            deadline=Deadline.of(deadline, self.timeout))
+        if self.content_cache is not None:
+            self.content_cache.discard(secret_id)
 
-    def get_secret_metadata(self, identity_id, secret_id):
+    def get_secret_metadata(self, identity_id, secret_id, deadline=None):
         """
         Gets the metadata key and value pairs for the given secret.
 
         :param str identity_id: the authenticating identity id
         :param str secret_id: the secret id to be retrieved
+        :param deadline:
+            the deadline of the operation, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
         :return: the retrieved secret metadata dictionary and version tuple
         :rtype: (dict[str, str], int)
         """
-        return self.api_client.get_secret_metadata(identity_id, secret_id)
+        return self.api_client.get_secret_metadata(
+            identity_id, secret_id,
+            deadline=Deadline.of(deadline, self.timeout))
 
-    def add_secret_metadata(self, identity_id, secret_id, version, metadata):
+    def add_secret_metadata(self, identity_id, secret_id, version, metadata,
+                            deadline=None):
         """
         Adds metadata to the given secret. The version number is required for
         optimistic locking on concurrent updates. An attempt to update metadata
@@ -323,18 +894,178 @@ class Client:
         :type version: long
         :param metadata: a map of metadata key and value pairs
         :type metadata: dict[str, str]
+        :param deadline:
+            the deadline of the operation, or its time budget in seconds;
+            defaults to the timeout of this client
+        :type deadline: :class:`~.Deadline` | float | None
         """
+        deadline = Deadline.of(deadline, self.timeout)
         existing_metadata, existing_version = \
-            self.get_secret_metadata(identity_id, secret_id)
+            self.get_secret_metadata(identity_id, secret_id,
+                                     deadline=deadline)
 
         updated_metadata = existing_metadata.copy()
         updated_metadata.update(metadata)
 
         self.api_client.update_secret_metadata(identity_id, secret_id,
-                                               updated_metadata, version)
+                                               updated_metadata, version,
+                                               deadline=deadline)
+
+    @staticmethod
+    def __mmap(content):
+        # type: (any) -> (mmap.mmap, int) | None
+        try:
+            fileno = content.fileno()
+            offset = content.tell()
+        except (AttributeError, IOError, OSError, ValueError):
+            return None
+        stat = os.fstat(fileno)
+        if not S_ISREG(stat.st_mode) or stat.st_size <= offset:
+            return None
+        return mmap.mmap(fileno, 0, access=mmap.ACCESS_READ), offset
+
+    def __base_content(self, identity_id, secret_id, deadline):
+        # type: (str, str, Deadline) -> (Secret, bytes)
+        # the content download does not depend on the secret descriptor, so
+        # it runs while the descriptor is fetched and its key unwrapped
+        downloaded = self.executor.submit(
+            self.__encrypted_content, identity_id, secret_id, deadline)
+
+        secret = self.get_secret(identity_id, secret_id, deadline=deadline)
+        base_key = self.__unwrap_key(secret.rsa_key_owner, secret.id,
+                                     secret.encryption_details.symmetric_key)
+        deadline.check()
+
+        return secret, self.__decrypt(
+            secret_id, deadline.result(downloaded), base_key,
+            b64decode(secret.encryption_details.initialisation_vector))
+
+    def __encrypted_content(self, identity_id, secret_id, deadline):
+        # type: (str, str, Deadline) -> bytes | memoryview
+        cache = self.content_cache
+        if cache is not None:
+            encrypted_content = cache.get(secret_id)
+            if encrypted_content is not None:
+                return encrypted_content
+        encrypted_content = b64decode(
+            self.get_secret_content_encrypted(identity_id, secret_id,
+                                              deadline=deadline))
+        if cache is not None:
+            cache.put(secret_id, encrypted_content)
+        return encrypted_content
+
+    def __decrypt(self, secret_id, encrypted_content, secret_key,
+                  initialisation_vector):
+        # type: (str, bytes | memoryview, bytes, bytes) -> bytes
+        try:
+            return crypto.decrypt(encrypted_content[:-16],
+                                  bytes(encrypted_content[-16:]),
+                                  secret_key, initialisation_vector)
+        except InvalidTag:
+            # a corrupt download must not be served from the cache again
+            if self.content_cache is not None:
+                self.content_cache.discard(secret_id)
+            raise
+
+    def __private_key(self):
+        # type: () -> rsa.RSAPrivateKey
+        reservoir = self.key_reservoir
+        private_key = None if reservoir is None else reservoir.take()
+        return crypto.generate_private_key() if private_key is None \
+            else private_key
+
+    def __store_keys_once(self, identity_id, private_signing_key,
+                          private_encryption_key):
+        # type: (str, rsa.RSAPrivateKey, rsa.RSAPrivateKey) -> None
+        try:
+            self.key_store.store_keys(identity_id, private_signing_key,
+                                      private_encryption_key)
+        except Exception:
+            # the keys may have been stored before an interruption
+            try:
+                stored_key = self.key_store.get_private_signing_key(
+                    identity_id)
+            except Exception:
+                stored_key = None
+            if stored_key is None or stored_key.private_numbers() != \
+                    private_signing_key.private_numbers():
+                raise
+
+    def __provisioned(self, spec, identity_id, public_encryption_key):
+        # type: (dict, str, str) -> ProvisionResult
+        return ProvisionResult(spec, Identity(
+            self, identity_id, public_encryption_key,
+            spec.get("external_id"), spec.get("metadata")), None)
+
+    def __unwrap_key(self, identity_id, secret_id, symmetric_key):
+        # type: (str, str, str) -> bytes
+        cache = self.secret_key_cache
+        if cache is not None:
+            secret_key = cache.get(identity_id, secret_id, symmetric_key)
+            if secret_key is not None:
+                return secret_key
+        secret_key = crypto.decrypt_with_private_key(
+            b64decode(symmetric_key),
+            self.key_store.get_private_encryption_key(identity_id))
+        if cache is not None:
+            cache.put(identity_id, secret_id, symmetric_key, secret_key)
+        return secret_key
+
+    def __wrap_secret_key(self, identity_id, recipient_id, secret_key,
+                          deadline):
+        # type: (str, str, bytes, Deadline) -> (str, bytes)
+        cache = self.public_key_cache
+        public_key = None if cache is None else cache.get(recipient_id)
+        if public_key is None:
+            recipient = self.get_identity(identity_id, recipient_id,
+                                          deadline=deadline)
+            public_key = crypto.deserialize_public_key(
+                recipient.public_encryption_key) if cache is None \
+                else cache.put(recipient_id, recipient.public_encryption_key)
+            recipient_id = recipient.id
+        return recipient_id, crypto.encrypt_key_with_public_key(secret_key,
+                                                                public_key)
+
+    def __share_content(self, identity_id, secret, content, rsa_key_owner_id,
+                        secret_key, encrypted_key, deadline):
+        # type: (str, Secret, bytes, str, bytes, bytes, Deadline) -> \
+        #     Secret
+        iv = crypto.generate_initialisation_vector()
+        cipher_text, tag = crypto.encrypt(content, secret_key, iv)
+        deadline.check()
 
+        encryption_details = dict(
+            symmetricKey=b64encode(encrypted_key).decode('utf-8'),
+            initialisationVector=b64encode(iv).decode('utf-8'))
+        response = self.api_client.share_secret(
+            requestor_id=identity_id,
+            content=b64encode(cipher_text + tag).decode('utf-8'),
+            encryption_details=encryption_details,
+            base_secret_id=secret.id,
+            rsa_key_owner_id=rsa_key_owner_id,
+            deadline=deadline)
+
+        return self.__written_secret(response, identity_id, rsa_key_owner_id,
+                                     encryption_details, secret.id, deadline)
+
+    def __written_secret(self, response, created_by, rsa_key_owner,
+                         encryption_details, base_secret_id, deadline):
+        # type: (dict, str, str, dict, str, Deadline) -> Secret
+        if self.read_after_write:
+            return self.get_secret(rsa_key_owner, response["id"],
+                                   deadline=deadline)
+        return Secret(self,
+                      response["id"],
+                      response.get("created"),
+                      rsa_key_owner,
+                      created_by,
+                      EncryptionDetails(
+                          encryption_details["symmetricKey"],
+                          encryption_details["initialisationVector"]),
+                      base_secret_id)
 
-class Identity:
+
+class Identity(object):
     """
     An instance of this class encapsulates an identity in Covata Delta. An
     identity can be a user, application, device or any other identifiable
@@ -345,6 +1076,9 @@ class Identity:
     and a reference to an identifier in an external system.
     """
 
+    __slots__ = ("__parent", "__id", "__public_encryption_key",
+                 "__external_id", "__metadata")
+
     def __init__(self, parent, id, public_encryption_key,
                  external_id, metadata):
         """
@@ -437,6 +1171,19 @@ class Identity:
         """
         return self.parent.create_secret(self.id, content)
 
+    def create_secret_from_stream(self, content):
+        """
+        Creates a new secret in Delta with contents read from a file-like
+        object or an iterable of byte chunks, without holding the contents
+        in memory.
+
+        :param content: the secret contents
+        :type content: io.RawIOBase | collections.Iterable[bytes]
+        :return: the secret
+        :rtype: :class:`~.Secret`
+        """
+        return self.parent.create_secret_from_stream(self.id, content)
+
     def retrieve_secret(self, secret_id):
         """
         Retrieves a secret with this identity.
@@ -459,7 +1206,69 @@ class Identity:
         return "{cls}(id={id})".format(cls=self.__class__.__name__, id=self.id)
 
 
-class Secret:
+class IdentityRef(Identity):
+    """
+    A handle to an identity that is fetched from Delta only when its public
+    key, external id or metadata is first accessed. Operations performed as
+    the identity, such as creating or retrieving secrets, only need its id
+    and do not fetch it.
+    """
+
+    __slots__ = ("__requestor_id", "__identity")
+
+    def __init__(self, parent, id, requestor_id=None):
+        """
+        Creates a handle to the given identity.
+
+        :param parent: the Delta client that constructed this instance
+        :type parent: :class:`~.Client`
+        :param str id: the id of the identity
+        :param requestor_id: the authenticating identity id, which defaults to
+            the identity itself
+        :type requestor_id: str | None
+        """
+        Identity.__init__(self, parent, id, None, None, None)
+        self.__requestor_id = requestor_id or id
+        self.__identity = None
+
+    @property
+    def requestor_id(self):
+        return self.__requestor_id
+
+    @property
+    def hydrated(self):
+        return self.__identity is not None
+
+    @property
+    def public_encryption_key(self):
+        return self.hydrate().__identity.public_encryption_key
+
+    @property
+    def external_id(self):
+        return self.hydrate().__identity.external_id
+
+    @property
+    def metadata(self):
+        return self.hydrate().__identity.metadata
+
+    def hydrate(self, deadline=None):
+        """
+        Fetches the identity, if it has not been fetched yet.
+
+        :param deadline:
+            the deadline of the operation, or its time budget in seconds;
+            defaults to the timeout of the client
+        :type deadline: :class:`~.Deadline` | float | None
+        :return: this handle
+        :rtype: :class:`~.IdentityRef`
+        """
+        if self.__identity is None:
+            self.__identity = self.parent.get_identity(
+                self.requestor_id, self.id, deadline=deadline)
+        return self
+
+
+class Secret(object):
     """
     An instance of this class encapsulates a secret in Covata Delta. A
     secret has contents, which is encrypted by a symmetric key algorithm as
@@ -470,6 +1279,9 @@ class Secret:
     returned as a result of Client.
     """
 
+    __slots__ = ("__parent", "__id", "__created", "__rsa_key_owner",
+                 "__created_by", "__encryption_details", "__base_secret_id")
+
     def __init__(self, parent, id, created, rsa_key_owner, created_by,
                  encryption_details, base_secret_id=None):
         """
@@ -478,7 +1290,9 @@ class Secret:
         :param parent: the Delta client that constructed this instance
         :type parent: :class:`~.Client`
         :param str id: the id of the secret
-        :param str created: the created date
+        :param created:
+            the created date, or None to fetch it when first accessed
+        :type created: str | None
         :param str rsa_key_owner: the identity id of the RSA key owner
         :param str created_by: the identity id of the secret creator
         :param encryption_details: the encryption details of the secret
@@ -487,10 +1301,10 @@ class Secret:
         self.__parent = parent
         self.__id = id
         self.__created = created
-        self.__rsa_key_owner = rsa_key_owner
-        self.__created_by = created_by
+        self.__rsa_key_owner = utils.intern_id(rsa_key_owner)
+        self.__created_by = utils.intern_id(created_by)
         self.__encryption_details = encryption_details
-        self.__base_secret_id = base_secret_id
+        self.__base_secret_id = utils.intern_id(base_secret_id)
 
     @property
     def parent(self):
@@ -502,6 +1316,15 @@ class Secret:
 
     @property
     def created(self):
+        """
+        The created date, fetched from Delta on first access if the secret
+        was built without it.
+
+        :rtype: str
+        """
+        if self.__created is None:
+            self.__created = self.parent.get_secret(self.rsa_key_owner,
+                                                    self.id).created
         return self.__created
 
     @property
@@ -534,6 +1357,23 @@ class Secret:
             self.encryption_details.symmetric_key,
             self.encryption_details.initialisation_vector)
 
+    def get_content_into(self, output):
+        """
+        Streams the decrypted content of this secret into the given output
+        without holding the whole secret in memory.
+
+        :param output: a writable file-like object or a bytearray to extend
+        :type output: io.RawIOBase | bytearray
+        :return: the number of plaintext bytes written
+        :rtype: int
+        """
+        return self.parent.get_secret_content_into(
+            self.rsa_key_owner,
+            self.id,
+            self.encryption_details.symmetric_key,
+            self.encryption_details.initialisation_vector,
+            output)
+
     def share_with(self, identity_id):
         """
         Shares this secret with the target recipient identity. This action
@@ -552,6 +1392,28 @@ class Secret:
             identity_id,
             self.id)
 
+    def share_with_many(self, identity_ids, max_concurrency=8):
+        """
+        Shares this secret with each of the target recipient identities,
+        decrypting its content once. See
+        :func:`~.Client.share_secret_with_many`.
+
+        The credentials of the RSA key owner must be present in the local
+        key store.
+
+        :param identity_ids: the recipient identity ids
+        :type identity_ids: list[str]
+        :param int max_concurrency:
+            the number of recipients shared with at the same time
+        :return: the result of each recipient, in the order given
+        :rtype: list[:class:`~.ShareResult`]
+        """
+        return self.parent.share_secret_with_many(
+            self.created_by,
+            self.id,
+            identity_ids,
+            max_concurrency)
+
     def get_events(self, rsa_key_owner_id=None):
         """
         Gets a list of events associated filtered by this secret id or
@@ -586,13 +1448,101 @@ class Secret:
         return "{cls}(id={id})".format(cls=self.__class__.__name__, id=self.id)
 
 
-class EncryptionDetails:
+class SecretRef(Secret):
+    """
+    A handle to a secret that is fetched from Delta only when one of its
+    fields is first accessed. Operations that only need the id of the
+    secret, such as sharing it or reading its metadata and events, are
+    performed as the identity the handle was created for and do not fetch
+    it.
+    """
+
+    __slots__ = ("__identity_id", "__secret")
+
+    def __init__(self, parent, identity_id, id):
+        """
+        Creates a handle to the given secret.
+
+        :param parent: the Delta client that constructed this instance
+        :type parent: :class:`~.Client`
+        :param str identity_id: the authenticating identity id
+        :param str id: the id of the secret
+        """
+        Secret.__init__(self, parent, id, None, None, None, None)
+        self.__identity_id = identity_id
+        self.__secret = None
+
+    @property
+    def identity_id(self):
+        return self.__identity_id
+
+    @property
+    def hydrated(self):
+        return self.__secret is not None
+
+    @property
+    def created(self):
+        return self.hydrate().__secret.created
+
+    @property
+    def rsa_key_owner(self):
+        return self.hydrate().__secret.rsa_key_owner
+
+    @property
+    def created_by(self):
+        return self.hydrate().__secret.created_by
+
+    @property
+    def encryption_details(self):
+        return self.hydrate().__secret.encryption_details
+
+    @property
+    def base_secret_id(self):
+        return self.hydrate().__secret.base_secret_id
+
+    def hydrate(self, deadline=None):
+        """
+        Fetches the secret, if it has not been fetched yet.
+
+        :param deadline:
+            the deadline of the operation, or its time budget in seconds;
+            defaults to the timeout of the client
+        :type deadline: :class:`~.Deadline` | float | None
+        :return: this handle
+        :rtype: :class:`~.SecretRef`
+        """
+        if self.__secret is None:
+            self.__secret = self.parent.get_secret(
+                self.identity_id, self.id, deadline=deadline)
+        return self
+
+    def share_with(self, identity_id):
+        return self.parent.share_secret(self.identity_id, identity_id,
+                                        self.id)
+
+    def share_with_many(self, identity_ids, max_concurrency=8):
+        return self.parent.share_secret_with_many(
+            self.identity_id, self.id, identity_ids, max_concurrency)
+
+    def get_events(self, rsa_key_owner_id=None):
+        return self.parent.get_events(self.identity_id, self.id,
+                                      rsa_key_owner_id)
+
+    def get_metadata(self):
+        metadata, version = self.parent.get_secret_metadata(self.identity_id,
+                                                            self.id)
+        return metadata
+
+
+class EncryptionDetails(object):
     """
     This class holds the necessary key materials required to decrypt a
     particular secret. The symmetric key itself is protected by a public
     encryption key belonging to an identity.
     """
 
+    __slots__ = ("__symmetric_key", "__initialisation_vector")
+
     def __init__(self, symmetric_key, initialisation_vector):
         """
         Creates a new encryption details with the given parameters.
@@ -625,6 +1575,8 @@ class EventDetails(namedtuple("EventDetails", [
     RSA key owner id are also available for derived secrets.
     """
 
+    __slots__ = ()
+
     def __init__(self, base_secret_id, requestor_id, rsa_key_owner_id,
                  secret_id, secret_owner_id):
         """
@@ -639,13 +1591,23 @@ class EventDetails(namedtuple("EventDetails", [
         super(EventDetails, self).__init__()
 
 
-class Event:
+class Event(object):
     """
     An instance of this class encapsulates an event in Covata Delta. An
     event is an audit entry representing an action undertaken by an
     identity on a secret.
+
+    Events returned by :func:`~.Client.get_events` keep the entry as it was
+    received and decode each field when it is first accessed, so scanning
+    many events for a few fields does not pay for decoding the rest. The
+    timestamp is parsed into microseconds since the epoch, and converted to
+    a datetime only when :attr:`timestamp` is accessed.
     """
 
+    __slots__ = ("__event_details", "__host", "__id", "__source_ip",
+                 "__timestamp", "__timestamp_us", "__event_type",
+                 "__response")
+
     def __init__(self,
                  event_details,
                  host,
@@ -670,31 +1632,116 @@ class Event:
         self.__id = id
         self.__source_ip = source_ip
         self.__timestamp = timestamp
+        self.__timestamp_us = None
         self.__event_type = event_type
+        self.__response = None
+
+    @classmethod
+    def from_response(cls, response):
+        """
+        Creates an event from an audit entry returned by Delta, decoding its
+        fields when they are accessed.
+
+        :param response: the audit entry
+        :type response: dict[str, any]
+        :rtype: :class:`~.Event`
+        """
+        event = cls.__new__(cls)
+        event.__event_details = None
+        event.__timestamp = None
+        event.__timestamp_us = None
+        event.__response = response
+        return event
 
     @property
     def event_details(self):
+        if self.__event_details is None and self.__response is not None:
+            details = self.__response["eventDetails"]
+            intern_id = utils.intern_id
+            self.__event_details = EventDetails(
+                base_secret_id=intern_id(details.get("baseSecretId")),
+                requestor_id=intern_id(details.get("requesterId")),
+                rsa_key_owner_id=intern_id(details.get("rsaKeyOwnerId")),
+                secret_id=intern_id(details.get("secretId")),
+                secret_owner_id=intern_id(details.get("secretOwnerId")))
         return self.__event_details
 
     @property
     def host(self):
+        if self.__response is not None:
+            return self.__response["host"]
         return self.__host
 
     @property
     def id(self):
+        if self.__response is not None:
+            return self.__response["id"]
         return self.__id
 
     @property
     def source_ip(self):
+        if self.__response is not None:
+            return self.__response["sourceIp"]
         return self.__source_ip
 
     @property
     def timestamp(self):
+        """
+        The timestamp of the event, as a naive datetime in UTC.
+
+        :rtype: datetime
+        """
+        if self.__timestamp is None and self.__response is not None:
+            self.__timestamp = utils.timestamp_to_datetime(self.timestamp_us)
         return self.__timestamp
 
+    @property
+    def timestamp_us(self):
+        """
+        The timestamp of the event, as the number of microseconds since the
+        epoch.
+
+        :rtype: int
+        """
+        if self.__timestamp_us is None:
+            if self.__response is not None:
+                self.__timestamp_us = utils.parse_timestamp(
+                    self.__response["timestamp"])
+            elif self.__timestamp is not None:
+                delta = self.__timestamp - datetime(1970, 1, 1)
+                self.__timestamp_us = (delta.days * 86400 + delta.seconds) \
+                    * 1000000 + delta.microseconds
+        return self.__timestamp_us
+
     @property
     def event_type(self):
+        if self.__response is not None:
+            return self.__response["type"]
         return self.__event_type
 
     def __repr__(self):
         return "{cls}(id={id})".format(cls=self.__class__.__name__, id=self.id)
+
+
+class ShareResult(namedtuple("ShareResult", [
+    "recipient_id", "secret", "error"
+])):
+    """
+    The outcome of sharing a secret with one of the recipients of
+    :func:`~.Client.share_secret_with_many`: the derived secret, or the
+    error that prevented it from being created.
+    """
+
+    __slots__ = ()
+
+
+class ProvisionResult(namedtuple("ProvisionResult", [
+    "spec", "identity", "error"
+])):
+    """
+    The outcome of creating one of the identities of
+    :func:`~.Client.create_identities`: the identity, or the error that
+    prevented it from being created.
+    """
+
+    __slots__ = ()
@@ -0,0 +1,131 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+from __future__ import absolute_import
+
+from collections import namedtuple
+
+from . import utils
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+__all__ = ["EventColumns", "event_columns"]
+
+# the categorical columns and the fields of the audit entry they are read from
+_TOP_LEVEL_FIELDS = [("event_type", "type"),
+                     ("host", "host"),
+                     ("source_ip", "sourceIp")]
+_DETAIL_FIELDS = [("base_secret_id", "baseSecretId"),
+                  ("requestor_id", "requesterId"),
+                  ("rsa_key_owner_id", "rsaKeyOwnerId"),
+                  ("secret_id", "secretId"),
+                  ("secret_owner_id", "secretOwnerId")]
+CATEGORICAL_COLUMNS = [name for name, _ in _TOP_LEVEL_FIELDS + _DETAIL_FIELDS]
+COLUMNS = ["id", "timestamp"] + CATEGORICAL_COLUMNS
+
+BLOCK_SIZE = 65536
+
+
+class EventColumns(namedtuple("EventColumns", [
+    "columns", "categories"
+])):
+    """
+    Audit events in columnar form, with one NumPy array per field of
+    :class:`~.Event`.
+
+    The ``id`` column holds the event ids and the ``timestamp`` column holds
+    ``datetime64[us]`` values in UTC. Every other column holds ``int32``
+    codes into the array of values in ``categories`` under the same name,
+    with -1 for a missing value. Event types are coded in the
+    ``event_type`` column.
+
+    The codes map directly onto a pandas categorical:
+
+    >>> columns, categories = client.get_events_columnar(identity_id)
+    >>> frame = pandas.DataFrame(dict(
+    ...     (name, pandas.Categorical.from_codes(codes, categories[name])
+    ...      if name in categories else codes)
+    ...     for name, codes in columns.items()))
+    """
+
+    __slots__ = ()
+
+    def __len__(self):
+        return len(self.columns["id"])
+
+
+def event_columns(events, block_size=BLOCK_SIZE):
+    """
+    Builds the columns of the given audit entries as returned by Delta,
+    without creating an :class:`~.Event` for each of them. The entries are
+    consumed in blocks of ``block_size``, so the entries of a streamed
+    response are only held in memory until their block is converted.
+
+    :param events: the audit entries
+    :type events: collections.Iterable[dict[str, any]]
+    :param int block_size: the number of entries converted at a time
+    :return: the columns of the events
+    :rtype: :class:`~.EventColumns`
+    :raises ImportError: if numpy is not installed
+    """
+    if numpy is None:
+        raise ImportError("event columns require the numpy package")
+
+    codes = dict((name, {}) for name in CATEGORICAL_COLUMNS)
+    blocks = dict((name, []) for name in COLUMNS)
+    rows = dict((name, []) for name in COLUMNS)
+    parse_timestamp = utils.parse_timestamp
+    # the (field, codes, row) of each categorical column, bound once rather
+    # than looked up by name for every entry
+    top_level = [(field, codes[name], rows[name])
+                 for name, field in _TOP_LEVEL_FIELDS]
+    detail = [(field, codes[name], rows[name])
+              for name, field in _DETAIL_FIELDS]
+    ids = rows["id"]
+    timestamps = rows["timestamp"]
+
+    def flush():
+        blocks["id"].append(numpy.array(ids, dtype=object))
+        blocks["timestamp"].append(numpy.array(
+            timestamps, dtype=numpy.int64).view("datetime64[us]"))
+        for name in CATEGORICAL_COLUMNS:
+            blocks[name].append(numpy.array(rows[name], dtype=numpy.int32))
+        for row in rows.values():
+            del row[:]
+
+    for event in events:
+        ids.append(event["id"])
+        timestamps.append(parse_timestamp(event["timestamp"]))
+        for fields, columns in ((event, top_level),
+                                (event.get("eventDetails") or {}, detail)):
+            for field, column_codes, row in columns:
+                value = fields.get(field)
+                row.append(-1 if value is None else
+                           column_codes.setdefault(value, len(column_codes)))
+        if len(ids) >= block_size:
+            flush()
+    flush()
+
+    columns = dict((name, numpy.concatenate(blocks[name]))
+                   for name in COLUMNS)
+    categories = {}
+    for name in CATEGORICAL_COLUMNS:
+        values = numpy.empty(len(codes[name]), dtype=object)
+        for value, index in codes[name].items():
+            values[index] = value
+        categories[name] = values
+    return EventColumns(columns, categories)
@@ -0,0 +1,109 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+from __future__ import absolute_import
+
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+__all__ = ["GZIP", "DEFLATE", "ZSTD", "supported_encodings",
+           "accept_encoding", "encode", "decode"]
+
+GZIP = "gzip"
+DEFLATE = "deflate"
+ZSTD = "zstd"
+IDENTITY = "identity"
+
+
+def supported_encodings():
+    """
+    Gets the content codings available in this environment, in order of
+    preference. ``zstd`` is only available if the optional ``zstandard``
+    package is installed.
+
+    :return: the supported content codings
+    :rtype: list[str]
+    """
+    encodings = [GZIP, DEFLATE]
+    if zstandard is not None:
+        encodings.insert(0, ZSTD)
+    return encodings
+
+
+def accept_encoding():
+    """
+    Gets the value of an ``Accept-Encoding`` header for responses. Only
+    ``gzip`` and ``deflate`` are advertised as every transport is able to
+    decode them.
+
+    :return: the header value
+    :rtype: str
+    """
+    return ", ".join([GZIP, DEFLATE])
+
+
+def encode(body, encoding, level=6):
+    """
+    Compresses the body with the given content coding.
+
+    :param bytes body: the body to compress
+    :param str encoding: the content coding
+    :param int level: the compression level
+    :return: the compressed body
+    :rtype: bytes
+    """
+    if encoding == GZIP:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(body) + compressor.flush()
+    elif encoding == DEFLATE:
+        return zlib.compress(body, level)
+    elif encoding == ZSTD and zstandard is not None:
+        return zstandard.ZstdCompressor(level=level).compress(body)
+    raise ValueError("unsupported content encoding: {}".format(encoding))
+
+
+def decode(body, content_encoding):
+    """
+    Decompresses a body given the value of its ``Content-Encoding`` header.
+    Codings listed in the header are undone in reverse order.
+
+    :param bytes body: the body to decompress
+    :param content_encoding: the value of the Content-Encoding header
+    :type content_encoding: str | None
+    :return: the decompressed body
+    :rtype: bytes
+    """
+    if not content_encoding:
+        return body
+    encodings = [e.strip().lower() for e in content_encoding.split(",")]
+    for encoding in reversed(encodings):
+        if encoding == GZIP or encoding == "x-gzip":
+            body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+        elif encoding == DEFLATE:
+            try:
+                body = zlib.decompress(body)
+            except zlib.error:
+                # some servers send raw deflate streams without a zlib header
+                body = zlib.decompress(body, -zlib.MAX_WBITS)
+        elif encoding == ZSTD and zstandard is not None:
+            body = zstandard.ZstdDecompressor().decompressobj() \
+                .decompress(body)
+        elif encoding != IDENTITY:
+            raise ValueError(
+                "unsupported content encoding: {}".format(encoding))
+    return body
@@ -17,6 +17,7 @@ import base64
 import os
 from binascii import hexlify
 
+from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import padding, rsa
@@ -26,7 +27,9 @@ __all__ = ["generate_private_key", "serialize_public_key",
            "calculate_sha256hex", "generate_secret_key",
            "generate_initialisation_vector", "encrypt", "decrypt",
            "encrypt_key_with_public_key", "decrypt_with_private_key",
-           "deserialize_public_key"]
+           "deserialize_public_key", "encrypt_stream", "decrypt_stream"]
+
+TAG_LENGTH = 16
 
 
 def generate_private_key():
@@ -149,6 +152,65 @@ def decrypt(ciphertext, tag, secret_key, initialisation_vector):
     return decryptor.update(ciphertext) + decryptor.finalize()
 
 
+def encrypt_stream(chunks, secret_key, initialisation_vector):
+    """
+    Encrypts plaintext arriving in chunks using the given secret key and
+    initialisation vector. Cipher text is yielded as the plaintext is
+    consumed, followed by the 16 byte GCM authentication tag.
+
+    :param chunks: the plaintext chunks to be encrypted
+    :type chunks: collections.Iterable[bytes]
+    :param bytes secret_key: the key to be used for encryption
+    :param bytes initialisation_vector: the initialisation vector
+    :return: the cipher text chunks followed by the authentication tag
+    :rtype: collections.Iterable[bytes]
+    """
+    cipher = Cipher(algorithm=algorithms.AES(secret_key),
+                    mode=modes.GCM(initialization_vector=initialisation_vector,
+                                   min_tag_length=TAG_LENGTH),
+                    backend=default_backend())
+    encryptor = cipher.encryptor()
+    for chunk in chunks:
+        yield encryptor.update(chunk)
+    yield encryptor.finalize()
+    yield encryptor.tag
+
+
+def decrypt_stream(chunks, secret_key, initialisation_vector):
+    """
+    Decrypts a cipher text arriving in chunks, where the last 16 bytes of
+    the stream are the GCM authentication tag. Plaintext is yielded as the
+    cipher text is consumed and the tag is verified once the stream ends.
+
+    As plaintext is released before the tag is verified, consumers must
+    discard everything they received if :class:`InvalidTag` is raised.
+
+    :param chunks: the cipher text followed by the tag, in chunks
+    :type chunks: collections.Iterable[bytes | memoryview]
+    :param bytes secret_key: the key to be used for decryption
+    :param bytes initialisation_vector: the initialisation vector
+    :return: the decrypted plaintext chunks
+    :rtype: collections.Iterable[bytes]
+    :raises cryptography.exceptions.InvalidTag:
+        if the stream fails authentication
+    """
+    cipher = Cipher(algorithm=algorithms.AES(secret_key),
+                    mode=modes.GCM(initialization_vector=initialisation_vector),
+                    backend=default_backend())
+    decryptor = cipher.decryptor()
+    pending = b""
+    for chunk in chunks:
+        data = pending + chunk if pending else chunk
+        if len(data) > TAG_LENGTH:
+            yield decryptor.update(data[:-TAG_LENGTH])
+            pending = bytes(data[-TAG_LENGTH:])
+        else:
+            pending = data
+    if len(pending) < TAG_LENGTH:
+        raise InvalidTag()
+    yield decryptor.finalize_with_tag(pending)
+
+
 def encrypt_key_with_public_key(secret_key, public_encryption_key):
     """
     Encrypts the given secret key with the public key.
@@ -0,0 +1,143 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+from __future__ import absolute_import
+
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+__all__ = ["Deadline", "DeadlineExceeded"]
+
+try:
+    monotonic = time.monotonic
+except AttributeError:  # pragma: no cover
+    # python 2 has no monotonic clock in the standard library
+    monotonic = time.time
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when an operation runs out of its time budget before it could
+    complete.
+    """
+
+
+class Deadline(object):
+    """
+    The point in time by which an operation, including every request,
+    key store load and cryptographic step it is made of, must complete.
+
+    A single deadline is passed down through composite operations, so each
+    step receives only the budget left over by the steps before it:
+
+    >>> client.share_secret(identity_id, recipient_id, secret_id,
+    ...                     deadline=Deadline(5))
+    """
+
+    def __init__(self, timeout, clock=monotonic):
+        """
+        Creates a deadline the given number of seconds from now.
+
+        :param timeout:
+            the time budget in seconds, or None for a deadline that never
+            expires
+        :type timeout: float | None
+        :param clock:
+            the function returning the current time in seconds, which
+            defaults to a monotonic clock so that changes to the system time
+            do not move the deadline
+        """
+        self.__clock = clock
+        self.__expires = None if timeout is None else clock() + timeout
+
+    @classmethod
+    def of(cls, deadline, default=None):
+        """
+        Gets the deadline for a deadline argument, which may be a deadline, a
+        time budget in seconds, or None for the default budget.
+
+        :param deadline: the deadline argument
+        :type deadline: :class:`~.Deadline` | float | None
+        :param default: the default time budget in seconds
+        :type default: float | None
+        :rtype: :class:`~.Deadline`
+        """
+        if isinstance(deadline, Deadline):
+            return deadline
+        return cls(default if deadline is None else deadline)
+
+    @property
+    def expires(self):
+        """
+        The time at which the deadline expires on its clock, or None if it
+        never does.
+
+        :rtype: float | None
+        """
+        return self.__expires
+
+    def remaining(self):
+        """
+        Gets the number of seconds left, which is negative once the deadline
+        has passed, or None if it never expires.
+
+        :rtype: float | None
+        """
+        if self.__expires is None:
+            return None
+        return self.__expires - self.__clock()
+
+    @property
+    def expired(self):
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def check(self):
+        """
+        Raises :class:`~.DeadlineExceeded` if the deadline has passed.
+        """
+        if self.expired:
+            raise DeadlineExceeded("deadline exceeded")
+
+    def timeout(self, cap=None):
+        """
+        Gets the timeout for the next step of the operation: the time left,
+        bounded by the given cap.
+
+        :param cap: the largest timeout to return
+        :type cap: float | None
+        :return: the timeout in seconds, or None for no timeout
+        :rtype: float | None
+        :raises DeadlineExceeded: if the deadline has passed
+        """
+        self.check()
+        remaining = self.remaining()
+        if remaining is None:
+            return cap
+        return remaining if cap is None else min(remaining, cap)
+
+    def result(self, future):
+        """
+        Waits for the result of a future started as a step of the operation.
+
+        :param future: the future
+        :type future: :class:`concurrent.futures.Future`
+        :return: the result of the future
+        :raises DeadlineExceeded:
+            if the deadline passes before the future completes
+        """
+        try:
+            return future.result(self.timeout())
+        except FutureTimeoutError:
+            raise DeadlineExceeded("deadline exceeded")
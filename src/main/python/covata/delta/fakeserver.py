@@ -0,0 +1,749 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+from __future__ import absolute_import, division
+
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+
+import six.moves.urllib as urllib
+from cryptography.exceptions import InvalidSignature
+from six.moves import BaseHTTPServer, socketserver
+
+from . import compression, crypto, signer
+from .ratelimit import TokenBucket
+from .transport import TransportResponse
+
+__all__ = ["FakeDeltaServer", "ROUTES", "constant", "uniform", "exponential",
+           "lognormal"]
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+DEFAULT_PAGE_SIZE = 25
+
+ROUTES = [
+    ("POST", r"^/identities$", "register_identity"),
+    ("GET", r"^/identities$", "get_identities_by_metadata"),
+    ("GET", r"^/identities/([^/]+)$", "get_identity"),
+    ("PUT", r"^/identities/([^/]+)$", "update_identity_metadata"),
+    ("POST", r"^/secrets$", "create_secret"),
+    ("GET", r"^/secrets$", "get_secrets"),
+    ("GET", r"^/secrets/([^/]+)$", "get_secret"),
+    ("DELETE", r"^/secrets/([^/]+)$", "delete_secret"),
+    ("GET", r"^/secrets/([^/]+)/content$", "get_secret_content"),
+    ("GET", r"^/secrets/([^/]+)/metadata$", "get_secret_metadata"),
+    ("PUT", r"^/secrets/([^/]+)/metadata$", "update_secret_metadata"),
+    ("GET", r"^/events$", "get_events"),
+]
+"""
+The (method, path pattern, route name) of each Delta API endpoint served by
+the :class:`~.FakeDeltaServer`. Route names are used to target latency and
+injected errors at particular endpoints.
+"""
+
+
+def constant(seconds):
+    """
+    A latency distribution that always takes the given time.
+
+    :param float seconds: the latency in seconds
+    :return: the latency distribution
+    :rtype: (random.Random) -> float
+    """
+    return lambda rng: seconds
+
+
+def uniform(low, high):
+    """
+    A latency distribution uniformly distributed between two bounds.
+
+    :param float low: the minimum latency in seconds
+    :param float high: the maximum latency in seconds
+    :return: the latency distribution
+    :rtype: (random.Random) -> float
+    """
+    return lambda rng: rng.uniform(low, high)
+
+
+def exponential(mean):
+    """
+    An exponentially distributed latency.
+
+    :param float mean: the mean latency in seconds
+    :return: the latency distribution
+    :rtype: (random.Random) -> float
+    """
+    return lambda rng: rng.expovariate(1 / mean)
+
+
+def lognormal(median, sigma):
+    """
+    A log-normally distributed latency, the usual model for service times
+    with a long tail. The 99th percentile is ``median * exp(2.33 * sigma)``.
+
+    :param float median: the median latency in seconds
+    :param float sigma: the standard deviation of the latency's logarithm
+    :return: the latency distribution
+    :rtype: (random.Random) -> float
+    """
+    return lambda rng: rng.lognormvariate(math.log(median), sigma)
+
+
+class _ApiError(Exception):
+    def __init__(self, status, message, headers=None):
+        super(_ApiError, self).__init__(message)
+        self.status = status
+        self.headers = {} if headers is None else headers
+
+
+class _ErrorRule(object):
+    def __init__(self, status, probability, routes, count):
+        self.status = status
+        self.probability = probability
+        self.routes = routes
+        self.remaining = count
+
+
+class FakeDeltaServer(object):
+    """
+    An in-process stand-in for the Delta API, for load testing and
+    benchmarking code built on the :class:`~.Client` without access to the
+    Delta service.
+
+    The server keeps identities, secrets with versioned metadata, and audit
+    events in memory, and verifies the CVT1 signature of every request. It
+    can add latency drawn from a distribution, inject errors and rate limit
+    each identity.
+
+    Requests can be handed to the server without sockets with an
+    :class:`~.InMemoryTransport`:
+
+    >>> server = FakeDeltaServer(latency=lognormal(0.02, 0.5))
+    >>> api_client = ApiClient(key_store, InMemoryTransport(server.handle))
+
+    or sent over HTTP to a server started on a background thread:
+
+    >>> with FakeDeltaServer() as server:
+    ...     api_client = ApiClient(key_store, base_url=server.start())
+    """
+
+    def __init__(self, latency=None, rate_limit=None, burst=None,
+                 verify_signatures=True, seed=None,
+                 sleep=time.sleep, clock=time.time):
+        """
+        Creates a new fake Delta server.
+
+        :param latency:
+            the latency distribution of every route; a function taking a
+            :class:`random.Random` and returning the latency in seconds
+        :type latency: ((random.Random) -> float) | None
+        :param rate_limit:
+            the sustained number of requests per second allowed for each
+            identity; requests over the limit fail with
+            ``429 Too Many Requests``
+        :type rate_limit: float | None
+        :param burst:
+            the number of requests an identity may make at once, defaults to
+            the rate limit
+        :type burst: int | None
+        :param bool verify_signatures:
+            whether to verify request signatures; disable to measure the
+            client without the cost of signature verification
+        :param seed: the seed of the random latencies and injected errors
+        :type seed: int | None
+        :param sleep: the function used to wait out latencies
+        :param clock: the function returning the current time in seconds
+        """
+        self.__lock = threading.RLock()
+        self.__random = random.Random(seed)
+        self.__routes = [(method, re.compile(pattern), name)
+                         for method, pattern, name in ROUTES]
+        self.__handlers = dict(
+            register_identity=self.__register_identity,
+            get_identities_by_metadata=self.__get_identities_by_metadata,
+            get_identity=self.__get_identity,
+            update_identity_metadata=self.__update_identity_metadata,
+            create_secret=self.__create_secret,
+            get_secrets=self.__get_secrets,
+            get_secret=self.__get_secret,
+            delete_secret=self.__delete_secret,
+            get_secret_content=self.__get_secret_content,
+            get_secret_metadata=self.__get_secret_metadata,
+            update_secret_metadata=self.__update_secret_metadata,
+            get_events=self.__get_events)
+        self.__latency = dict((name, latency) for _, _, name in ROUTES)
+        self.__rate_limit = rate_limit
+        self.__burst = rate_limit if burst is None else burst
+        self.__buckets = {}
+        self.__errors = []
+        self.__verify_signatures = verify_signatures
+        self.__sleep = sleep
+        self.__clock = clock
+        self.__request_counts = Counter()
+        self.__identities = {}
+        self.__signing_keys = {}
+        self.__secrets = {}
+        self.__events = []
+        self.__http_server = None
+        self.__http_thread = None
+
+    @property
+    def identities(self):
+        return self.__identities
+
+    @property
+    def secrets(self):
+        return self.__secrets
+
+    @property
+    def events(self):
+        return self.__events
+
+    @property
+    def request_counts(self):
+        """
+        The number of requests received by each route.
+
+        :rtype: :class:`collections.Counter`
+        """
+        with self.__lock:
+            return Counter(self.__request_counts)
+
+    @property
+    def url(self):
+        """
+        The base url of the server started with
+        :func:`~.FakeDeltaServer.start`.
+
+        :rtype: str
+        """
+        if self.__http_server is None:
+            raise RuntimeError("the server has not been started")
+        host, port = self.__http_server.server_address[:2]
+        return "http://{}:{}/v1".format(host, port)
+
+    def set_latency(self, latency, routes=None):
+        """
+        Sets the latency distribution of the given routes.
+
+        :param latency: the latency distribution, or None for no latency
+        :type latency: ((random.Random) -> float) | None
+        :param routes: the route names, or None for every route
+        :type routes: list[str] | None
+        """
+        with self.__lock:
+            for route in self.__route_names(routes):
+                self.__latency[route] = latency
+
+    def inject_error(self, status, probability=1.0, routes=None, count=None):
+        """
+        Fails requests with the given HTTP status code.
+
+        :param int status: the status code of the failed responses
+        :param float probability: the probability that a request fails
+        :param routes: the route names to fail, or None for every route
+        :type routes: list[str] | None
+        :param count: the number of requests to fail, or None for no limit
+        :type count: int | None
+        """
+        with self.__lock:
+            self.__errors.append(_ErrorRule(
+                status, probability, self.__route_names(routes), count))
+
+    def clear_errors(self):
+        """
+        Stops failing requests with injected errors.
+        """
+        with self.__lock:
+            del self.__errors[:]
+
+    def handle(self, method, url, headers, body, source_ip="127.0.0.1"):
+        """
+        Handles a Delta API request, with the signature of an
+        :class:`~.InMemoryTransport` handler.
+
+        :param str method: the HTTP request method
+        :param str url: the absolute url including the query string
+        :param headers: the request headers
+        :type headers: dict[str, str]
+        :param body: the request body, or an iterable of body chunks
+        :type body: bytes | collections.Iterable[bytes] | None
+        :param str source_ip: the address the request was received from
+        :return: the response
+        :rtype: :class:`~.TransportResponse`
+        """
+        url_parsed = urllib.parse.urlparse(url)
+        path = "/" + "/".join(url_parsed.path.strip("/").split("/")[1:])
+        query = dict(urllib.parse.parse_qsl(url_parsed.query))
+        headers = dict((k.lower(), v) for k, v in headers.items())
+        if body is not None and not isinstance(body, bytes):
+            body = b"".join(body)
+
+        try:
+            route, args = self.__route(method, path)
+            self.__delay(route)
+            self.__fail(route)
+            try:
+                payload = compression.decode(
+                    body, headers.get("content-encoding"))
+            except Exception:
+                raise _ApiError(
+                    415, "unsupported content encoding",
+                    {"accept-encoding": ", ".join(
+                        compression.supported_encodings())})
+
+            requestor_id = None
+            if route != "register_identity":
+                requestor_id = self.__authenticate(
+                    method, url, headers, payload)
+                self.__throttle(requestor_id)
+
+            request = _Request(requestor_id, args, query, headers,
+                               self.__parse(payload), url_parsed.netloc,
+                               source_ip)
+            with self.__lock:
+                status, response_headers, response = \
+                    self.__handlers[route](request)
+        except _ApiError as e:
+            status, response_headers, response = \
+                e.status, e.headers, dict(message=str(e))
+
+        if response is None:
+            response = b""
+        elif not isinstance(response, bytes):
+            response = json.dumps(response).encode("utf-8")
+            response_headers = dict(response_headers,
+                                    **{"content-type": "application/json"})
+        return TransportResponse(status, response_headers, response)
+
+    def start(self, host="127.0.0.1", port=0):
+        """
+        Starts serving the Delta API over HTTP on a background thread.
+
+        :param str host: the address to listen on
+        :param int port: the port to listen on, or 0 for any free port
+        :return: the base url of the server
+        :rtype: str
+        """
+        self.__http_server = _HttpServer((host, port), _RequestHandler)
+        self.__http_server.delta = self
+        self.__http_thread = threading.Thread(
+            target=self.__http_server.serve_forever)
+        self.__http_thread.daemon = True
+        self.__http_thread.start()
+        return self.url
+
+    def stop(self):
+        """
+        Stops the HTTP server started with :func:`~.FakeDeltaServer.start`.
+        """
+        if self.__http_server is not None:
+            self.__http_server.shutdown()
+            self.__http_server.server_close()
+            self.__http_thread.join()
+            self.__http_server = None
+            self.__http_thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def __route_names(self, routes):
+        # type: (list[str] | None) -> list[str]
+        names = [name for _, _, name in ROUTES]
+        if routes is None:
+            return names
+        unknown = set(routes) - set(names)
+        if unknown:
+            raise ValueError("unknown routes: {}".format(sorted(unknown)))
+        return list(routes)
+
+    def __route(self, method, path):
+        # type: (str, str) -> (str, tuple)
+        allowed = False
+        for method_, pattern, name in self.__routes:
+            match = pattern.match(path)
+            if match is not None:
+                if method_ == method:
+                    with self.__lock:
+                        self.__request_counts[name] += 1
+                    return name, match.groups()
+                allowed = True
+        if allowed:
+            raise _ApiError(405, "method not allowed")
+        raise _ApiError(404, "not found")
+
+    def __delay(self, route):
+        with self.__lock:
+            latency = self.__latency[route]
+            seconds = None if latency is None else latency(self.__random)
+        if seconds is not None and seconds > 0:
+            self.__sleep(seconds)
+
+    def __fail(self, route):
+        with self.__lock:
+            for rule in self.__errors:
+                if route in rule.routes and rule.remaining != 0 and \
+                        self.__random.random() < rule.probability:
+                    if rule.remaining is not None:
+                        rule.remaining -= 1
+                    raise _ApiError(rule.status, "injected error")
+
+    def __authenticate(self, method, url, headers, payload):
+        # type: (str, str, dict, bytes) -> str
+        try:
+            identity_id = signer.parse_authorization(
+                headers.get("authorization")).identity_id
+        except ValueError:
+            raise _ApiError(401, "missing or invalid authorization")
+        with self.__lock:
+            signing_key = self.__signing_keys.get(identity_id)
+        if signing_key is None:
+            raise _ApiError(401, "unknown identity")
+        if self.__verify_signatures:
+            try:
+                signer.verify_signature(method, url, headers, payload,
+                                        signing_key)
+            except InvalidSignature:
+                raise _ApiError(401, "invalid signature")
+        return identity_id
+
+    def __throttle(self, identity_id):
+        if self.__rate_limit is None:
+            return
+        with self.__lock:
+            bucket = self.__buckets.get(identity_id)
+            if bucket is None:
+                bucket = self.__buckets[identity_id] = TokenBucket(
+                    self.__rate_limit, self.__burst, self.__clock)
+            wait = 0 if bucket.try_acquire() else bucket.wait_time()
+        if wait:
+            raise _ApiError(429, "rate limit exceeded",
+                            {"retry-after": str(int(math.ceil(wait)))})
+
+    @staticmethod
+    def __parse(payload):
+        if not payload:
+            return None
+        try:
+            return json.loads(payload.decode("utf-8"))
+        except ValueError:
+            raise _ApiError(400, "malformed json")
+
+    def __register_identity(self, request):
+        body = request.body or {}
+        try:
+            signing_key = crypto.deserialize_public_key(
+                body["signingPublicKey"])
+            crypto.deserialize_public_key(body["cryptoPublicKey"])
+        except Exception:
+            raise _ApiError(400, "invalid public keys")
+        identity_id = str(uuid.uuid4())
+        identity = dict(id=identity_id,
+                        cryptoPublicKey=body["cryptoPublicKey"],
+                        metadata=dict(body.get("metadata") or {}),
+                        version=1)
+        if body.get("externalId") is not None:
+            identity["externalId"] = body["externalId"]
+        self.__identities[identity_id] = identity
+        self.__signing_keys[identity_id] = signing_key
+        return 201, {}, dict(identityId=identity_id)
+
+    def __get_identity(self, request):
+        return 200, {}, dict(self.__identity(request.args[0]))
+
+    def __get_identities_by_metadata(self, request):
+        metadata = request.metadata()
+        identities = [dict(identity)
+                      for identity in self.__identities.values()
+                      if self.__matches(identity["metadata"], metadata)]
+        return 200, {}, request.paginate(identities)
+
+    def __update_identity_metadata(self, request):
+        identity = self.__identity(request.args[0])
+        if identity["id"] != request.requestor_id:
+            raise _ApiError(403, "forbidden")
+        metadata = (request.body or {}).get("metadata")
+        if not isinstance(metadata, dict):
+            raise _ApiError(400, "metadata is required")
+        self.__check_version(request, identity)
+        identity["metadata"] = dict(metadata)
+        identity["version"] += 1
+        return 204, {}, None
+
+    def __create_secret(self, request):
+        body = request.body or {}
+        encryption_details = body.get("encryptionDetails") or {}
+        if not body.get("content") or \
+                not encryption_details.get("symmetricKey") or \
+                not encryption_details.get("initialisationVector"):
+            raise _ApiError(400, "content and encryption details are required")
+
+        secret = dict(id=str(uuid.uuid4()),
+                      created=self.__timestamp(),
+                      createdBy=request.requestor_id,
+                      rsaKeyOwner=request.requestor_id,
+                      encryptionDetails=dict(
+                          symmetricKey=encryption_details["symmetricKey"],
+                          initialisationVector=encryption_details[
+                              "initialisationVector"]),
+                      content=body["content"],
+                      metadata={},
+                      version=1)
+        event_type = "base_secret_created_event"
+        if body.get("baseSecret") is not None:
+            base_secret = self.__secret(body["baseSecret"])
+            if base_secret.get("baseSecretId") is not None:
+                raise _ApiError(400, "cannot share a derived secret")
+            if base_secret["rsaKeyOwner"] != request.requestor_id:
+                raise _ApiError(403, "forbidden")
+            self.__identity(body.get("rsaKeyOwner"))
+            secret["rsaKeyOwner"] = body["rsaKeyOwner"]
+            secret["baseSecretId"] = base_secret["id"]
+            event_type = "derived_secret_created_event"
+
+        self.__secrets[secret["id"]] = secret
+        self.__record(request, event_type, secret)
+        return 201, {}, dict(id=secret["id"])
+
+    def __get_secrets(self, request):
+        query = request.query
+        base_secret = query.get("baseSecret")
+        metadata = request.metadata()
+        secrets = []
+        for secret in self.__secrets.values():
+            if not self.__can_read(request, secret) or \
+                    not self.__matches(secret["metadata"], metadata):
+                continue
+            base_secret_id = secret.get("baseSecretId")
+            if base_secret == "false" and base_secret_id is not None or \
+                    base_secret == "true" and base_secret_id is None or \
+                    base_secret not in (None, "true", "false") and \
+                    base_secret != base_secret_id:
+                continue
+            if query.get("createdBy", secret["createdBy"]) != \
+                    secret["createdBy"] or \
+                    query.get("rsaKeyOwner", secret["rsaKeyOwner"]) != \
+                    secret["rsaKeyOwner"]:
+                continue
+            secrets.append(self.__describe(secret, metadata=True))
+        secrets.sort(key=lambda s: s["created"])
+        return 200, {}, request.paginate(secrets)
+
+    def __get_secret(self, request):
+        secret = self.__readable_secret(request)
+        return 200, {}, self.__describe(secret)
+
+    def __delete_secret(self, request):
+        secret = self.__secret(request.args[0])
+        if secret["createdBy"] != request.requestor_id:
+            raise _ApiError(403, "forbidden")
+        for secret_id, s in list(self.__secrets.items()):
+            if secret_id == secret["id"] or \
+                    s.get("baseSecretId") == secret["id"]:
+                del self.__secrets[secret_id]
+        return 204, {}, None
+
+    def __get_secret_content(self, request):
+        secret = self.__readable_secret(request)
+        self.__record(request, "access_success_event", secret)
+        return 200, {"content-type": "text/plain"}, \
+            secret["content"].encode("utf-8")
+
+    def __get_secret_metadata(self, request):
+        secret = self.__readable_secret(request)
+        return 200, {"etag": str(secret["version"])}, \
+            dict(secret["metadata"])
+
+    def __update_secret_metadata(self, request):
+        secret = self.__secret(request.args[0])
+        if secret["createdBy"] != request.requestor_id:
+            raise _ApiError(403, "forbidden")
+        if not isinstance(request.body, dict):
+            raise _ApiError(400, "metadata is required")
+        self.__check_version(request, secret)
+        secret["metadata"] = dict(request.body)
+        secret["version"] += 1
+        return 204, {}, None
+
+    def __get_events(self, request):
+        query = request.query
+        events = []
+        for event in self.__events:
+            details = event["eventDetails"]
+            if request.requestor_id not in (details["requesterId"],
+                                            details["secretOwnerId"],
+                                            details["rsaKeyOwnerId"]):
+                continue
+            if query.get("secretId", details["secretId"]) != \
+                    details["secretId"] or \
+                    query.get("rsaKeyOwner", details["rsaKeyOwnerId"]) != \
+                    details["rsaKeyOwnerId"]:
+                continue
+            events.append(dict(event, eventDetails=dict(details)))
+        return 200, {}, events
+
+    def __identity(self, identity_id):
+        identity = self.__identities.get(identity_id)
+        if identity is None:
+            raise _ApiError(404, "identity not found")
+        return identity
+
+    def __secret(self, secret_id):
+        secret = self.__secrets.get(secret_id)
+        if secret is None:
+            raise _ApiError(404, "secret not found")
+        return secret
+
+    def __readable_secret(self, request):
+        secret = self.__secret(request.args[0])
+        if not self.__can_read(request, secret):
+            self.__record(request, "access_failure_event", secret)
+            raise _ApiError(403, "forbidden")
+        return secret
+
+    @staticmethod
+    def __can_read(request, secret):
+        return request.requestor_id in (secret["createdBy"],
+                                        secret["rsaKeyOwner"])
+
+    @staticmethod
+    def __check_version(request, entity):
+        version = request.headers.get("if-match")
+        if version is None:
+            raise _ApiError(428, "if-match header is required")
+        if version.strip('"') != str(entity["version"]):
+            raise _ApiError(412, "version mismatch",
+                            {"etag": str(entity["version"])})
+
+    @staticmethod
+    def __matches(metadata, expected):
+        return all(metadata.get(k) == v for k, v in expected.items())
+
+    @staticmethod
+    def __describe(secret, metadata=False):
+        description = dict((k, v) for k, v in secret.items()
+                           if k not in ("content", "metadata", "version"))
+        description["encryptionDetails"] = dict(secret["encryptionDetails"])
+        if metadata:
+            description["metadata"] = dict(secret["metadata"])
+        return description
+
+    def __record(self, request, event_type, secret):
+        base_secret_id = secret.get("baseSecretId")
+        owner = secret["createdBy"] if base_secret_id is None \
+            else self.__secrets[base_secret_id]["createdBy"]
+        self.__events.append(dict(
+            eventDetails=dict(baseSecretId=base_secret_id,
+                              requesterId=request.requestor_id,
+                              rsaKeyOwnerId=secret["rsaKeyOwner"],
+                              secretId=secret["id"],
+                              secretOwnerId=owner),
+            host=request.host,
+            id=str(uuid.uuid4()),
+            sourceIp=request.source_ip,
+            timestamp=self.__timestamp(),
+            type=event_type))
+
+    def __timestamp(self):
+        # millisecond precision, as returned by Delta
+        now = datetime.utcfromtimestamp(self.__clock())
+        return now.strftime(TIMESTAMP_FORMAT)[:-4] + "Z"
+
+
+class _Request(object):
+    def __init__(self, requestor_id, args, query, headers, body, host,
+                 source_ip):
+        self.requestor_id = requestor_id
+        self.args = args
+        self.query = query
+        self.headers = headers
+        self.body = body
+        self.host = host
+        self.source_ip = source_ip
+
+    def metadata(self):
+        return dict((k[len("metadata."):], v) for k, v in self.query.items()
+                    if k.startswith("metadata."))
+
+    def paginate(self, items):
+        try:
+            page = int(self.query.get("page", 1))
+            page_size = int(self.query.get("pageSize", DEFAULT_PAGE_SIZE))
+        except ValueError:
+            raise _ApiError(400, "invalid pagination parameters")
+        if page < 1 or page_size < 1:
+            raise _ApiError(400, "invalid pagination parameters")
+        return items[(page - 1) * page_size:page * page_size]
+
+
+class _HttpServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _RequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def handle_request(self):
+        body = self.__read_body()
+        url = "http://{}{}".format(
+            self.headers.get("host", "localhost"), self.path)
+        response = self.server.delta.handle(
+            self.command, url, dict(self.headers.items()), body,
+            source_ip=self.client_address[0])
+
+        content = response.content
+        headers = dict(response.headers)
+        if len(content) >= 1024 and compression.GZIP in \
+                self.headers.get("accept-encoding", ""):
+            content = compression.encode(content, compression.GZIP)
+            headers["content-encoding"] = compression.GZIP
+
+        self.send_response(response.status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("content-length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_PUT = do_DELETE = handle_request
+
+    def log_message(self, format, *args):
+        pass
+
+    def __read_body(self):
+        # type: () -> bytes | None
+        if "chunked" in self.headers.get("transfer-encoding", "").lower():
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip(), 16)
+                if size == 0:
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            while self.rfile.readline().strip():
+                pass  # trailers
+            return b"".join(chunks)
+        length = int(self.headers.get("content-length", 0))
+        return self.rfile.read(length) if length else None
@@ -0,0 +1,198 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+from __future__ import absolute_import
+
+import json
+import os
+import threading
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+
+from . import crypto
+
+__all__ = ["IdentityJournal"]
+
+
+class IdentityJournal(object):
+    """
+    Records the progress of :func:`~.Client.create_identities`, so a batch
+    interrupted by a crash can be resumed by calling it again with the same
+    specs and journal.
+
+    The private keys of each identity are written to the journal, encrypted
+    with the passphrase, before the identity is registered. An identity that
+    was registered but whose keys were not yet stored in the key store is
+    then completed on resume, rather than left registered with no keys.
+    The journal holds private keys, so it should be deleted once the batch
+    has completed.
+
+    Each record is a line of JSON, flushed to disk before the step it
+    records goes ahead. An incomplete last line left by a crash is ignored.
+    The journal file is created readable by its owner only.
+    """
+
+    def __init__(self, path, passphrase):
+        """
+        Opens the journal at the given path, creating it on the first record.
+
+        :param str path: the path of the journal file
+        :param str passphrase: the passphrase encrypting the private keys
+        """
+        self.__path = os.path.expanduser(path)
+        self.__passphrase = str(passphrase).encode("utf-8")
+        self.__lock = threading.Lock()
+        self.__file = None
+
+    @property
+    def path(self):
+        return self.__path
+
+    def load(self):
+        """
+        Reads the state of each identity recorded in the journal.
+
+        The private keys are only decrypted for identities whose keys were
+        not yet stored, as decrypting them is slow; they are None for the
+        others.
+
+        :return: the state of each identity by its index in the specs: its
+            external id, public encryption key, private keys, identity id
+            once registered, and whether its keys were stored
+        :rtype: dict[int, dict[str, any]]
+        """
+        entries = {}
+        if not os.path.exists(self.__path):
+            return entries
+        with open(self.__path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if "keys" in record:
+                    entries[record["index"]] = dict(
+                        external_id=record.get("external_id"),
+                        public_encryption_key=record.get("public_key"),
+                        keys=record["keys"],
+                        identity_id=None,
+                        stored=False)
+                elif "identity_id" in record:
+                    entries[record["index"]]["identity_id"] = \
+                        record["identity_id"]
+                elif "stored" in record:
+                    for index in record["stored"]:
+                        entries[index]["stored"] = True
+
+        for entry in entries.values():
+            keys = entry.pop("keys")
+            if entry["stored"] and entry["public_encryption_key"]:
+                entry["private_signing_key"] = None
+                entry["private_encryption_key"] = None
+                continue
+            entry["private_signing_key"] = self.__load(keys[0])
+            entry["private_encryption_key"] = self.__load(keys[1])
+            if not entry["public_encryption_key"]:
+                # recorded before the public key was
+                entry["public_encryption_key"] = crypto.serialize_public_key(
+                    entry["private_encryption_key"].public_key())
+        return entries
+
+    def generated(self, index, external_id, private_signing_key,
+                  private_encryption_key):
+        """
+        Records the private keys generated for an identity, before it is
+        registered.
+
+        :param int index: the index of the identity in the specs
+        :param external_id: the external id of the identity
+        :type external_id: str | None
+        :param private_signing_key: the private signing key
+        :type private_signing_key: :class:`~rsa.RSAPrivateKey`
+        :param private_encryption_key: the private encryption key
+        :type private_encryption_key: :class:`~rsa.RSAPrivateKey`
+        """
+        self.__append(dict(index=index, external_id=external_id,
+                           public_key=crypto.serialize_public_key(
+                               private_encryption_key.public_key()),
+                           keys=[self.__dump(private_signing_key),
+                                 self.__dump(private_encryption_key)]))
+
+    def registered(self, index, identity_id):
+        """
+        Records the id an identity was registered with.
+
+        :param int index: the index of the identity in the specs
+        :param str identity_id: the identity id
+        """
+        self.__append(dict(index=index, identity_id=identity_id))
+
+    def stored(self, indexes):
+        """
+        Records that the keys of the given identities were stored.
+
+        :param indexes: the indexes of the identities in the specs
+        :type indexes: list[int]
+        """
+        self.__append(dict(stored=list(indexes)))
+
+    def close(self):
+        """
+        Closes the journal file.
+        """
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.close()
+                self.__file = None
+
+    def __append(self, record):
+        line = json.dumps(record) + "\n"
+        with self.__lock:
+            if self.__file is None:
+                self.__file = os.fdopen(os.open(
+                    self.__path, os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+                    0o600), "a")
+                if self.__file.tell() > 0 and not self.__ends_with_newline():
+                    # terminate the incomplete line left by a crash
+                    self.__file.write("\n")
+            self.__file.write(line)
+            self.__file.flush()
+            os.fsync(self.__file.fileno())
+
+    def __ends_with_newline(self):
+        with open(self.__path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def __dump(self, private_key):
+        return private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.BestAvailableEncryption(self.__passphrase)
+        ).decode("utf-8")
+
+    def __load(self, pem):
+        # the keys were generated by this library, so the costly checks of a
+        # key from an untrusted source are skipped where supported
+        try:
+            return serialization.load_pem_private_key(
+                pem.encode("utf-8"), password=self.__passphrase,
+                backend=default_backend(),
+                unsafe_skip_rsa_key_validation=True)
+        except TypeError:
+            # the validation cannot be skipped before cryptography 39
+            return serialization.load_pem_private_key(
+                pem.encode("utf-8"), password=self.__passphrase,
+                backend=default_backend())
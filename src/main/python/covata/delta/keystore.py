@@ -19,6 +19,7 @@ from abc import ABCMeta, abstractmethod
 import six
 
 import os
+import threading
 
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import serialization
@@ -46,6 +47,20 @@ class DeltaKeyStore(object):
         :type private_encryption_key: :class:`RSAPrivateKey`
         """
 
+    def store_keys_many(self, keys):
+        """
+        Stores the signing and encryption key pairs of several identities.
+        Key stores that can store a batch of keys more efficiently than one
+        identity at a time should override this method.
+
+        :param keys: the identity id, private signing key and private
+            encryption key of each identity
+        :type keys: list[(str, :class:`RSAPrivateKey`, :class:`RSAPrivateKey`)]
+        """
+        for identity_id, private_signing_key, private_encryption_key in keys:
+            self.store_keys(identity_id, private_signing_key,
+                            private_encryption_key)
+
     @abstractmethod
     @utils.check_id("identity_id")
     def get_private_signing_key(self, identity_id):
@@ -128,3 +143,78 @@ class FileSystemKeyStore(DeltaKeyStore):
                 f.read().encode('utf-8'),
                 password=self.__key_store_passphrase,
                 backend=default_backend())
+
+
+class CachingKeyStore(DeltaKeyStore):
+    """
+    A :class:`~.DeltaKeyStore` that keeps the private keys loaded from
+    another key store in memory, so each key is only loaded and decrypted
+    once. Keys can be loaded ahead of the first requests with
+    :func:`~.ApiClient.warm_up`:
+
+    >>> key_store = CachingKeyStore(FileSystemKeyStore("~/keys", "passPhrase"))
+    >>> api_client = ApiClient(key_store)
+    >>> api_client.warm_up(connections=4, identity_ids=[identity_id])
+    """
+
+    def __init__(self, key_store):
+        """
+        Creates a new caching key store.
+
+        :param key_store: the key store the keys are loaded from
+        :type key_store: :class:`~.DeltaKeyStore`
+        """
+        self.__key_store = key_store
+        self.__lock = threading.Lock()
+        self.__signing_keys = {}
+        self.__encryption_keys = {}
+
+    @property
+    def key_store(self):
+        return self.__key_store
+
+    def store_keys(self,
+                   identity_id,
+                   private_signing_key,
+                   private_encryption_key):
+        self.key_store.store_keys(
+            identity_id, private_signing_key, private_encryption_key)
+        with self.__lock:
+            self.__signing_keys[identity_id] = private_signing_key
+            self.__encryption_keys[identity_id] = private_encryption_key
+
+    def store_keys_many(self, keys):
+        keys = list(keys)
+        self.key_store.store_keys_many(keys)
+        with self.__lock:
+            for identity_id, private_signing_key, private_encryption_key \
+                    in keys:
+                self.__signing_keys[identity_id] = private_signing_key
+                self.__encryption_keys[identity_id] = private_encryption_key
+
+    def get_private_signing_key(self, identity_id):
+        return self.__get(self.__signing_keys, identity_id,
+                          self.key_store.get_private_signing_key)
+
+    def get_private_encryption_key(self, identity_id):
+        return self.__get(self.__encryption_keys, identity_id,
+                          self.key_store.get_private_encryption_key)
+
+    def clear(self):
+        """
+        Forgets every cached key.
+        """
+        with self.__lock:
+            self.__signing_keys.clear()
+            self.__encryption_keys.clear()
+
+    def __get(self, keys, identity_id, load):
+        with self.__lock:
+            key = keys.get(identity_id)
+        if key is None:
+            # loaded outside the lock, so keys of different identities are
+            # decrypted in parallel
+            key = load(identity_id)
+            with self.__lock:
+                keys[identity_id] = key
+        return key
@@ -0,0 +1,237 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+from __future__ import absolute_import, division
+
+import threading
+import time
+
+__all__ = ["ConcurrencyLimiter", "ConcurrencyLimitExceeded"]
+
+
+class ConcurrencyLimitExceeded(Exception):
+    """
+    Raised when a request cannot be admitted by a
+    :class:`~.ConcurrencyLimiter` because its queue is full or the queue
+    timeout expired.
+    """
+
+
+class ConcurrencyLimiter(object):
+    """
+    Limits the number of requests in flight, adjusting the limit to the
+    observed latency and error rate of the service (AIMD).
+
+    The limit grows by one for every full window of requests completed
+    within ``latency_tolerance`` times the lowest latency seen, while at
+    least half of the limit is in use. It is cut by ``backoff_ratio`` when a
+    request is dropped (throttled, unavailable or timed out) or its latency
+    exceeds the tolerance, signalling that requests are queueing up in the
+    service. Requests that were already in flight at the last cut saw the
+    same overload, so only requests admitted after it cut the limit again.
+    Requests over the limit wait in a queue.
+
+    A single limiter is meant to be shared by every thread using an
+    :class:`~.ApiClient`:
+
+    >>> api_client = ApiClient(key_store,
+    ...                        concurrency_limiter=ConcurrencyLimiter())
+    """
+
+    def __init__(self, initial_limit=20, min_limit=1, max_limit=200,
+                 backoff_ratio=0.9, latency_tolerance=2.0, queue_timeout=None,
+                 max_queue=None, min_latency_window=1000, clock=time.time):
+        """
+        Creates a new concurrency limiter.
+
+        :param int initial_limit: the initial number of requests in flight
+        :param int min_limit: the lowest the limit may be reduced to
+        :param int max_limit: the highest the limit may grow to
+        :param float backoff_ratio:
+            the factor by which the limit is reduced on a dropped or slow
+            request, at most once per window of requests in flight
+        :param float latency_tolerance:
+            the multiple of the lowest observed latency above which a request
+            is considered slow
+        :param queue_timeout:
+            the number of seconds a request may wait for admission, or None
+            to wait indefinitely
+        :type queue_timeout: float | None
+        :param max_queue:
+            the number of requests that may wait for admission, or None for
+            no limit
+        :type max_queue: int | None
+        :param int min_latency_window:
+            the number of requests after which the lowest observed latency is
+            forgotten, so the limiter adapts when the service gets slower
+        :param clock: the function returning the current time in seconds
+        """
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError(
+                "limits must satisfy 1 <= min_limit <= initial_limit "
+                "<= max_limit")
+        if not 0 < backoff_ratio < 1:
+            raise ValueError("backoff_ratio must be between 0 and 1")
+
+        self.__condition = threading.Condition(threading.Lock())
+        self.__limit = float(initial_limit)
+        self.__min_limit = min_limit
+        self.__max_limit = max_limit
+        self.__backoff_ratio = backoff_ratio
+        self.__latency_tolerance = latency_tolerance
+        self.__queue_timeout = queue_timeout
+        self.__max_queue = max_queue
+        self.__min_latency_window = min_latency_window
+        self.__clock = clock
+        self.__min_latency = None
+        self.__backed_off = None
+        self.__samples = 0
+        self.__in_flight = 0
+        self.__queue_depth = 0
+        self.__rejections = 0
+
+    @property
+    def limit(self):
+        """
+        The number of requests currently allowed in flight.
+
+        :rtype: int
+        """
+        return int(self.__limit)
+
+    @property
+    def queue_timeout(self):
+        return self.__queue_timeout
+
+    @property
+    def in_flight(self):
+        return self.__in_flight
+
+    @property
+    def queue_depth(self):
+        """
+        The number of requests waiting for admission.
+
+        :rtype: int
+        """
+        return self.__queue_depth
+
+    @property
+    def rejections(self):
+        """
+        The number of requests rejected because the queue was full or the
+        queue timeout expired.
+
+        :rtype: int
+        """
+        return self.__rejections
+
+    @property
+    def metrics(self):
+        """
+        A snapshot of the limit, in-flight requests, queue depth, rejection
+        count and lowest observed latency.
+
+        :rtype: dict[str, any]
+        """
+        with self.__condition:
+            return dict(limit=int(self.__limit),
+                        in_flight=self.__in_flight,
+                        queue_depth=self.__queue_depth,
+                        rejections=self.__rejections,
+                        min_latency=self.__min_latency)
+
+    def acquire(self, timeout=None):
+        """
+        Admits a request, waiting while the limit is reached.
+
+        :param timeout:
+            the number of seconds to wait, overriding the queue timeout of
+            the limiter
+        :type timeout: float | None
+        :return: the admission time, to be passed to
+            :func:`~.ConcurrencyLimiter.release`
+        :rtype: float
+        :raises ConcurrencyLimitExceeded:
+            if the queue is full or the timeout expires
+        """
+        timeout = self.__queue_timeout if timeout is None else timeout
+        with self.__condition:
+            if self.__in_flight >= int(self.__limit):
+                if self.__max_queue is not None and \
+                        self.__queue_depth >= self.__max_queue:
+                    self.__rejections += 1
+                    raise ConcurrencyLimitExceeded(
+                        "concurrency limit queue is full")
+                self.__wait(timeout)
+            self.__in_flight += 1
+        return self.__clock()
+
+    def release(self, started, dropped=False):
+        """
+        Releases a request admitted by :func:`~.ConcurrencyLimiter.acquire`
+        and adjusts the limit.
+
+        :param float started: the admission time returned by ``acquire``
+        :param bool dropped:
+            whether the service throttled or failed to answer the request;
+            None if the request failed for a reason unrelated to load and
+            should not affect the limit
+        :type dropped: bool | None
+        """
+        latency = self.__clock() - started
+        with self.__condition:
+            self.__in_flight -= 1
+            if dropped is not None:
+                self.__update(started, latency, dropped)
+            available = int(self.__limit) - self.__in_flight
+            if available > 0:
+                self.__condition.notify(available)
+
+    def __wait(self, timeout):
+        # type: (float | None) -> None
+        deadline = None if timeout is None else self.__clock() + timeout
+        self.__queue_depth += 1
+        try:
+            while self.__in_flight >= int(self.__limit):
+                remaining = None if deadline is None \
+                    else deadline - self.__clock()
+                if remaining is not None and remaining <= 0:
+                    self.__rejections += 1
+                    raise ConcurrencyLimitExceeded(
+                        "timed out waiting for the concurrency limit")
+                self.__condition.wait(remaining)
+        finally:
+            self.__queue_depth -= 1
+
+    def __update(self, started, latency, dropped):
+        # type: (float, float, bool) -> None
+        self.__samples += 1
+        if self.__samples >= self.__min_latency_window:
+            self.__samples = 0
+            self.__min_latency = None
+        if not dropped and (self.__min_latency is None or
+                            latency < self.__min_latency):
+            self.__min_latency = latency
+
+        slow = self.__min_latency is not None and \
+            latency > self.__min_latency * self.__latency_tolerance
+        if dropped or slow:
+            if self.__backed_off is None or started > self.__backed_off:
+                self.__limit = max(self.__min_limit,
+                                   self.__limit * self.__backoff_ratio)
+                self.__backed_off = self.__clock()
+        elif self.__in_flight + 1 >= self.__limit / 2:
+            self.__limit = min(self.__max_limit,
+                               self.__limit + 1 / self.__limit)
@@ -0,0 +1,285 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+from __future__ import absolute_import, division
+
+import threading
+import time
+
+from .cache import LruCache
+
+__all__ = ["TokenBucket", "RateLimiter", "RateLimitExceeded"]
+
+
+class RateLimitExceeded(Exception):
+    """
+    Raised when a request is refused by a :class:`~.RateLimiter`, either
+    because it does not block or because the wait would exceed its timeout.
+    """
+
+
+class TokenBucket(object):
+    """
+    A token bucket refilled at a constant rate up to its capacity. Each
+    request takes a token; requests finding the bucket empty either wait for
+    a token or are refused.
+
+    Waiting requests reserve their token up front, so they are admitted in
+    the order they arrived.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.time,
+                 sleep=time.sleep):
+        """
+        Creates a new, full token bucket.
+
+        :param float rate: the number of tokens added per second
+        :param capacity:
+            the maximum number of tokens, i.e. the largest burst allowed;
+            defaults to the rate
+        :type capacity: float | None
+        :param clock: the function returning the current time in seconds
+        :param sleep: the function used to wait for tokens
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.__lock = threading.Lock()
+        self.__rate = float(rate)
+        self.__capacity = float(rate if capacity is None else capacity)
+        self.__tokens = self.__capacity
+        self.__clock = clock
+        self.__sleep = sleep
+        self.__updated = clock()
+
+    @property
+    def rate(self):
+        return self.__rate
+
+    @property
+    def capacity(self):
+        return self.__capacity
+
+    @property
+    def tokens(self):
+        """
+        The number of tokens currently available; negative while tokens are
+        reserved by waiting requests.
+
+        :rtype: float
+        """
+        with self.__lock:
+            self.__refill()
+            return self.__tokens
+
+    def try_acquire(self, tokens=1):
+        """
+        Takes tokens if they are available, without waiting.
+
+        :param float tokens: the number of tokens to take
+        :return: whether the tokens were taken
+        :rtype: bool
+        """
+        with self.__lock:
+            self.__refill()
+            if self.__tokens >= tokens:
+                self.__tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        Takes tokens, waiting until they are available.
+
+        :param float tokens: the number of tokens to take
+        :param timeout:
+            the maximum number of seconds to wait, or None to wait as long as
+            needed
+        :type timeout: float | None
+        :return: the number of seconds waited
+        :rtype: float
+        :raises RateLimitExceeded: if the wait would exceed the timeout
+        """
+        with self.__lock:
+            self.__refill()
+            wait = max(0.0, (tokens - self.__tokens) / self.__rate)
+            if timeout is not None and wait > timeout:
+                raise RateLimitExceeded(
+                    "rate limit exceeded, retry in {:.3f}s".format(wait))
+            self.__tokens -= tokens
+        if wait > 0:
+            self.__sleep(wait)
+        return wait
+
+    def release(self, tokens=1):
+        """
+        Gives back tokens taken for a request that was not made, up to the
+        capacity of the bucket.
+
+        :param float tokens: the number of tokens to give back
+        """
+        with self.__lock:
+            self.__refill()
+            self.__tokens = min(self.__capacity, self.__tokens + tokens)
+
+    def wait_time(self, tokens=1):
+        """
+        Gets the number of seconds until the given number of tokens is
+        available.
+
+        :param float tokens: the number of tokens
+        :rtype: float
+        """
+        with self.__lock:
+            self.__refill()
+            return max(0.0, (tokens - self.__tokens) / self.__rate)
+
+    def __refill(self):
+        now = self.__clock()
+        self.__tokens = min(self.__capacity, self.__tokens +
+                            (now - self.__updated) * self.__rate)
+        self.__updated = now
+
+
+class RateLimiter(object):
+    """
+    Limits the rate of requests made by an :class:`~.ApiClient` with token
+    buckets keyed by requestor identity, by resource (such as
+    ``ApiClient.RESOURCE_SECRETS``), or by both. Requests are limited before
+    they are signed, so no work is spent on requests that must wait.
+
+    To allow each identity 5 requests per second, and all identities
+    together 2 requests per second to the events resource:
+
+    >>> api_client = ApiClient(key_store, rate_limiters=[
+    ...     RateLimiter(5),
+    ...     RateLimiter(100, by_identity=False, by_resource=True,
+    ...                 resource_rates={ApiClient.RESOURCE_EVENTS: 2})])
+
+    Only the ``max_buckets`` most recently used buckets are kept; the bucket
+    of an identity or resource that has not made requests since is
+    evicted, and starts full again on its next request.
+    """
+
+    def __init__(self, rate, burst=None, by_identity=True, by_resource=False,
+                 resource_rates=None, blocking=True, timeout=None,
+                 max_buckets=10000, clock=time.time, sleep=time.sleep):
+        """
+        Creates a new rate limiter.
+
+        :param float rate: the sustained number of requests per second
+        :param burst:
+            the number of requests that may be made at once, defaults to the
+            rate
+        :type burst: float | None
+        :param bool by_identity: whether each identity has its own bucket
+        :param bool by_resource: whether each resource has its own bucket
+        :param resource_rates:
+            the rates of particular resources, overriding the default rate
+        :type resource_rates: dict[str, float] | None
+        :param bool blocking:
+            whether requests over the limit wait for a token; otherwise they
+            fail with :class:`~.RateLimitExceeded`
+        :param timeout:
+            the maximum number of seconds a blocking request waits before it
+            fails, or None to wait as long as needed
+        :type timeout: float | None
+        :param int max_buckets: the largest number of buckets kept
+        :param clock: the function returning the current time in seconds
+        :param sleep: the function used to wait for tokens
+        """
+        self.__lock = threading.Lock()
+        self.__rate = rate
+        self.__burst = burst
+        self.__by_identity = by_identity
+        self.__by_resource = by_resource
+        self.__resource_rates = dict(resource_rates or {})
+        self.__blocking = blocking
+        self.__timeout = timeout
+        self.__clock = clock
+        self.__sleep = sleep
+        self.__buckets = LruCache(max_buckets)
+
+    @property
+    def blocking(self):
+        return self.__blocking
+
+    @property
+    def timeout(self):
+        return self.__timeout
+
+    def bucket(self, identity_id, resource):
+        """
+        Gets the token bucket limiting requests by the given identity to the
+        given resource.
+
+        :param identity_id: the requestor identity id
+        :type identity_id: str | None
+        :param str resource: the resource, such as ``/secrets``
+        :rtype: :class:`~.TokenBucket`
+        """
+        key = (identity_id if self.__by_identity else None,
+               resource if self.__by_resource else None)
+        with self.__lock:
+            bucket = self.__buckets.get(key)
+            if bucket is None:
+                rate = self.__resource_rates.get(resource, self.__rate) \
+                    if self.__by_resource else self.__rate
+                burst = rate if self.__burst is None else self.__burst
+                bucket = TokenBucket(rate, burst, self.__clock, self.__sleep)
+                self.__buckets.put(key, bucket)
+            return bucket
+
+    def try_acquire(self, identity_id, resource):
+        """
+        Admits a request if a token is available, without waiting.
+
+        :param identity_id: the requestor identity id
+        :type identity_id: str | None
+        :param str resource: the resource, such as ``/secrets``
+        :return: whether the request was admitted
+        :rtype: bool
+        """
+        return self.bucket(identity_id, resource).try_acquire()
+
+    def acquire(self, identity_id, resource, timeout=None):
+        """
+        Admits a request, waiting for a token if the limiter is blocking.
+
+        :param identity_id: the requestor identity id
+        :type identity_id: str | None
+        :param str resource: the resource, such as ``/secrets``
+        :param timeout:
+            the maximum number of seconds to wait, overriding the timeout of
+            the limiter
+        :type timeout: float | None
+        :raises RateLimitExceeded: if the request is refused
+        """
+        bucket = self.bucket(identity_id, resource)
+        if not self.blocking:
+            if not bucket.try_acquire():
+                raise RateLimitExceeded(
+                    "rate limit exceeded, retry in {:.3f}s".format(
+                        bucket.wait_time()))
+            return
+        bucket.acquire(timeout=self.__timeout if timeout is None else timeout)
+
+    def release(self, identity_id, resource):
+        """
+        Gives back the token of a request that was admitted but not made.
+
+        :param identity_id: the requestor identity id
+        :type identity_id: str | None
+        :param str resource: the resource, such as ``/secrets``
+        """
+        self.bucket(identity_id, resource).release()
@@ -0,0 +1,213 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+from __future__ import absolute_import, division
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+
+from . import crypto
+
+__all__ = ["KeyReservoir"]
+
+
+def generate_private_key_der():
+    """
+    Generates a private key, serialized so it can be returned from another
+    process.
+
+    :return: the private key in unencrypted PKCS8 DER format
+    :rtype: bytes
+    """
+    return crypto.generate_private_key().private_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption())
+
+
+def load_private_key_der(der):
+    """
+    Loads a private key returned by :func:`generate_private_key_der`. The
+    key was generated by this library, so the costly consistency checks of
+    an RSA key from an untrusted source are skipped where supported.
+
+    :param bytes der: the private key in unencrypted PKCS8 DER format
+    :return: the private key
+    :rtype: :class:`~rsa.RSAPrivateKey`
+    """
+    try:
+        return serialization.load_der_private_key(
+            der, password=None, backend=default_backend(),
+            unsafe_skip_rsa_key_validation=True)
+    except TypeError:
+        # the validation cannot be skipped before cryptography 39
+        return serialization.load_der_private_key(
+            der, password=None, backend=default_backend())
+
+
+class KeyReservoir(object):
+    """
+    Keeps a number of pre-generated RSA key pairs, refilled in the background
+    by a pool of processes, so creating an identity does not wait for its two
+    key pairs to be generated.
+
+    :func:`~.KeyReservoir.take` never waits: when the reservoir has run dry
+    it returns None, and the caller generates the key pair itself.
+
+    >>> client = Client(dict(key_store=key_store, api_client=api_client,
+    ...                      key_reservoir=KeyReservoir(depth=16)))
+    """
+
+    def __init__(self, depth=8, workers=None, executor=None,
+                 rate_window=60.0, clock=time.time):
+        """
+        Creates a new reservoir and starts filling it.
+
+        :param int depth: the number of key pairs kept ready
+        :param workers:
+            the number of processes generating key pairs, which defaults to
+            the number of processors
+        :type workers: int | None
+        :param executor:
+            the executor generating key pairs instead of a process pool of
+            its own, which is not shut down when the reservoir is closed
+        :type executor: :class:`concurrent.futures.Executor` | None
+        :param float rate_window:
+            the number of seconds over which the refill rate is measured
+        :param clock: the function returning the current time in seconds
+        """
+        if depth < 1:
+            raise ValueError("depth must be at least 1")
+        self.__depth = depth
+        self.__owns_executor = executor is None
+        self.__executor = ProcessPoolExecutor(max_workers=workers) \
+            if executor is None else executor
+        self.__rate_window = rate_window
+        self.__clock = clock
+        self.__lock = threading.Lock()
+        self.__keys = deque()
+        self.__pending = 0
+        self.__generated = 0
+        self.__taken = 0
+        self.__misses = 0
+        self.__errors = 0
+        self.__completed = deque()
+        self.__started = clock()
+        self.__closed = False
+        self.__refill()
+
+    @property
+    def depth(self):
+        return self.__depth
+
+    @property
+    def metrics(self):
+        """
+        A snapshot of the reservoir: the number of key pairs ready and being
+        generated, the number generated, taken and missed because the
+        reservoir was dry, the number of failed generations, and the refill
+        rate in key pairs per second over the recent ``rate_window``.
+
+        :rtype: dict[str, int | float]
+        """
+        with self.__lock:
+            now = self.__clock()
+            self.__expire_completed(now)
+            elapsed = min(self.__rate_window, now - self.__started)
+            return dict(available=len(self.__keys),
+                        pending=self.__pending,
+                        depth=self.__depth,
+                        generated=self.__generated,
+                        taken=self.__taken,
+                        misses=self.__misses,
+                        errors=self.__errors,
+                        refill_rate=len(self.__completed) / elapsed
+                        if elapsed > 0 else 0.0)
+
+    def take(self):
+        """
+        Takes a pre-generated key pair, if one is ready.
+
+        :return: the private key, or None if the reservoir is dry
+        :rtype: :class:`~rsa.RSAPrivateKey` | None
+        """
+        with self.__lock:
+            if self.__keys:
+                key = self.__keys.popleft()
+                self.__taken += 1
+            else:
+                key = None
+                self.__misses += 1
+        self.__refill()
+        if key is None:
+            return None
+        return load_private_key_der(key)
+
+    def close(self):
+        """
+        Stops refilling the reservoir and discards the key pairs in it,
+        waiting for the key pairs being generated by its own pool.
+        """
+        with self.__lock:
+            self.__closed = True
+            self.__keys.clear()
+        if self.__owns_executor:
+            try:
+                self.__executor.shutdown(wait=True, cancel_futures=True)
+            except TypeError:
+                # cancel_futures is only supported from python 3.9
+                self.__executor.shutdown(wait=True)
+
+    def __refill(self):
+        with self.__lock:
+            if self.__closed:
+                return
+            wanted = self.__depth - len(self.__keys) - self.__pending
+            self.__pending += max(0, wanted)
+        for _ in range(wanted):
+            try:
+                future = self.__executor.submit(generate_private_key_der)
+            except RuntimeError:
+                # the executor was shut down
+                with self.__lock:
+                    self.__pending -= 1
+                continue
+            future.add_done_callback(self.__filled)
+
+    def __filled(self, future):
+        with self.__lock:
+            self.__pending -= 1
+            if future.cancelled() or future.exception() is not None:
+                # not retried until the next take, so a broken pool does not
+                # spin
+                self.__errors += 1
+                return
+            if self.__closed:
+                return
+            now = self.__clock()
+            self.__keys.append(future.result())
+            self.__generated += 1
+            self.__completed.append(now)
+            self.__expire_completed(now)
+
+    def __expire_completed(self, now):
+        # must be called while holding the lock
+        while self.__completed and \
+                self.__completed[0] <= now - self.__rate_window:
+            self.__completed.popleft()
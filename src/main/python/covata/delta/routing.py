@@ -0,0 +1,235 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+from __future__ import absolute_import, division
+
+import random
+import threading
+import time
+
+import six.moves.urllib as urllib
+
+__all__ = ["Endpoint", "EndpointRouter"]
+
+
+class Endpoint(object):
+    """
+    A Delta API endpoint with exponentially weighted moving averages (EWMA)
+    of its latency and error rate.
+    """
+
+    def __init__(self, url):
+        """
+        Creates a new endpoint that has not been measured yet.
+
+        :param str url: the versioned base url of the endpoint
+        """
+        self.__url = url.rstrip("/")
+        self.__host = urllib.parse.urlparse(self.__url).netloc
+        self.latency = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_until = None
+
+    @property
+    def url(self):
+        return self.__url
+
+    @property
+    def host(self):
+        return self.__host
+
+    def ejected(self, now):
+        """
+        Gets whether the endpoint is ejected at the given time.
+
+        :param float now: the current time in seconds
+        :rtype: bool
+        """
+        return self.ejected_until is not None and now < self.ejected_until
+
+    def score(self):
+        """
+        Gets the expected latency of a request to this endpoint, allowing for
+        the requests that fail and must be repeated elsewhere. Endpoints that
+        have not been measured score zero so they are tried first.
+
+        :rtype: float
+        """
+        if self.latency is None:
+            return 0.0
+        return self.latency / max(0.01, 1.0 - self.error_rate)
+
+    def __repr__(self):
+        return "Endpoint({!r})".format(self.url)
+
+
+class EndpointRouter(object):
+    """
+    Routes requests across several Delta API endpoints, such as regional
+    deployments, preferring the healthy endpoint with the lowest latency.
+
+    The latency and error rate of every request are folded into moving
+    averages per endpoint. An endpoint whose error rate reaches
+    ``error_threshold`` is ejected for ``ejection_duration`` seconds, and the
+    ejection doubles each time it recurs, up to ``max_ejection_duration``.
+    A proportion ``probe_ratio`` of requests goes to another healthy
+    endpoint, so the latency of endpoints that are not preferred keeps being
+    measured. If every endpoint is ejected, the one due back first is used.
+
+    >>> router = EndpointRouter(["https://eu.delta.example.com/v1",
+    ...                          "https://us.delta.example.com/v1"])
+    >>> api_client = ApiClient(key_store, endpoint_router=router)
+    """
+
+    def __init__(self, base_urls, decay=0.3, error_threshold=0.5,
+                 ejection_duration=30.0, max_ejection_duration=300.0,
+                 probe_ratio=0.05, clock=time.time, random_=None):
+        """
+        Creates a new router over the given endpoints.
+
+        :param base_urls:
+            the versioned base urls of the endpoints, which must all serve the
+            same API version, in order of preference before any are measured
+        :type base_urls: list[str]
+        :param float decay:
+            the weight of each new sample in the moving averages
+        :param float error_threshold:
+            the average error rate at which an endpoint is ejected
+        :param float ejection_duration:
+            the number of seconds an endpoint is first ejected for
+        :param float max_ejection_duration:
+            the longest an endpoint is ejected for
+        :param float probe_ratio:
+            the proportion of requests sent to an endpoint other than the
+            preferred one
+        :param clock: the function returning the current time in seconds
+        :param random_: the random number generator used to pick probes
+        :type random_: random.Random | None
+        """
+        if not base_urls:
+            raise ValueError("at least one base url is required")
+        if not 0 < decay <= 1:
+            raise ValueError("decay must be between 0 and 1")
+        endpoints = [Endpoint(url) for url in base_urls]
+        # the CVT1 canonical uri is derived from the path of the url, so a
+        # request must have the same path on every endpoint to be signed the
+        # same way wherever it is sent
+        paths = set(urllib.parse.urlparse(e.url).path for e in endpoints)
+        if len(paths) > 1:
+            raise ValueError(
+                "base urls must share the same path, got {}".format(
+                    sorted(paths)))
+
+        self.__lock = threading.Lock()
+        self.__endpoints = endpoints
+        self.__decay = decay
+        self.__error_threshold = error_threshold
+        self.__ejection_duration = ejection_duration
+        self.__max_ejection_duration = max_ejection_duration
+        self.__probe_ratio = probe_ratio
+        self.__clock = clock
+        self.__random = random.Random() if random_ is None else random_
+
+    @property
+    def endpoints(self):
+        """
+        The endpoints, in their original order.
+
+        :rtype: list[:class:`~.Endpoint`]
+        """
+        return list(self.__endpoints)
+
+    @property
+    def metrics(self):
+        """
+        A snapshot of the latency and error averages, request and failure
+        counts, and ejection state of each endpoint by url.
+
+        :rtype: dict[str, dict[str, any]]
+        """
+        with self.__lock:
+            now = self.__clock()
+            return dict((e.url, dict(latency=e.latency,
+                                     error_rate=e.error_rate,
+                                     requests=e.requests,
+                                     failures=e.failures,
+                                     ejections=e.ejections,
+                                     ejected=e.ejected(now)))
+                        for e in self.__endpoints)
+
+    def select(self, exclude=()):
+        """
+        Selects the endpoint for the next request.
+
+        :param exclude: the endpoints already tried by this request
+        :type exclude: collections.Container[:class:`~.Endpoint`]
+        :return: the endpoint, or None if every endpoint is excluded
+        :rtype: :class:`~.Endpoint` | None
+        """
+        with self.__lock:
+            now = self.__clock()
+            candidates = [e for e in self.__endpoints if e not in exclude]
+            if not candidates:
+                return None
+            healthy = [e for e in candidates if not e.ejected(now)]
+            if not healthy:
+                return min(candidates, key=lambda e: e.ejected_until)
+
+            # stable sort, so unmeasured endpoints keep their given order
+            ranked = sorted(healthy, key=Endpoint.score)
+            if len(ranked) > 1 and \
+                    self.__random.random() < self.__probe_ratio:
+                return self.__random.choice(ranked[1:])
+            return ranked[0]
+
+    def record(self, endpoint, latency, failed):
+        """
+        Records the outcome of a request sent to an endpoint.
+
+        :param endpoint: the endpoint returned by
+            :func:`~.EndpointRouter.select`
+        :type endpoint: :class:`~.Endpoint`
+        :param float latency: the number of seconds the request took
+        :param failed:
+            whether the request failed because the endpoint is unhealthy;
+            None if it failed for an unrelated reason and should not count
+        :type failed: bool | None
+        """
+        if failed is None:
+            return
+        with self.__lock:
+            now = self.__clock()
+            decay = self.__decay
+            endpoint.requests += 1
+            endpoint.failures += 1 if failed else 0
+            endpoint.latency = latency if endpoint.latency is None \
+                else decay * latency + (1 - decay) * endpoint.latency
+            endpoint.error_rate = decay * (1.0 if failed else 0.0) + \
+                (1 - decay) * endpoint.error_rate
+
+            if endpoint.ejected_until is not None and \
+                    not endpoint.ejected(now) and not failed:
+                # back in rotation after a successful request
+                endpoint.ejected_until = None
+                endpoint.ejections = 0
+            if failed and endpoint.error_rate >= self.__error_threshold:
+                endpoint.ejections += 1
+                endpoint.ejected_until = now + min(
+                    self.__max_ejection_duration,
+                    self.__ejection_duration *
+                    2 ** (endpoint.ejections - 1))
+                endpoint.error_rate = 0.0
@@ -16,23 +16,30 @@ from __future__ import absolute_import
 
 import json
 import re
-from base64 import b64encode
+from base64 import b64decode, b64encode
 from collections import OrderedDict
 from collections import namedtuple
 from datetime import datetime
 
 import six.moves.urllib as urllib
+from cryptography.exceptions import InvalidSignature
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.asymmetric import padding
 
 from . import crypto
 
-__all__ = ["get_updated_headers"]
+__all__ = ["get_updated_headers", "parse_authorization", "verify_signature"]
 
 UNDESIRED_HEADERS = ["Connection", "Content-Length"]
 SIGNING_ALGORITHM = "CVT1-RSA4096-SHA256"
 CVT_DATE_FORMAT = "%Y%m%dT%H%M%SZ"
 
+Authorization = namedtuple("Authorization", [
+    "identity_id",
+    "signed_headers",
+    "signature"
+])
+
 
 class SignatureMaterial(namedtuple('SignatureMaterial', [
     'method',
@@ -75,9 +82,17 @@ class SignatureMaterial(namedtuple('SignatureMaterial', [
                         salt_length=32),
             hashes.SHA256())
 
+    def verify(self, signature, public_key):
+        public_key.verify(
+            signature,
+            self.string_to_sign.encode("utf-8"),
+            padding.PSS(mgf=padding.MGF1(hashes.SHA256()),
+                        salt_length=32),
+            hashes.SHA256())
+
 
 def get_updated_headers(identity_id, method, url, headers, payload,
-                        private_signing_key):
+                        private_signing_key, hashed_payload=None):
     """
     Gets an updated header dictionary with an authorization header
     signed using the CVT1 request signing scheme.
@@ -89,13 +104,17 @@ def get_updated_headers(identity_id, method, url, headers, payload,
     :type headers: dict[str, str]
     :param bytes payload: the request payload
     :param private_signing_key: the private signing key object
+    :param hashed_payload:
+        the precomputed SHA256 hex digest of the canonical JSON payload, for
+        streamed payloads that cannot be held in memory
+    :type hashed_payload: str | None
     :return:
         the original headers with additional Cvt-Date, Host, and
         Authorization headers.
     :rtype: dict[str, str]
     """
     signature_materials = __get_signature_materials(
-        method, url, headers, payload)
+        method, url, headers, payload, hashed_payload)
 
     signature = signature_materials.sign(private_signing_key)
     headers_ = signature_materials.headers_
@@ -109,12 +128,73 @@ def get_updated_headers(identity_id, method, url, headers, payload,
     return headers_
 
 
-def __get_signature_materials(method, url, headers, payload):
-    # type: (str, str, dict, bytes) -> SignatureMaterial
+def parse_authorization(value):
+    """
+    Parses the value of a CVT1 Authorization header.
+
+    :param str value: the Authorization header value
+    :return: the authorizing identity id, signed headers and signature
+    :rtype: :class:`Authorization`
+    :raises ValueError: if the value is not a CVT1 Authorization header
+    """
+    match = re.match(
+        r"^{} Identity=([^,\s]+),\s*SignedHeaders=([^,\s]*),"
+        r"\s*Signature=(\S+)$".format(SIGNING_ALGORITHM),
+        value.strip() if value else "")
+    if match is None:
+        raise ValueError("not a {} authorization header".format(
+            SIGNING_ALGORITHM))
+    return Authorization(identity_id=match.group(1),
+                         signed_headers=match.group(2),
+                         signature=match.group(3))
+
+
+def verify_signature(method, url, headers, payload, public_signing_key):
+    """
+    Verifies the CVT1 signature of a request, as the Delta service would.
+    The signature is computed over the headers named in the Authorization
+    header and the uncompressed payload.
+
+    :param str method: the HTTP request method
+    :param str url: the request url
+    :param headers: the request headers
+    :type headers: dict[str, str]
+    :param payload: the uncompressed request payload
+    :type payload: bytes | None
+    :param public_signing_key: the public signing key of the identity
+    :type public_signing_key: :class:`~rsa.RSAPublicKey`
+    :return: the authorizing identity id
+    :rtype: str
+    :raises cryptography.exceptions.InvalidSignature:
+        if the request is not signed, or the signature does not match
+    """
+    headers_ = dict((k.lower(), v) for k, v in headers.items())
+    try:
+        authorization = parse_authorization(headers_.get("authorization"))
+        signature = b64decode(authorization.signature)
+        signed_headers = dict(
+            (name, headers_[name])
+            for name in authorization.signed_headers.split(";"))
+        cvt_date = signed_headers["cvt-date"]
+    except (KeyError, ValueError, TypeError):
+        raise InvalidSignature()
+
+    signature_materials = __get_signature_materials(
+        method, url, signed_headers, payload or None, cvt_date=cvt_date)
+    if signature_materials.signed_headers != authorization.signed_headers:
+        raise InvalidSignature()
+    signature_materials.verify(signature, public_signing_key)
+    return authorization.identity_id
+
+
+def __get_signature_materials(method, url, headers, payload,
+                              hashed_payload=None, cvt_date=None):
+    # type: (str, str, dict, bytes, str, str) -> SignatureMaterial
     url_parsed = urllib.parse.urlparse(url)
-    cvt_date = datetime.utcnow().strftime(CVT_DATE_FORMAT)
     headers_ = dict(headers)
-    headers_["Cvt-Date"] = cvt_date
+    if cvt_date is None:
+        cvt_date = datetime.utcnow().strftime(CVT_DATE_FORMAT)
+        headers_["Cvt-Date"] = cvt_date
 
     # /master/identities/a123?key=an+arbitrary+value&key2=x
     uri = __encode_uri("/".join(url_parsed.path.split("/")[2:]))
@@ -129,7 +209,8 @@ def __get_signature_materials(method, url, headers, payload):
         "{}:{}".format(k, v) for (k, v) in sorted_header.items())
 
     signed_headers = ";".join(sorted_header.keys())
-    hashed_payload = __get_hashed_payload(payload)
+    if hashed_payload is None:
+        hashed_payload = __get_hashed_payload(payload)
 
     return SignatureMaterial(method=method,
                              uri=uri,
@@ -0,0 +1,488 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+from __future__ import absolute_import
+
+import json
+import socket
+from abc import ABCMeta, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import six
+from requests import Response
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.exceptions import ConnectionError, ConnectTimeout, \
+    HTTPError, ReadTimeout
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.exceptions import HTTPError as PoolError
+
+from . import compression
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+__all__ = ["DeltaTransport", "RequestsTransport", "InMemoryTransport",
+           "TransportRequest", "TransportResponse", "Http2Adapter"]
+
+CHUNK_SIZE = 64 * 1024
+
+HOP_BY_HOP_HEADERS = frozenset([
+    "connection", "keep-alive", "proxy-connection", "transfer-encoding",
+    "upgrade", "te"])
+
+
+class TransportRequest(object):
+    """
+    A request to be sent by a :class:`~.DeltaTransport`. Request signers
+    update the headers of the request in place.
+
+    A streamed body is an iterable of byte chunks; its ``hashed_payload``
+    must then be set to the SHA256 hex digest of the canonical JSON payload
+    as the body cannot be read twice for signing.
+    """
+
+    def __init__(self, method, url, headers=None, body=None):
+        """
+        Creates a new transport request.
+
+        :param str method: the HTTP request method
+        :param str url: the absolute url including the query string
+        :param headers: the request headers
+        :type headers: dict[str, str] | None
+        :param body: the request body, or an iterable of body chunks
+        :type body: bytes | collections.Iterable[bytes] | None
+        """
+        self.method = method
+        self.url = url
+        self.headers = {} if headers is None else dict(headers)
+        self.body = body
+        self.hashed_payload = None
+
+
+class TransportResponse(object):
+    """
+    The response returned by a :class:`~.DeltaTransport`. Header names are
+    normalised to lower case.
+
+    The body of a streamed response is an iterable of byte chunks that is
+    read from the connection as it is consumed.
+    """
+
+    def __init__(self, status, headers, body):
+        """
+        Creates a new transport response.
+
+        :param int status: the HTTP status code
+        :param headers: the response headers
+        :type headers: dict[str, str]
+        :param body: the response body, or an iterable of body chunks
+        :type body: bytes | collections.Iterable[bytes]
+        """
+        self.status = int(status)
+        self.headers = dict((k.lower(), v) for k, v in headers.items())
+        self.body = body
+
+    @property
+    def content(self):
+        if not isinstance(self.body, bytes):
+            self.body = b"".join(self.body)
+        return self.body
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def iter_content(self, chunk_size=CHUNK_SIZE):
+        """
+        Iterates over the body in chunks, reading a streamed body
+        incrementally.
+
+        :param int chunk_size: the chunk size for bodies already in memory
+        :return: the body chunks
+        :rtype: collections.Iterable[bytes]
+        """
+        body = self.body
+        if isinstance(body, bytes):
+            return (body[i:i + chunk_size]
+                    for i in range(0, len(body), chunk_size))
+        return iter(body)
+
+    def close(self):
+        """
+        Releases the connection of a streamed response that has not been
+        read to the end.
+        """
+        close = getattr(self.body, "close", None)
+        if close is not None:
+            close()
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        """
+        Raises a :class:`requests.HTTPError` if the status code indicates a
+        client or server error.
+        """
+        if self.status >= 400:
+            raise HTTPError("{} Error".format(self.status), response=self)
+
+
+@six.add_metaclass(ABCMeta)
+class DeltaTransport(object):
+    """
+    The transport sends requests built and signed by the
+    :class:`~.ApiClient` and returns the raw responses.
+    """
+
+    @abstractmethod
+    def send(self, method, url, headers, body, timeout=None):
+        """
+        Sends a request and returns its response. The body of the returned
+        response must already be decoded from any ``Content-Encoding``
+        applied by the server.
+
+        :param str method: the HTTP request method
+        :param str url: the absolute url including the query string
+        :param headers: the request headers
+        :type headers: dict[str, str]
+        :param body:
+            the request body, or an iterable of chunks to send with chunked
+            transfer encoding
+        :type body: bytes | collections.Iterable[bytes] | None
+        :param timeout:
+            the number of seconds to wait to connect and for each read from
+            the connection, or None to wait indefinitely
+        :type timeout: float | None
+        :return: the response
+        :rtype: :class:`~.TransportResponse`
+        """
+
+    def stream(self, method, url, headers, body, timeout=None):
+        """
+        Sends a request and returns its response without reading the body
+        into memory. The body of the returned response is an iterable of
+        decoded chunks.
+
+        The default implementation reads the whole body with
+        :func:`~.DeltaTransport.send`; transports able to read incrementally
+        should override it.
+
+        :param str method: the HTTP request method
+        :param str url: the absolute url including the query string
+        :param headers: the request headers
+        :type headers: dict[str, str]
+        :param body: the request body
+        :type body: bytes | None
+        :param timeout:
+            the number of seconds to wait to connect and for each read from
+            the connection, or None to wait indefinitely
+        :type timeout: float | None
+        :return: the streamed response
+        :rtype: :class:`~.TransportResponse`
+        """
+        response = self.send(method, url, headers, body, timeout)
+        response.body = response.iter_content()
+        return response
+
+    def warm_up(self, url, connections=1, timeout=None):
+        """
+        Opens pooled connections to the host of the given url ahead of the
+        first requests, so they do not pay for name resolution, the TCP
+        handshake and the TLS handshake.
+
+        The default implementation opens no connections; transports with a
+        connection pool should override it.
+
+        :param str url: the url of the host
+        :param int connections: the number of connections to open
+        :param timeout:
+            the number of seconds to wait for each connection, or None to
+            wait indefinitely
+        :type timeout: float | None
+        :return: the number of connections open and ready for requests
+        :rtype: int
+        """
+        return 0
+
+    def close(self):
+        """
+        Releases any resources, such as pooled connections, held by the
+        transport.
+        """
+
+
+class RequestsTransport(DeltaTransport):
+    """
+    The default transport, sending requests over the connection pool of a
+    :class:`requests.Session`. Mount an :class:`~.Http2Adapter` on the
+    session to multiplex requests over HTTP/2.
+    """
+
+    def __init__(self, session=None):
+        """
+        Creates a new transport backed by the given session.
+
+        :param session: the session used to send requests
+        :type session: :class:`requests.Session` | None
+        """
+        self.__session = requests.Session() if session is None else session
+
+    @property
+    def session(self):
+        return self.__session
+
+    def send(self, method, url, headers, body, timeout=None):
+        r = self.session.request(method, url, headers=headers, data=body,
+                                 timeout=timeout)
+        return TransportResponse(r.status_code, r.headers, r.content)
+
+    def stream(self, method, url, headers, body, timeout=None):
+        r = self.session.request(method, url, headers=headers, data=body,
+                                 stream=True, timeout=timeout)
+
+        def chunks():
+            try:
+                for chunk in r.iter_content(CHUNK_SIZE):
+                    yield chunk
+            finally:
+                r.close()
+
+        return TransportResponse(r.status_code, r.headers, chunks())
+
+    def warm_up(self, url, connections=1, timeout=None):
+        """
+        Connects up to ``connections`` connections of the pool used for the
+        given url in parallel, resolving the host name and completing the TLS
+        handshake of each, and returns them to the pool. Connections beyond
+        the pool size of the session's adapter would be discarded and are not
+        opened. Connections that fail to open are not counted, while idle
+        connections already in the pool are.
+
+        Only connections of a :class:`requests.adapters.HTTPAdapter` are
+        opened ahead of time.
+        """
+        adapter = self.session.get_adapter(url)
+        if not isinstance(adapter, HTTPAdapter):
+            return 0
+
+        settings = self.session.merge_environment_settings(
+            url, {}, None, None, None)
+        if hasattr(adapter, "get_connection_with_tls_context"):
+            pool = adapter.get_connection_with_tls_context(
+                requests.Request("GET", url).prepare(), settings["verify"],
+                settings["proxies"], settings["cert"])
+        else:  # pragma: no cover
+            pool = adapter.get_connection(url, settings["proxies"])
+
+        maxsize = getattr(pool.pool, "maxsize", connections) or connections
+        pooled = [pool._get_conn() for _ in range(min(connections, maxsize))]
+
+        def connect(conn):
+            if getattr(conn, "sock", None) is not None:
+                return True
+            if timeout is not None:
+                conn.timeout = timeout
+            try:
+                conn.connect()
+                return True
+            except (socket.error, PoolError):
+                conn.close()
+                return False
+
+        try:
+            with ThreadPoolExecutor(max_workers=len(pooled) or 1) as executor:
+                return sum(executor.map(connect, pooled))
+        finally:
+            for conn in pooled:
+                pool._put_conn(conn)
+
+    def close(self):
+        self.session.close()
+
+
+class InMemoryTransport(DeltaTransport):
+    """
+    A transport that hands requests to a function in the same process
+    rather than to the network, for testing and for benchmarking the client
+    without sockets.
+
+    >>> transport = InMemoryTransport(
+    ...     lambda method, url, headers, body: (200, {}, b"[]"))
+    """
+
+    def __init__(self, handler):
+        """
+        Creates a new in-memory transport.
+
+        :param handler:
+            a function taking the method, url, headers and body of a request
+            and returning a :class:`~.TransportResponse` or a
+            (status, headers, body) tuple
+        """
+        self.__handler = handler
+
+    @property
+    def handler(self):
+        return self.__handler
+
+    def send(self, method, url, headers, body, timeout=None):
+        response = self.handler(method, url, dict(headers), body)
+        if not isinstance(response, TransportResponse):
+            response = TransportResponse(*response)
+        content_encoding = response.headers.pop("content-encoding", None)
+        response.body = compression.decode(response.body, content_encoding)
+        return response
+
+
+class Http2Adapter(BaseAdapter):
+    """
+    A :class:`requests.adapters.BaseAdapter` that sends requests over
+    HTTP/2, multiplexing concurrent requests as streams over a single
+    connection per host instead of opening one HTTP/1.1 connection (and TLS
+    handshake) per in-flight request.
+
+    The adapter is thread-safe and is intended to be shared by all threads
+    using the session it is mounted on:
+
+    >>> session = requests.Session()
+    >>> session.mount("https://", Http2Adapter())
+    >>> api_client = ApiClient(key_store, RequestsTransport(session))
+
+    Requires the optional ``httpx[http2]`` package. TLS verification,
+    client certificates and proxies are configured once through
+    ``client_options`` rather than per request.
+    """
+
+    def __init__(self, client=None, **client_options):
+        """
+        Creates a new HTTP/2 adapter.
+
+        :param client: an existing HTTP/2 enabled client to send requests with
+        :type client: :class:`httpx.Client` | None
+        :param client_options:
+            keyword arguments for the :class:`httpx.Client` created when no
+            client is given
+        """
+        super(Http2Adapter, self).__init__()
+        if client is None:
+            if httpx is None:
+                raise ImportError(
+                    "Http2Adapter requires the httpx[http2] package")
+            client = httpx.Client(http2=True, **client_options)
+        self.__client = client
+
+    @property
+    def client(self):
+        return self.__client
+
+    def send(self, request, stream=False, timeout=None, verify=True,
+             cert=None, proxies=None):
+        """
+        Sends the prepared request over HTTP/2.
+
+        :param request: the prepared request
+        :type request: :class:`requests.PreparedRequest`
+        :param bool stream:
+            whether to read the response body as it is consumed rather than
+            into memory
+        :param timeout:
+            the request timeout in seconds, or a (connect, read) tuple
+        :type timeout: float | (float, float) | None
+        :return: the response
+        :rtype: :class:`requests.Response`
+        """
+        headers = dict((k, v) for k, v in request.headers.items()
+                       if k.lower() not in HOP_BY_HOP_HEADERS)
+        try:
+            r = self.client.send(
+                self.client.build_request(request.method,
+                                          request.url,
+                                          headers=headers,
+                                          content=request.body,
+                                          timeout=self.__timeout(timeout)),
+                stream=True)
+        except httpx.ConnectTimeout as e:
+            raise ConnectTimeout(e, request=request)
+        except httpx.TimeoutException as e:
+            raise ReadTimeout(e, request=request)
+        except httpx.TransportError as e:
+            raise ConnectionError(e, request=request)
+
+        response = Response()
+        response.status_code = r.status_code
+        response.reason = r.reason_phrase
+        response.headers = CaseInsensitiveDict(r.headers.items())
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = _Http2Body(r, request)
+        if not stream:
+            try:
+                response._content = response.raw.read()
+            finally:
+                response.raw.close()
+            response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        self.client.close()
+
+    @staticmethod
+    def __timeout(timeout):
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            return httpx.Timeout(connect=connect, read=read,
+                                 write=read, pool=connect)
+        return httpx.Timeout(timeout)
+
+
+class _Http2Body(object):
+    """
+    The raw body of a response received by the :class:`~.Http2Adapter`, read
+    from the HTTP/2 stream as it is consumed and already decoded from any
+    ``Content-Encoding``.
+    """
+
+    def __init__(self, response, request):
+        self.__response = response
+        self.__request = request
+        self.__chunks = response.iter_bytes()
+        self.__buffer = bytearray()
+
+    def read(self, amt=None):
+        buffer = self.__buffer
+        try:
+            while amt is None or len(buffer) < amt:
+                chunk = next(self.__chunks, None)
+                if chunk is None:
+                    break
+                buffer += chunk
+        except httpx.TimeoutException as e:
+            raise ReadTimeout(e, request=self.__request)
+        except httpx.TransportError as e:
+            raise ConnectionError(e, request=self.__request)
+        if amt is None:
+            amt = len(buffer)
+        data = bytes(buffer[:amt])
+        del buffer[:amt]
+        return data
+
+    def close(self):
+        self.__response.close()
@@ -12,7 +12,13 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import codecs
 import inspect
+import json
+from base64 import b64decode, b64encode
+from datetime import date, datetime, timedelta
+
+import six
 from decorator import decorator
 
 
@@ -52,3 +58,202 @@ def check_optional_pagination(arguments):
     return check_arguments(arguments,
                            lambda x: x is None or int(x) > 0,
                            "must be a non-zero positive integer")
+
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+
+
+def parse_timestamp(value):
+    """
+    Parses a UTC timestamp in the fixed format of Delta, such as
+    ``2017-02-28T22:20:39.097Z``, into the number of microseconds since the
+    epoch. This is several times faster than :func:`datetime.strptime`.
+
+    :param str value: the timestamp
+    :return: the number of microseconds since 1970-01-01T00:00:00Z
+    :rtype: int
+    :raises ValueError: if the timestamp is not in the expected format
+    """
+    length = len(value)
+    if length < 20 or value[4] != "-" or value[7] != "-" or \
+            value[10] != "T" or value[13] != ":" or value[16] != ":" or \
+            value[-1] != "Z":
+        raise ValueError("invalid timestamp: {!r}".format(value))
+    if length == 20:
+        microsecond = 0
+    elif value[19] == "." and 22 <= length <= 27:
+        microsecond = int(value[20:-1]) * 10 ** (27 - length)
+    else:
+        raise ValueError("invalid timestamp: {!r}".format(value))
+    hour = int(value[11:13])
+    minute = int(value[14:16])
+    second = int(value[17:19])
+    if hour > 23 or minute > 59 or second > 59:
+        raise ValueError("invalid timestamp: {!r}".format(value))
+    # date validates the day of the month and converts it to days in C
+    days = date(int(value[0:4]), int(value[5:7]),
+                int(value[8:10])).toordinal() - _EPOCH_ORDINAL
+    return ((days * 86400 + hour * 3600 + minute * 60 + second) * 1000000 +
+            microsecond)
+
+
+def timestamp_to_datetime(timestamp_us):
+    """
+    Converts a number of microseconds since the epoch into a naive UTC
+    datetime.
+
+    :param int timestamp_us: the number of microseconds since the epoch
+    :rtype: datetime
+    """
+    return _EPOCH + timedelta(microseconds=timestamp_us)
+
+
+def intern_id(value):
+    """
+    Interns an id that is repeated across many objects, such as the id of
+    the identity that created many secrets, so that the objects share one
+    copy of it rather than one per object.
+
+    Only native strings can be interned, so on python 2 ``unicode`` ids,
+    such as those parsed from JSON, are returned unchanged.
+
+    :param value: the id
+    :type value: str | None
+    :return: the interned id
+    :rtype: str | None
+    """
+    return six.moves.intern(value) if type(value) is str else value
+
+
+def b64encode_stream(chunks):
+    """
+    Encodes data arriving in chunks of arbitrary size as base64, yielding
+    the encoded bytes as soon as complete 3 byte groups are available. The
+    concatenated output equals the encoding of the concatenated input.
+
+    :param chunks: the chunks to be encoded
+    :type chunks: collections.Iterable[bytes]
+    :return: the base64 encoded chunks
+    :rtype: collections.Iterable[bytes]
+    """
+    remainder = b""
+    for chunk in chunks:
+        data = remainder + chunk if remainder else chunk
+        cut = len(data) - len(data) % 3
+        if cut:
+            yield b64encode(data[:cut])
+        remainder = data[cut:]
+    if remainder:
+        yield b64encode(remainder)
+
+
+def b64decode_stream(chunks):
+    """
+    Decodes base64 encoded data arriving in chunks of arbitrary size,
+    yielding the decoded bytes as soon as complete 4 character groups are
+    available. Whitespace between chunks is ignored.
+
+    :param chunks: the base64 encoded chunks
+    :type chunks: collections.Iterable[bytes | str]
+    :return: the decoded chunks
+    :rtype: collections.Iterable[bytes]
+    """
+    remainder = b""
+    for chunk in chunks:
+        if isinstance(chunk, six.text_type):
+            chunk = chunk.encode("ascii")
+        data = remainder + chunk.translate(None, b" \t\r\n")
+        cut = len(data) - len(data) % 4
+        if cut:
+            yield b64decode(data[:cut])
+        remainder = data[cut:]
+    if remainder:
+        yield b64decode(remainder)
+
+
+_JSON_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+_DELIMITERS = ",]" + _WHITESPACE
+
+
+def iter_json_array(chunks):
+    """
+    Parses a JSON array arriving in chunks of arbitrary size, yielding each
+    element as soon as it is complete. Only one element, and the chunk it
+    arrived in, is held in memory at a time.
+
+    :param chunks: the utf-8 encoded chunks of the array
+    :type chunks: collections.Iterable[bytes | str]
+    :return: the elements of the array
+    :rtype: collections.Iterable[any]
+    :raises ValueError: if the chunks do not form a JSON array
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buffer = u""
+    pos = 0
+    eof = False
+    expected = "["
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        if pos == len(buffer):
+            if eof:
+                raise ValueError("incomplete JSON array")
+            buffer, pos, eof = _read_more(chunks, decoder, buffer, pos)
+            continue
+
+        char = buffer[pos]
+        if expected == "[":
+            if char != "[":
+                raise ValueError("expected a JSON array")
+            pos += 1
+            expected = "first"
+        elif char == "]":
+            if expected == "value":
+                raise ValueError("trailing comma in JSON array")
+            pos += 1
+            if buffer[pos:].strip(_WHITESPACE) or \
+                    not eof and any(_read_rest(chunks, decoder)):
+                raise ValueError("extra data after JSON array")
+            return
+        elif expected == ",":
+            if char != ",":
+                raise ValueError("expected ',' or ']' in JSON array")
+            pos += 1
+            expected = "value"
+        else:
+            try:
+                value, end = _JSON_DECODER.raw_decode(buffer, pos)
+            except ValueError:
+                end = None
+            # a number is only complete once the delimiter after it arrived
+            if end is None or not eof and (
+                    end == len(buffer) or buffer[end] not in _DELIMITERS):
+                if eof:
+                    raise ValueError("invalid JSON array element")
+                buffer, pos, eof = _read_more(chunks, decoder, buffer, pos)
+                continue
+            yield value
+            pos = end
+            expected = ","
+
+
+def _read_more(chunks, decoder, buffer, pos):
+    # returns the unparsed part of the buffer extended by the next chunk
+    for chunk in chunks:
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk)
+        if chunk:
+            return buffer[pos:] + chunk, 0, False
+    return buffer[pos:] + decoder.decode(b"", final=True), 0, True
+
+
+def _read_rest(chunks, decoder):
+    for chunk in chunks:
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk)
+        yield chunk.strip(_WHITESPACE)
+    yield decoder.decode(b"", final=True).strip(_WHITESPACE)
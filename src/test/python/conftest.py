@@ -15,15 +15,50 @@
 import base64
 import shutil
 import tempfile
+from collections import namedtuple
 
 import pytest
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import rsa
 
+from covata.delta import ApiClient, Client, DeltaKeyStore, \
+    FakeDeltaServer, InMemoryTransport
 from covata.delta.keystore import FileSystemKeyStore
 
 
+class MemoryKeyStore(DeltaKeyStore):
+    """
+    Holds keys in memory, recording the size of every batch stored through
+    ``store_keys_many``.
+    """
+
+    def __init__(self):
+        self.keys = {}
+        self.batches = []
+
+    def store_keys(self, identity_id, private_signing_key,
+                   private_encryption_key):
+        if identity_id in self.keys:
+            raise IOError("keys of {} already exist".format(identity_id))
+        self.keys[identity_id] = (private_signing_key, private_encryption_key)
+
+    def store_keys_many(self, keys):
+        self.batches.append(len(keys))
+        super(MemoryKeyStore, self).store_keys_many(keys)
+
+    def get_private_signing_key(self, identity_id):
+        return self.keys[identity_id][0]
+
+    def get_private_encryption_key(self, identity_id):
+        return self.keys[identity_id][1]
+
+
+FakeDelta = namedtuple("FakeDelta", [
+    "server", "key_store", "api_client", "client"
+])
+
+
 @pytest.yield_fixture(scope="function")
 def temp_directory():
     directory = tempfile.mkdtemp()
@@ -43,6 +78,44 @@ def private_key():
                                     backend=default_backend())
 
 
+@pytest.fixture(scope="function")
+def generate_private_key(mocker, private_key):
+    return mocker.patch("covata.delta.crypto.generate_private_key",
+                        return_value=private_key)
+
+
+@pytest.yield_fixture(scope="function")
+def delta_client(generate_private_key):
+    """
+    Returns a function building a :class:`Client` that talks to a
+    :class:`FakeDeltaServer` in memory, with key generation patched to
+    return ``private_key``.
+
+    The function takes the server to use, a hook called with the method,
+    url, headers and body of every request before it is handled, and any
+    extra configuration of the client. The clients built are closed at the
+    end of the test.
+    """
+    clients = []
+
+    def build(server=None, on_request=None, **config):
+        server = FakeDeltaServer() if server is None else server
+
+        def handler(method, url, headers, body):
+            if on_request is not None:
+                on_request(method, url, headers, body)
+            return server.handle(method, url, headers, body)
+
+        key_store = MemoryKeyStore()
+        api_client = ApiClient(key_store, InMemoryTransport(handler))
+        config.update(key_store=key_store, api_client=api_client)
+        clients.append(Client(config))
+        return FakeDelta(server, key_store, api_client, clients[-1])
+    yield build
+    for client in clients:
+        client.close()
+
+
 @pytest.fixture(scope="session")
 def key2bytes():
     def convert(key):
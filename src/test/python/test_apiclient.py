@@ -20,8 +20,9 @@ import requests
 import responses
 from six.moves import urllib
 
-from covata.delta import ApiClient, SecretLookupType
-from covata.delta import crypto
+from covata.delta import ApiClient, InMemoryTransport, SecretLookupType, \
+    TransportResponse
+from covata.delta import compression, crypto, signer
 
 
 @pytest.fixture(scope="function")
@@ -168,6 +169,31 @@ def test_share_secret(api_client, mock_signer):
     assert encryption_details["initialisationVector"] == iv
 
 
+def test_create_secret_from_stream(mocker, key_store):
+    sent = []
+
+    def handler(method, url, headers, body):
+        sent.append(b"".join(body))
+        return 201, {}, json.dumps(dict(id="mock_secret_id")).encode("utf-8")
+
+    get_updated_headers = mocker.patch(
+        "covata.delta.signer.get_updated_headers", return_value={})
+    mocker.patch.object(key_store, "get_private_signing_key")
+    api_client = ApiClient(key_store, InMemoryTransport(handler))
+    encryption_details = dict(symmetricKey="1234", initialisationVector="1312")
+
+    response = api_client.create_secret_from_stream(
+        "requestor_id",
+        lambda: iter([b"MTIz", b"NDU2"]),
+        encryption_details)
+
+    assert response == dict(id="mock_secret_id")
+    assert json.loads(sent[0].decode("utf-8")) == dict(
+        content="MTIzNDU2", encryptionDetails=encryption_details)
+    assert get_updated_headers.call_args[1]["hashed_payload"] == \
+        signer.__get_hashed_payload(sent[0])
+
+
 @responses.activate
 @pytest.mark.parametrize("metadata", [{}, dict(metadata_key="metadata value")])
 def test_update_secret_metadata(api_client, mock_signer, metadata):
@@ -315,6 +341,26 @@ def test_get_secret_content(api_client, mock_signer):
     assert retrieved_content == expected_content
 
 
+@responses.activate
+def test_get_secret_content_stream(api_client, mock_signer):
+    expected_content = b"123456" * 20000
+
+    responses.add(
+        responses.GET,
+        "{base_path}{resource}/{secret_id}/content".format(
+            base_path=ApiClient.DELTA_URL,
+            resource=ApiClient.RESOURCE_SECRETS,
+            secret_id="secret_id"),
+        expected_content)
+
+    chunks = list(api_client.get_secret_content("requestor_id", "secret_id",
+                                                stream=True))
+    mock_signer.assert_called_once_with("requestor_id")
+
+    assert len(chunks) > 1
+    assert b"".join(chunks) == expected_content
+
+
 @responses.activate
 @pytest.mark.parametrize("page", [1, 3.0, "5", None])
 @pytest.mark.parametrize("page_size", [1, "3", 5.0, None])
@@ -434,6 +480,44 @@ def test_get_events(api_client, mock_signer, secret_id, rsa_key_owner_id):
     assert query_params == expected_query_params
 
 
+@responses.activate
+def test_get_events_stream(api_client, mock_signer):
+    expected_json = [dict(id=str(i), type="access_success_event",
+                          timestamp="2017-02-28T22:20:39.097Z",
+                          eventDetails=dict(secretId=str(uuid.uuid4())))
+                     for i in range(1000)]
+    responses.add(
+        responses.GET,
+        "{base_path}{resource}".format(
+            base_path=ApiClient.DELTA_URL,
+            resource=ApiClient.RESOURCE_EVENTS),
+        json=expected_json)
+
+    events = api_client.get_events("requestor_id", stream=True)
+    mock_signer.assert_called_once_with("requestor_id")
+
+    assert not isinstance(events, list)
+    assert list(events) == expected_json
+
+
+def test_stream__should__release_the_response_when_stopped_early(
+        mocker, key_store):
+    response = TransportResponse(200, {}, iter([b'[{"id": "1"}, ',
+                                                b'{"id": "2"}]']))
+    transport = mocker.MagicMock()
+    transport.stream.return_value = response
+    close = mocker.patch.object(response, "close")
+    api_client = ApiClient(key_store, transport)
+    mocker.patch.object(api_client, "signer", return_value=mocker.Mock())
+
+    secrets = api_client.get_secrets("requestor_id", stream=True)
+    assert next(secrets) == dict(id="1")
+    close.assert_not_called()
+    secrets.close()
+    close.assert_called_once_with()
+    transport.send.assert_not_called()
+
+
 @responses.activate
 @pytest.mark.parametrize("requestor_id, secret_id, rsa_key_owner_id", [
     (None, str(uuid.uuid4()), str(uuid.uuid4())),
@@ -590,4 +674,75 @@ def test_construct_signer(mocker, api_client, key_store, private_key):
         url=r.url,
         headers=headers,
         payload=r.body,
-        private_signing_key=private_key)
+        private_signing_key=private_key,
+        hashed_payload=None)
+
+
+@pytest.fixture(scope="function")
+def signed_payloads(mocker):
+    payloads = []
+
+    def get_updated_headers(**kwargs):
+        payloads.append(kwargs["payload"])
+        return dict(kwargs["headers"])
+
+    mocker.patch("covata.delta.signer.get_updated_headers",
+                 side_effect=get_updated_headers)
+    return payloads
+
+
+@pytest.mark.parametrize("content, compressed", [
+    ("abc", False),
+    ("a" * ApiClient.COMPRESSION_THRESHOLD, True)])
+def test_create_secret__should__compress_large_bodies(
+        mocker, key_store, signed_payloads, content, compressed):
+    requests_ = []
+
+    def handler(method, url, headers, body):
+        requests_.append((headers, body))
+        return 201, {}, json.dumps(dict(id="1")).encode("utf-8")
+
+    mocker.patch.object(key_store, "get_private_signing_key")
+    api_client = ApiClient(key_store, InMemoryTransport(handler),
+                           content_encoding="gzip")
+    api_client.create_secret("requestor_id", content, {})
+
+    headers, body = requests_[0]
+    expected_body = dict(content=content, encryptionDetails={})
+    assert json.loads(signed_payloads[0].decode("utf-8")) == expected_body
+    assert headers["Accept-Encoding"] == "gzip, deflate"
+    if compressed:
+        assert headers["Content-Encoding"] == "gzip"
+        body = compression.decode(body, "gzip")
+    else:
+        assert "Content-Encoding" not in headers
+    assert json.loads(body.decode("utf-8")) == expected_body
+
+
+def test_create_secret__should__fall_back_when_compression_unsupported(
+        mocker, key_store, signed_payloads):
+    requests_ = []
+
+    def handler(method, url, headers, body):
+        requests_.append(headers)
+        if "Content-Encoding" in headers:
+            return 415, {}, b""
+        return 201, {}, json.dumps(dict(id="1")).encode("utf-8")
+
+    mocker.patch.object(key_store, "get_private_signing_key")
+    api_client = ApiClient(key_store, InMemoryTransport(handler),
+                           content_encoding="deflate",
+                           compression_threshold=1)
+
+    assert api_client.create_secret("requestor_id", "abc", {}) == dict(id="1")
+    assert api_client.create_secret("requestor_id", "abc", {}) == dict(id="1")
+
+    assert [h.get("Content-Encoding") for h in requests_] == \
+        ["deflate", None, None]
+    assert len(signed_payloads) == 3
+    assert api_client.content_encoding is None
+
+
+def test_api_client__should__fail_on_unsupported_content_encoding(key_store):
+    with pytest.raises(ValueError):
+        ApiClient(key_store, content_encoding="br")
@@ -0,0 +1,269 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import json
+import os
+
+import pytest
+from cryptography.exceptions import InvalidTag
+
+from covata.delta import ContentCache, LruCache, PublicKeyCache, \
+    SecretKeyCache, crypto
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(scope="function")
+def clock():
+    return Clock()
+
+
+def test_lru_eviction(clock):
+    evicted = []
+    cache = LruCache(2, clock=clock,
+                     on_evict=lambda k, v: evicted.append((k, v)))
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert evicted == [("b", 2)]
+    assert [key for key, _, _ in cache.entries()] == ["a", "c"]
+    assert cache.metrics == dict(hits=1, misses=1, hit_rate=0.5, size=2,
+                                 evictions=1, expirations=0)
+
+
+def test_lru_expiry(clock):
+    evicted = []
+    cache = LruCache(2, ttl=10, clock=clock,
+                     on_evict=lambda k, v: evicted.append(k))
+    cache.put("a", 1)
+    clock.now += 10
+    assert cache.get("a") is None
+    assert evicted == ["a"]
+    assert cache.metrics["expirations"] == 1
+    assert len(cache) == 0
+
+
+def test_lru_pop_and_clear():
+    evicted = []
+    cache = LruCache(3, on_evict=lambda k, v: evicted.append(k))
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.pop("a")
+    cache.pop("missing")
+    cache.clear()
+    assert evicted == ["a", "b"]
+    assert len(cache) == 0
+
+
+def test_public_key_cache(private_key, key2bytes, clock):
+    cache = PublicKeyCache(ttl=60, clock=clock)
+    encoded = key2bytes(private_key.public_key())
+    public_key = cache.put("identity_id", encoded)
+
+    assert public_key.public_numbers() == \
+        private_key.public_key().public_numbers()
+    assert cache.get("identity_id") is public_key
+    clock.now += 60
+    assert cache.get("identity_id") is None
+    assert cache.metrics["hit_rate"] == 0.5
+
+
+def test_public_key_cache_persists(private_key, key2bytes, temp_directory,
+                                   clock):
+    path = os.path.join(temp_directory, "public_keys.json")
+    cache = PublicKeyCache(ttl=60, path=path, save_interval=30, clock=clock)
+    cache.put("a", key2bytes(private_key.public_key()))
+    assert not os.path.exists(path)
+
+    clock.now += 30
+    cache.put("b", key2bytes(private_key.public_key()))
+    clock.now += 10
+    reloaded = PublicKeyCache(path=path, clock=clock)
+    assert reloaded.get("a") is not None
+    assert reloaded.get("b") is not None
+
+    clock.now += 20
+    assert PublicKeyCache(path=path, clock=clock).get("a") is None
+    assert PublicKeyCache(path=path, clock=clock).get("b") is not None
+
+
+def test_public_key_cache_ignores_corrupt_file(temp_directory):
+    path = os.path.join(temp_directory, "public_keys.json")
+    with open(path, "w") as f:
+        f.write("{not json")
+    cache = PublicKeyCache(path=path)
+    assert cache.metrics["size"] == 0
+
+    cache.close()
+    with open(path) as f:
+        assert f.read() == "{not json"
+    cache.clear()
+    cache.close()
+    with open(path) as f:
+        assert json.load(f) == dict(version=1, keys={})
+
+
+def test_client_skips_lookup_of_cached_recipients(delta_client, mocker):
+    assert delta_client().client.public_key_cache is None
+    delta = delta_client(public_key_cache=PublicKeyCache())
+    client = delta.client
+    alice = client.create_identity()
+    bob = client.create_identity()
+    secret = alice.create_secret(b"my secret")
+
+    get_identity = mocker.spy(delta.api_client, "get_identity")
+    for _ in range(3):
+        shared = secret.share_with(bob.id)
+        assert shared.rsa_key_owner == bob.id
+        assert shared.get_content() == b"my secret"
+    assert get_identity.call_count == 1
+    assert client.public_key_cache.metrics["hits"] == 2
+
+
+def test_secret_key_cache_zeroes_evicted_keys(clock):
+    cache = SecretKeyCache(max_entries=1, ttl=10, clock=clock)
+
+    def buffer():
+        return cache._SecretKeyCache__cache.entries()[0][1]
+
+    cache.put("identity_id", "a", "wrapped_a", b"\x01" * 32)
+    first = buffer()
+    assert cache.get("identity_id", "a", "wrapped_a") == b"\x01" * 32
+    assert cache.get("other_id", "a", "wrapped_a") is None
+    assert cache.get("identity_id", "a", "rewrapped") is None
+
+    cache.put("identity_id", "b", "wrapped_b", b"\x02" * 32)
+    second = buffer()
+    assert first == bytearray(32)
+    assert cache.get("identity_id", "a", "wrapped_a") is None
+
+    clock.now += 10
+    assert cache.get("identity_id", "b", "wrapped_b") is None
+    assert second == bytearray(32)
+
+
+def test_client_unwraps_cached_keys_once(delta_client, mocker):
+    client = delta_client(secret_key_cache=SecretKeyCache()).client
+    identity = client.create_identity()
+    secret = identity.create_secret(b"my secret")
+
+    unwrap = mocker.spy(crypto, "decrypt_with_private_key")
+    for _ in range(3):
+        assert secret.get_content() == b"my secret"
+    assert unwrap.call_count == 1
+    assert client.secret_key_cache.metrics["hits"] == 2
+
+
+def test_content_cache(temp_directory):
+    cache = ContentCache(temp_directory, max_bytes=10)
+    assert cache.get("a") is None
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    assert bytes(cache.get("a")) == b"aaaa"
+    cache.put("c", b"cccc")
+
+    assert cache.get("b") is None
+    assert bytes(cache.get("c")) == b"cccc"
+    assert cache.metrics == dict(hits=2, misses=2, hit_rate=0.5, size=2,
+                                 bytes=8, evictions=1)
+    assert len(os.listdir(temp_directory)) == 2
+
+    cache.put("big", b"x" * 11)
+    assert cache.get("big") is None
+    cache.discard("a")
+    assert cache.get("a") is None
+    assert len(os.listdir(temp_directory)) == 1
+
+
+def test_content_cache_reloads(temp_directory):
+    ContentCache(temp_directory).put("a", b"aaaa")
+    with open(os.path.join(temp_directory, "abandoned.tmp"), "wb") as f:
+        f.write(b"partial")
+
+    cache = ContentCache(temp_directory)
+    assert bytes(cache.get("a")) == b"aaaa"
+    assert cache.metrics["bytes"] == 4
+    assert len(os.listdir(temp_directory)) == 1
+
+
+def test_content_cache_tee(temp_directory):
+    cache = ContentCache(temp_directory)
+    assert list(cache.tee("a", [b"aa", b"bb"])) == [b"aa", b"bb"]
+    assert bytes(cache.get("a")) == b"aabb"
+
+    chunks = cache.tee("b", iter([b"aa", b"bb"]))
+    next(chunks)
+    chunks.close()
+    assert cache.get("b") is None
+    assert len(os.listdir(temp_directory)) == 1
+
+
+@pytest.fixture(scope="function")
+def cached_client(delta_client, temp_directory):
+    downloads = []
+
+    def on_request(method, url, headers, body):
+        if url.endswith("/content"):
+            downloads.append(url)
+
+    client = delta_client(on_request=on_request,
+                          content_cache=ContentCache(temp_directory)).client
+    return client, downloads
+
+
+def test_client_reads_cached_content(cached_client):
+    client, downloads = cached_client
+    cache = client.content_cache
+    identity = client.create_identity()
+    secret = identity.create_secret(b"my secret" * 10000)
+
+    for _ in range(2):
+        assert secret.get_content() == b"my secret" * 10000
+        output = bytearray()
+        secret.get_content_into(output)
+        assert output == b"my secret" * 10000
+    assert len(downloads) == 1
+
+    identity.delete_secret(secret.id)
+    assert cache.metrics["size"] == 0
+
+
+def test_client_streams_into_cache(cached_client):
+    client, downloads = cached_client
+    secret = client.create_identity().create_secret(b"my secret")
+
+    secret.get_content_into(bytearray())
+    assert secret.get_content() == b"my secret"
+    assert len(downloads) == 1
+
+
+def test_client_discards_corrupt_content(cached_client):
+    client, downloads = cached_client
+    cache = client.content_cache
+    secret = client.create_identity().create_secret(b"my secret")
+    cache.put(secret.id, b"x" * 32)
+
+    with pytest.raises(InvalidTag):
+        secret.get_content()
+    assert secret.get_content() == b"my secret"
+    assert len(downloads) == 1
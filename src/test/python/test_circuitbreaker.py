@@ -0,0 +1,141 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import pytest
+import requests
+
+from covata.delta import ApiClient, CircuitBreaker, CircuitBreakerRegistry, \
+    CircuitOpenError, CircuitState, InMemoryTransport
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(scope="function")
+def clock():
+    return Clock()
+
+
+@pytest.fixture(scope="function")
+def breaker(clock):
+    return CircuitBreaker("test", failure_threshold=0.5, minimum_requests=4,
+                          window=10, open_duration=30, half_open_probes=2,
+                          clock=clock)
+
+
+def complete(breaker, *outcomes):
+    for failed in outcomes:
+        breaker.acquire()
+        breaker.release(failed)
+
+
+def test_opens_on_error_rate(breaker):
+    complete(breaker, False, True, True)
+    assert breaker.state is CircuitState.closed
+
+    complete(breaker, False)
+    assert breaker.state is CircuitState.open
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.acquire()
+    assert excinfo.value.retry_after == 30
+    assert breaker.metrics == dict(state="open", requests=4, failures=2,
+                                   rejections=1)
+
+
+def test_ignores_outcomes_outside_window(breaker, clock):
+    complete(breaker, True, True, True)
+    clock.now += 11
+    complete(breaker, True)
+    assert breaker.state is CircuitState.closed
+
+
+def test_ignores_unrelated_failures(breaker):
+    complete(breaker, None, None, None, True)
+    assert breaker.state is CircuitState.closed
+
+
+def test_half_open_probes_close(breaker, clock):
+    complete(breaker, True, True, True, True)
+    clock.now += 30
+    assert breaker.state is CircuitState.half_open
+
+    breaker.acquire()
+    breaker.acquire()
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+    breaker.release(False)
+    breaker.release(False)
+
+    assert breaker.state is CircuitState.closed
+
+
+def test_half_open_probe_failure_reopens(breaker, clock):
+    complete(breaker, True, True, True, True)
+    clock.now += 30
+
+    complete(breaker, True)
+    assert breaker.state is CircuitState.open
+
+
+def test_state_change_listener(clock):
+    changes = []
+    breaker = CircuitBreaker(
+        minimum_requests=1, open_duration=1, half_open_probes=1, clock=clock,
+        on_state_change=lambda b, previous, state: changes.append(state))
+
+    complete(breaker, True)
+    clock.now += 1
+    complete(breaker, False)
+
+    assert changes == [CircuitState.open, CircuitState.half_open,
+                       CircuitState.closed]
+
+
+def test_registry():
+    registry = CircuitBreakerRegistry(minimum_requests=1)
+
+    assert registry.breaker("host", "/secrets") is \
+        registry.breaker("host", "/secrets")
+    assert registry.breaker("host", "/secrets") is not \
+        registry.breaker("host", "/events")
+    assert registry.states() == {"host/secrets": CircuitState.closed,
+                                 "host/events": CircuitState.closed}
+    assert CircuitBreakerRegistry(per_resource=False).breaker(
+        "host", "/secrets").name == "host"
+
+
+def test_api_client_fails_fast(mocker, key_store):
+    statuses = [503, 404]
+    transport = InMemoryTransport(
+        lambda *args: (statuses.pop(0), {}, b'{}'))
+    signer = mocker.patch.object(ApiClient, "signer")
+    registry = CircuitBreakerRegistry(minimum_requests=1)
+    api_client = ApiClient(key_store, transport, circuit_breakers=registry)
+
+    with pytest.raises(requests.HTTPError):
+        api_client.get_identity("requestor_id", "identity_id")
+    with pytest.raises(CircuitOpenError):
+        api_client.get_identity("requestor_id", "identity_id")
+    with pytest.raises(requests.HTTPError):
+        api_client.get_events("requestor_id")
+
+    assert signer.call_count == 2
+    assert registry.states() == {
+        "delta.covata.io/identities": CircuitState.open,
+        "delta.covata.io/events": CircuitState.closed}
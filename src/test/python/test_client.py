@@ -11,12 +11,15 @@
 #   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
-from base64 import b64encode
+import io
+import os
+import threading
+from base64 import b64decode, b64encode
 
 import pytest
 import uuid
 
-from covata.delta import Client, Event, EventDetails
+from covata.delta import ApiClient, Client, Event, EventDetails, crypto
 from datetime import datetime
 
 
@@ -28,7 +31,9 @@ def client(api_client, key_store):
 
 @pytest.fixture(scope="function")
 def api_client(mocker):
-    return mocker.MagicMock()
+    api_client = mocker.MagicMock()
+    api_client.timeout = ApiClient.DEFAULT_TIMEOUT
+    return api_client
 
 
 @pytest.fixture(scope="function")
@@ -82,7 +87,8 @@ def test_create_identity(mocker, client, api_client, key_store, private_key,
         key2bytes(private_key.public_key()),
         key2bytes(private_key.public_key()),
         ext_id,
-        metadata)
+        metadata,
+        deadline=mocker.ANY)
 
     key_store.store_keys.assert_called_with(
         identity_id=expected_id,
@@ -202,6 +208,79 @@ def test_create_secret(client, api_client, key_store, private_key, mock_crypto):
     assert secret.encryption_details.symmetric_key == mock_crypto["key"]
 
 
+def test_create_secret__without_read_after_write(
+        mocker, api_client, key_store, private_key, mock_crypto):
+    client = Client(dict(api_client=api_client, key_store=key_store,
+                         read_after_write=False))
+    key_store.get_private_encryption_key.return_value = private_key
+    api_client.create_secret.return_value = dict(id="secret_id")
+    api_client.get_secret.return_value = dict(
+        id="secret_id", created="12345", rsaKeyOwner="identity_id",
+        createdBy="identity_id", encryptionDetails=dict(
+            initialisationVector="iv", symmetricKey="key"))
+
+    secret = client.create_secret("identity_id", b"this is my secret")
+
+    assert secret.id == "secret_id"
+    assert secret.rsa_key_owner == "identity_id"
+    assert secret.created_by == "identity_id"
+    assert secret.base_secret_id is None
+    assert secret.encryption_details.initialisation_vector == \
+        b64encode(mock_crypto["iv"]).decode("utf-8")
+    assert secret.encryption_details.symmetric_key == \
+        b64encode(b"encrypted key").decode("utf-8")
+    api_client.get_secret.assert_not_called()
+
+    assert secret.created == "12345"
+    assert secret.created == "12345"
+    api_client.get_secret.assert_called_once_with(
+        "identity_id", "secret_id", deadline=mocker.ANY)
+
+
+@pytest.mark.parametrize("source", ["file", "bytes_io", "iterable"])
+def test_create_secret_from_stream(mocker, client, api_client, key_store,
+                                   private_key, temp_directory, source):
+    plaintext = b"this is my secret" * 10000
+    uploads = []
+
+    def create_secret_from_stream(requestor_id, content, encryption_details,
+                                  deadline):
+        uploads.append(b"".join(content()))
+        uploads.append(b"".join(content()))
+        uploads.append(encryption_details)
+        return dict(id="secret_id")
+
+    key_store.get_private_encryption_key.return_value = private_key
+    api_client.create_secret_from_stream.side_effect = \
+        create_secret_from_stream
+
+    if source == "file":
+        path = os.path.join(temp_directory, "secret")
+        with open(path, "wb") as f:
+            f.write(b"header" + plaintext)
+        content = open(path, "rb")
+        content.read(len(b"header"))
+    elif source == "bytes_io":
+        content = io.BytesIO(plaintext)
+    else:
+        content = (plaintext[i:i + 1000]
+                   for i in range(0, len(plaintext), 1000))
+
+    client.create_secret_from_stream("identity_id", content, chunk_size=4096)
+
+    first, second, encryption_details = uploads
+    encrypted = b64decode(first)
+    secret_key = crypto.decrypt_with_private_key(
+        b64decode(encryption_details["symmetricKey"]), private_key)
+
+    assert first == second
+    assert crypto.decrypt(
+        encrypted[:-16], encrypted[-16:], secret_key,
+        b64decode(encryption_details["initialisationVector"])) == plaintext
+    api_client.get_secret.assert_called_once_with("identity_id", "secret_id",
+                                                  deadline=mocker.ANY)
+
+
 def test_create_secret_via_identity(client, api_client, key_store,
                                     private_key, mock_crypto):
     expected_id = str(uuid.uuid4())
@@ -276,25 +355,109 @@ def test_share_secret(client, api_client, key_store, private_key, mock_crypto):
     assert secret.base_secret_id == secret_id
 
 
+def test_share_secret__should__overlap_lookup_and_download(
+        client, api_client, key_store, private_key, mock_crypto):
+    downloading = threading.Event()
+    overlapped = []
+
+    def get_identity(*args, **kwargs):
+        overlapped.append(downloading.wait(5))
+        return dict(id="recipient_id", cryptoPublicKey="crypto_public_key")
+
+    def get_secret_content(*args, **kwargs):
+        downloading.set()
+        return b64encode(b"my secret")
+
+    api_client.get_identity.side_effect = get_identity
+    api_client.get_secret_content.side_effect = get_secret_content
+    api_client.get_secret.return_value = dict(
+        id="secret_id", created="12345", rsaKeyOwner="identity_id",
+        createdBy="identity_id", encryptionDetails=dict(
+            initialisationVector=mock_crypto["iv"],
+            symmetricKey=mock_crypto["key"]))
+    api_client.share_secret.return_value = dict(id="shared_secret_id")
+    key_store.get_private_encryption_key.return_value = private_key
+
+    client.share_secret("identity_id", "recipient_id", "secret_id")
+
+    assert overlapped == [True]
+    assert api_client.share_secret.call_args[1]["rsa_key_owner_id"] == \
+        "recipient_id"
+
+
+def test_share_secret__without_read_after_write(
+        api_client, key_store, private_key, mock_crypto):
+    client = Client(dict(api_client=api_client, key_store=key_store,
+                         read_after_write=False))
+    api_client.get_identity.return_value = dict(
+        id="recipient_id", cryptoPublicKey="crypto_public_key")
+    api_client.get_secret.return_value = dict(
+        id="secret_id", created="12345", rsaKeyOwner="identity_id",
+        createdBy="identity_id", encryptionDetails=dict(
+            initialisationVector=mock_crypto["iv"],
+            symmetricKey=mock_crypto["key"]))
+    api_client.get_secret_content.return_value = b64encode(b"my secret")
+    api_client.share_secret.return_value = dict(id="shared_secret_id")
+    key_store.get_private_encryption_key.return_value = private_key
+
+    secret = client.share_secret("identity_id", "recipient_id", "secret_id")
+
+    assert secret.id == "shared_secret_id"
+    assert secret.rsa_key_owner == "recipient_id"
+    assert secret.created_by == "identity_id"
+    assert secret.base_secret_id == "secret_id"
+    api_client.get_secret.assert_called_once()
+
+
+@pytest.mark.parametrize("output", [bytearray(), io.BytesIO()])
+def test_get_secret_content_into(mocker, client, api_client, key_store,
+                                 private_key, output):
+    plaintext = b"this is my secret" * 10000
+    secret_key = crypto.generate_secret_key()
+    iv = crypto.generate_initialisation_vector()
+    cipher_text, tag = crypto.encrypt(plaintext, secret_key, iv)
+    encoded = b64encode(cipher_text + tag)
+
+    key_store.get_private_encryption_key.return_value = private_key
+    api_client.get_secret_content.return_value = \
+        [encoded[i:i + 1000] for i in range(0, len(encoded), 1000)]
+
+    written = client.get_secret_content_into(
+        "identity_id", "secret_id",
+        b64encode(crypto.encrypt_key_with_public_key(
+            secret_key, private_key.public_key())),
+        b64encode(iv),
+        output)
+
+    api_client.get_secret_content.assert_called_once_with(
+        "identity_id", "secret_id", stream=True, deadline=mocker.ANY)
+    assert written == len(plaintext)
+    assert bytes(output.getvalue() if isinstance(output, io.BytesIO)
+                 else output) == plaintext
+
+
 @pytest.mark.parametrize("identity_id", [None, str(uuid.uuid4())])
 @pytest.mark.parametrize("secret_id", [None, str(uuid.uuid4())])
-def test_delete_secret(client, api_client, identity_id, secret_id):
+def test_delete_secret(mocker, client, api_client, identity_id, secret_id):
     client.delete_secret(identity_id, secret_id)
-    api_client.delete_secret.assert_called_with(identity_id, secret_id)
+    api_client.delete_secret.assert_called_with(identity_id, secret_id,
+                                                deadline=mocker.ANY)
 
 
 @pytest.mark.parametrize("identity_id", [None, str(uuid.uuid4())])
 @pytest.mark.parametrize("secret_id", [None, str(uuid.uuid4())])
-def test_get_secret_metadata(client, api_client, identity_id, secret_id):
+def test_get_secret_metadata(mocker, client, api_client, identity_id,
+                             secret_id):
     client.get_secret_metadata(identity_id, secret_id)
-    api_client.get_secret_metadata.assert_called_with(identity_id, secret_id)
+    api_client.get_secret_metadata.assert_called_with(
+        identity_id, secret_id, deadline=mocker.ANY)
 
 
 @pytest.mark.parametrize("identity_id", [str(uuid.uuid4())])
 @pytest.mark.parametrize("secret_id", [str(uuid.uuid4())])
 @pytest.mark.parametrize("metadata", [{"a": "b"}])
-def test_add_secret_metadata(client, api_client, identity_id, secret_id,
-                             metadata):
+def test_add_secret_metadata(mocker, client, api_client, identity_id,
+                             secret_id, metadata):
     existing = {"c": "d"}
     expected = existing.copy()
     expected.update(metadata)
@@ -304,7 +467,8 @@ def test_add_secret_metadata(client, api_client, identity_id, secret_id,
         identity_id,
         secret_id,
         expected,
-        1)
+        1,
+        deadline=mocker.ANY)
 
 
 @pytest.mark.parametrize("secret_id", [None, str(uuid.uuid4())])
@@ -348,3 +512,17 @@ def test_get_events(client, api_client, secret_id, rsa_key_owner_id):
         assert r.timestamp == datetime.strptime(
             expected["timestamp"], "%Y-%m-%dT%H:%M:%S.%fZ")
         assert r.event_type == expected["type"]
+
+
+def test_close_shuts_down_own_executor(api_client, key_store):
+    with Client(dict(api_client=api_client, key_store=key_store)) as client:
+        assert client.executor.submit(lambda: 1).result() == 1
+    with pytest.raises(RuntimeError):
+        client.executor.submit(lambda: 1)
+
+
+def test_close_leaves_given_executor(mocker, api_client, key_store):
+    executor = mocker.MagicMock()
+    Client(dict(api_client=api_client, key_store=key_store,
+                executor=executor)).close()
+    assert executor.shutdown.call_count == 0
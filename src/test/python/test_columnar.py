@@ -0,0 +1,100 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import pytest
+
+from covata.delta import Event
+from covata.delta import columnar
+
+numpy = pytest.importorskip("numpy")
+
+
+def entry(i, event_type="access_success_event", base_secret_id=None):
+    return dict(
+        id="event-{}".format(i),
+        host="delta.covata.io",
+        sourceIp="10.0.0.{}".format(i % 2),
+        timestamp="2017-02-28T22:20:{:02d}.097Z".format(i),
+        type=event_type,
+        eventDetails=dict(baseSecretId=base_secret_id,
+                          requesterId="identity-{}".format(i % 3),
+                          rsaKeyOwnerId="identity-1",
+                          secretId="secret-{}".format(i % 4),
+                          secretOwnerId="identity-1"))
+
+
+def decode(columns, name, row):
+    code = columns.columns[name][row]
+    return None if code == -1 else columns.categories[name][code]
+
+
+@pytest.mark.parametrize("block_size", [1, 3, 1000])
+def test_event_columns(block_size):
+    entries = [entry(i) for i in range(10)] + [
+        entry(10, "derived_secret_created_event", base_secret_id="secret-0")]
+
+    columns = columnar.event_columns(iter(entries), block_size=block_size)
+
+    assert len(columns) == len(entries)
+    assert sorted(columns.columns) == sorted(columnar.COLUMNS)
+    assert columns.columns["timestamp"].dtype == numpy.dtype("datetime64[us]")
+    for name in columnar.CATEGORICAL_COLUMNS:
+        assert columns.columns[name].dtype == numpy.int32
+
+    for row, response in enumerate(entries):
+        event = Event.from_response(response)
+        assert columns.columns["id"][row] == event.id
+        assert columns.columns["timestamp"][row] == \
+            numpy.datetime64(event.timestamp, "us")
+        for name in ["event_type", "host", "source_ip"]:
+            assert decode(columns, name, row) == getattr(event, name)
+        for name in ["base_secret_id", "requestor_id", "rsa_key_owner_id",
+                     "secret_id", "secret_owner_id"]:
+            assert decode(columns, name, row) == \
+                getattr(event.event_details, name)
+
+
+def test_event_columns__should__code_each_distinct_value_once():
+    columns = columnar.event_columns([entry(i) for i in range(12)])
+
+    assert list(columns.categories["host"]) == ["delta.covata.io"]
+    assert len(columns.categories["requestor_id"]) == 3
+    assert len(columns.categories["secret_id"]) == 4
+    assert list(columns.columns["base_secret_id"]) == [-1] * 12
+    assert len(columns.categories["base_secret_id"]) == 0
+
+
+def test_event_columns__should__accept_no_events():
+    columns = columnar.event_columns([])
+
+    assert len(columns) == 0
+    assert columns.columns["timestamp"].dtype == numpy.dtype("datetime64[us]")
+
+
+def test_get_events_columnar(delta_client):
+    client = delta_client().client
+    alice = client.create_identity()
+    bob = client.create_identity()
+    secret = alice.create_secret(b"top secret")
+    client.share_secret(alice.id, bob.id, secret.id)
+
+    events = list(client.get_events(alice.id))
+    columns = client.get_events_columnar(alice.id)
+
+    assert len(columns) == len(events)
+    assert [decode(columns, "event_type", row)
+            for row in range(len(columns))] == \
+        [e.event_type for e in events]
+    assert list(columns.columns["timestamp"]) == \
+        [numpy.datetime64(e.timestamp, "us") for e in events]
@@ -0,0 +1,51 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import zlib
+
+import pytest
+
+from covata.delta import compression
+
+BODY = b'{"content": "' + b"QUJD" * 4096 + b'"}'
+
+
+@pytest.mark.parametrize("encoding", compression.supported_encodings())
+def test_encode_decode(encoding):
+    encoded = compression.encode(BODY, encoding)
+    assert len(encoded) < len(BODY)
+    assert compression.decode(encoded, encoding) == BODY
+
+
+def test_decode_multiple_encodings():
+    encoded = compression.encode(compression.encode(BODY, "deflate"), "gzip")
+    assert compression.decode(encoded, "deflate, gzip") == BODY
+
+
+def test_decode_raw_deflate():
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    encoded = compressor.compress(BODY) + compressor.flush()
+    assert compression.decode(encoded, "deflate") == BODY
+
+
+@pytest.mark.parametrize("content_encoding", [None, "", "identity"])
+def test_decode_identity(content_encoding):
+    assert compression.decode(BODY, content_encoding) == BODY
+
+
+def test_unsupported_encoding():
+    with pytest.raises(ValueError):
+        compression.encode(BODY, "br")
+    with pytest.raises(ValueError):
+        compression.decode(BODY, "br")
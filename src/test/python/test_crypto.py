@@ -14,6 +14,8 @@
 
 import base64
 
+import pytest
+from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import rsa
 
@@ -87,3 +89,46 @@ def test_secret_key_encrypt_decrypt(private_key):
 
     assert decrypted_secret_key == secret_key
 
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 16, 17, 4096])
+def test_decrypt_stream(chunk_size):
+    plaintext = b"0123456789" * 100
+    secret_key = b'a' * 32
+    iv = b'a' * 16
+    ciphertext, tag = crypto.encrypt(plaintext, secret_key, iv)
+
+    decrypted = crypto.decrypt_stream(
+        chunked(ciphertext + tag, chunk_size), secret_key, iv)
+
+    assert b"".join(decrypted) == plaintext
+
+
+@pytest.mark.parametrize("tamper", [
+    lambda data: data[:-1] + b"x",
+    lambda data: b"x" + data[1:],
+    lambda data: data[:10]])
+def test_decrypt_stream__should__fail_when_tampered(tamper):
+    secret_key = b'a' * 32
+    iv = b'a' * 16
+    ciphertext, tag = crypto.encrypt(b"0123456789" * 10, secret_key, iv)
+
+    with pytest.raises(InvalidTag):
+        list(crypto.decrypt_stream(
+            chunked(tamper(ciphertext + tag), 8), secret_key, iv))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 16, 4096])
+def test_encrypt_stream(chunk_size):
+    plaintext = b"0123456789" * 100
+    secret_key = b'a' * 32
+    iv = b'a' * 16
+
+    encrypted = b"".join(crypto.encrypt_stream(
+        chunked(plaintext, chunk_size), secret_key, iv))
+
+    ciphertext, tag = crypto.encrypt(plaintext, secret_key, iv)
+    assert encrypted == ciphertext + tag
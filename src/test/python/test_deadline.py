@@ -0,0 +1,171 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+from base64 import b64encode
+from concurrent.futures import Future
+
+import pytest
+
+from covata.delta import ApiClient, Client, Deadline, DeadlineExceeded, \
+    TransportResponse, crypto
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(scope="function")
+def clock():
+    return Clock()
+
+
+def test_remaining(clock):
+    deadline = Deadline(5, clock=clock)
+    clock.now += 2
+    assert deadline.expires == 5
+    assert deadline.remaining() == 3
+    assert deadline.timeout() == 3
+    assert deadline.timeout(cap=1) == 1
+    assert not deadline.expired
+
+
+def test_expired(clock):
+    deadline = Deadline(5, clock=clock)
+    clock.now += 5
+    assert deadline.expired
+    with pytest.raises(DeadlineExceeded):
+        deadline.check()
+    with pytest.raises(DeadlineExceeded):
+        deadline.timeout()
+
+
+def test_infinite():
+    deadline = Deadline(None)
+    assert deadline.remaining() is None
+    assert deadline.timeout() is None
+    assert deadline.timeout(cap=10) == 10
+    deadline.check()
+
+
+def test_of(clock):
+    deadline = Deadline(1, clock=clock)
+    assert Deadline.of(deadline, 10) is deadline
+    assert Deadline.of(None, None).expires is None
+    assert Deadline.of(None, 10).remaining() == pytest.approx(10, abs=1)
+    assert Deadline.of(2, 10).remaining() == pytest.approx(2, abs=1)
+
+
+def test_result(clock):
+    deadline = Deadline(5, clock=clock)
+    future = Future()
+    future.set_result(1)
+    assert deadline.result(future) == 1
+
+    with pytest.raises(DeadlineExceeded):
+        Deadline(0.01).result(Future())
+
+
+def test_api_client_sends_remaining_time(mocker, key_store, clock):
+    transport = mocker.MagicMock()
+    transport.send.return_value = TransportResponse(
+        201, {}, b'{"identityId": "1"}')
+    api_client = ApiClient(key_store, transport)
+
+    api_client.register_identity("encryption_key", "signing_key",
+                                 deadline=Deadline(5, clock=clock))
+    assert transport.send.call_args[1]["timeout"] == 5
+
+
+def test_api_client_default_timeout(mocker, key_store):
+    transport = mocker.MagicMock()
+    transport.send.return_value = TransportResponse(
+        201, {}, b'{"identityId": "1"}')
+    api_client = ApiClient(key_store, transport, timeout=7)
+
+    api_client.register_identity("encryption_key", "signing_key")
+    assert 0 < transport.send.call_args[1]["timeout"] <= 7
+
+
+def test_api_client_fails_before_sending(mocker, key_store, clock):
+    transport = mocker.MagicMock()
+    deadline = Deadline(5, clock=clock)
+    clock.now += 5
+    api_client = ApiClient(key_store, transport)
+
+    with pytest.raises(DeadlineExceeded):
+        api_client.get_secret("identity_id", "secret_id", deadline=deadline)
+    transport.send.assert_not_called()
+
+
+def test_share_secret_within_deadline(mocker, private_key, clock):
+    api_client = mocker.MagicMock()
+    key_store = mocker.MagicMock()
+    client = Client(dict(api_client=api_client, key_store=key_store))
+    key = b64encode(crypto.encrypt_key_with_public_key(
+        crypto.generate_secret_key(), private_key.public_key()))
+
+    api_client.get_identity.return_value = dict(
+        id="recipient_id", cryptoPublicKey="crypto_public_key")
+    api_client.get_secret.return_value = dict(
+        id="secret_id", created="12345", rsaKeyOwner="identity_id",
+        createdBy="identity_id",
+        encryptionDetails=dict(initialisationVector="iv", symmetricKey=key))
+    api_client.get_secret_content.return_value = b64encode(b"my secret")
+
+    def slow_key_load(identity_id):
+        clock.now += 10
+        return private_key
+
+    key_store.get_private_encryption_key.side_effect = slow_key_load
+
+    with pytest.raises(DeadlineExceeded):
+        client.share_secret("identity_id", "recipient_id", "secret_id",
+                            deadline=Deadline(5, clock=clock))
+    api_client.share_secret.assert_not_called()
+
+
+def test_client_keeps_requests_bounded_by_default(mocker, key_store):
+    transport = mocker.MagicMock()
+    transport.send.return_value = TransportResponse(
+        200, {}, b'{"id": "1", "cryptoPublicKey": "key"}')
+    api_client = ApiClient(key_store, transport, timeout=7)
+    mocker.patch.object(api_client, "signer", return_value=mocker.Mock())
+    client = Client(dict(api_client=api_client, key_store=key_store))
+
+    client.get_identity("identity_id", "identity_id")
+    assert client.timeout == 7
+    assert 0 < transport.send.call_args[1]["timeout"] <= 7
+
+
+def test_client_without_timeout(mocker, key_store):
+    transport = mocker.MagicMock()
+    transport.send.return_value = TransportResponse(
+        200, {}, b'{"id": "1", "cryptoPublicKey": "key"}')
+    api_client = ApiClient(key_store, transport, timeout=7)
+    mocker.patch.object(api_client, "signer", return_value=mocker.Mock())
+    client = Client(dict(api_client=api_client, key_store=key_store,
+                         timeout=None))
+
+    client.get_identity("identity_id", "identity_id")
+    assert transport.send.call_args[1]["timeout"] is None
+
+
+def test_default_clock_ignores_system_time(mocker):
+    deadline = Deadline(5)
+    mocker.patch("time.time", return_value=0.0)
+    assert deadline.remaining() == pytest.approx(5, abs=1)
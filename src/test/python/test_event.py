@@ -37,3 +37,55 @@ def event_a():
 
 def test_repr(event_a):
     assert str(event_a) == "Event(id={})".format(event_a.id)
+
+
+def test_from_response():
+    event = Event.from_response(dict(
+        eventDetails=dict(baseSecretId=None, requesterId="identity-id-a",
+                          rsaKeyOwnerId="identity-id-b",
+                          secretId="secret-id-a",
+                          secretOwnerId="secret-owner-id"),
+        host="delta.covata.io",
+        id="event-id-a",
+        sourceIp="202.54.112.42",
+        timestamp="2017-02-28T22:20:39.097Z",
+        type="access_success_event"))
+
+    assert event.timestamp_us == 1488320439097000
+    assert event.timestamp == datetime(2017, 2, 28, 22, 20, 39, 97000)
+    assert event.event_details.requestor_id == "identity-id-a"
+    assert event.event_details.base_secret_id is None
+    assert event.event_type == "access_success_event"
+    assert event.host == "delta.covata.io"
+    assert event.source_ip == "202.54.112.42"
+    assert str(event) == "Event(id=event-id-a)"
+
+
+def test_fields_decoded_on_access():
+    event = Event.from_response(dict(id="event-id-a", timestamp="invalid"))
+    assert event.id == "event-id-a"
+    with pytest.raises(ValueError):
+        event.timestamp
+
+
+def test_timestamp_us_of_datetime(event_a):
+    delta = event_a.timestamp - datetime(1970, 1, 1)
+    assert event_a.timestamp_us == int(round(delta.total_seconds() * 1e6))
+
+
+def test_event_has_no_dict(event_a):
+    assert not hasattr(event_a, "__dict__")
+    assert not hasattr(Event.from_response({}), "__dict__")
+
+
+def test_repeated_event_detail_ids_are_shared():
+    def event():
+        # built at run time, as literals are interned by the compiler
+        owner = "-".join(["identity", "id", "a"])
+        return Event.from_response(dict(eventDetails=dict(
+            requesterId=owner, rsaKeyOwnerId=owner, secretOwnerId=owner)))
+
+    first, second = event().event_details, event().event_details
+    assert first.requestor_id is second.requestor_id
+    assert first.rsa_key_owner_id is second.rsa_key_owner_id
+    assert first.secret_owner_id is second.secret_owner_id
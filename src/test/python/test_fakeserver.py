@@ -0,0 +1,227 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import random
+
+import pytest
+import requests
+
+from covata.delta import ApiClient, Client, FakeDeltaServer
+from covata.delta import fakeserver
+
+
+@pytest.fixture(scope="function")
+def sleeps():
+    return []
+
+
+@pytest.fixture(scope="function")
+def server(sleeps):
+    return FakeDeltaServer(seed=1, sleep=sleeps.append)
+
+
+@pytest.fixture(scope="function")
+def client(delta_client, server):
+    return delta_client(server).client
+
+
+def test_create_and_read_secret(client):
+    identity = client.create_identity(metadata=dict(name="alice"))
+    secret = identity.create_secret(b"top secret")
+
+    assert secret.created_by == identity.id
+    assert secret.rsa_key_owner == identity.id
+    assert secret.get_content() == b"top secret"
+    assert client.get_identity(identity.id).metadata == dict(name="alice")
+    assert [i.id for i in client.get_identities_by_metadata(
+        identity.id, dict(name="alice"))] == [identity.id]
+
+
+def test_share_secret(client):
+    alice = client.create_identity()
+    bob = client.create_identity()
+    secret = alice.create_secret(b"top secret")
+
+    derived = client.share_secret(alice.id, bob.id, secret.id)
+
+    assert derived.base_secret_id == secret.id
+    assert derived.rsa_key_owner == bob.id
+    assert derived.get_content() == b"top secret"
+    assert [e.event_type for e in client.get_events(alice.id)] == [
+        "base_secret_created_event",
+        "access_success_event",
+        "derived_secret_created_event",
+        "access_success_event"]
+
+
+def test_metadata_versioning(client):
+    identity = client.create_identity()
+    secret = identity.create_secret(b"top secret")
+
+    client.add_secret_metadata(identity.id, secret.id, 1, dict(a="1"))
+
+    assert client.get_secret_metadata(identity.id, secret.id) == \
+        (dict(a="1"), 2)
+    with pytest.raises(requests.HTTPError) as excinfo:
+        client.add_secret_metadata(identity.id, secret.id, 1, dict(b="2"))
+    assert excinfo.value.response.status == 412
+
+
+def test_forbidden_secret(client):
+    alice = client.create_identity()
+    mallory = client.create_identity()
+    secret = alice.create_secret(b"top secret")
+
+    with pytest.raises(requests.HTTPError) as excinfo:
+        client.get_secret(mallory.id, secret.id)
+    assert excinfo.value.response.status == 403
+
+
+def test_invalid_signature(client, server):
+    identity = client.create_identity()
+    response = server.handle(
+        "GET", ApiClient.DELTA_URL + "/identities/" + identity.id,
+        {"Authorization": "CVT1-RSA4096-SHA256 Identity={}, "
+                          "SignedHeaders=cvt-date, Signature=AAAA"
+                          .format(identity.id),
+         "Cvt-Date": "20170101T000000Z"}, None)
+
+    assert response.status == 401
+
+
+def test_unknown_route(server):
+    assert server.handle(
+        "GET", ApiClient.DELTA_URL + "/unknown", {}, None).status == 404
+    assert server.handle(
+        "PATCH", ApiClient.DELTA_URL + "/secrets", {}, None).status == 405
+
+
+def test_inject_error(client, server):
+    identity = client.create_identity()
+    server.inject_error(503, routes=["get_identity"], count=1)
+
+    with pytest.raises(requests.HTTPError) as excinfo:
+        client.get_identity(identity.id)
+    assert excinfo.value.response.status == 503
+    assert client.get_identity(identity.id).id == identity.id
+
+
+def test_rate_limit(delta_client):
+    client = delta_client(FakeDeltaServer(rate_limit=1, burst=2,
+                                          clock=lambda: 0)).client
+    identity = client.create_identity()
+
+    client.get_identity(identity.id)
+    client.get_identity(identity.id)
+    with pytest.raises(requests.HTTPError) as excinfo:
+        client.get_identity(identity.id)
+    assert excinfo.value.response.status == 429
+    assert excinfo.value.response.headers["retry-after"] == "1"
+
+
+def test_latency(client, server, sleeps):
+    server.set_latency(fakeserver.constant(0.25), ["get_identity"])
+    identity = client.create_identity()
+    client.get_identity(identity.id)
+
+    assert sleeps == [0.25]
+    assert server.request_counts["get_identity"] == 1
+    assert server.request_counts["register_identity"] == 1
+
+
+@pytest.mark.parametrize("latency", [
+    fakeserver.uniform(0.1, 0.2),
+    fakeserver.exponential(0.1),
+    fakeserver.lognormal(0.1, 0.5)])
+def test_latency_distributions(latency):
+    samples = [latency(random.Random(i)) for i in range(100)]
+    assert all(sample > 0 for sample in samples)
+
+
+def test_http_server(mocker, key_store, private_key):
+    mocker.patch("covata.delta.crypto.generate_private_key",
+                 return_value=private_key)
+    with FakeDeltaServer() as server:
+        api_client = ApiClient(key_store, base_url=server.start())
+        client = Client(dict(key_store=key_store, api_client=api_client))
+        identity = client.create_identity()
+
+        assert identity.create_secret_from_stream(
+            [b"top ", b"secret"] * 1000).get_content() == \
+            b"top secret" * 1000
+
+
+def test_secrets_without_read_after_write(delta_client, server):
+    client = delta_client(server, read_after_write=False).client
+    alice = client.create_identity()
+    bob = client.create_identity()
+    secret = alice.create_secret(b"top secret")
+    derived = secret.share_with(bob.id)
+    counts = dict(server.request_counts)
+
+    assert secret.get_content() == b"top secret"
+    assert derived.get_content() == b"top secret"
+    assert counts.get("get_secret", 0) == 1
+    assert derived.created == server.secrets[derived.id]["created"]
+
+
+def test_share_secret_with_many(client, server):
+    alice = client.create_identity()
+    recipients = [client.create_identity() for _ in range(5)]
+    secret = alice.create_secret(b"top secret")
+    counts = dict(server.request_counts)
+
+    results = client.share_secret_with_many(
+        alice.id, secret.id, [r.id for r in recipients] + ["unknown"],
+        max_concurrency=3)
+    shared = dict(server.request_counts)
+
+    assert [r.recipient_id for r in results] == \
+        [r.id for r in recipients] + ["unknown"]
+    for recipient, result in zip(recipients, results):
+        assert result.error is None
+        assert result.secret.base_secret_id == secret.id
+        assert result.secret.get_content() == b"top secret"
+    assert isinstance(results[-1].error, requests.HTTPError)
+    assert shared["get_secret_content"] - \
+        counts.get("get_secret_content", 0) == 1
+
+
+def test_hydrate_refs(client, mocker):
+    alice = client.create_identity(external_id="alice")
+    secrets = [alice.create_secret(b"secret") for _ in range(3)]
+    get_secret = mocker.spy(client.api_client, "get_secret")
+
+    refs = [client.secret_ref(alice.id, secret.id) for secret in secrets]
+    identity = client.identity_ref(alice.id)
+    assert client.hydrate(refs + [identity]) == refs + [identity]
+    assert get_secret.call_count == 3
+    assert [ref.rsa_key_owner for ref in refs] == [alice.id] * 3
+    assert identity.external_id == "alice"
+    assert refs[0].get_content() == b"secret"
+
+    client.hydrate(refs)
+    assert get_secret.call_count == 3
+
+
+def test_hydrate_raises_after_fetching_others(client):
+    alice = client.create_identity()
+    secret = alice.create_secret(b"secret")
+    refs = [client.secret_ref(alice.id, "missing"),
+            client.secret_ref(alice.id, secret.id)]
+
+    with pytest.raises(requests.HTTPError):
+        client.hydrate(refs)
+    assert not refs[0].hydrated
+    assert refs[1].hydrated
@@ -15,6 +15,7 @@
 import pytest
 import uuid
 from covata.delta import Identity
+from covata.delta import IdentityRef
 
 
 @pytest.fixture(scope="function")
@@ -85,3 +86,18 @@ def test_get_events(identity_a, client, secret_id, rsa_key_owner_id):
 def test_repr(identity_a, identity_b):
     assert str(identity_a) == "Identity(id={})".format(identity_a.id)
     assert str(identity_b) == "Identity(id={})".format(identity_b.id)
+
+
+def test_identity_ref_fetches_on_first_access(client, identity_b):
+    client.get_identity.return_value = identity_b
+    ref = IdentityRef(client, "id-b", requestor_id="id-a")
+
+    ref.create_secret(b"123")
+    client.create_secret.assert_called_once_with("id-b", b"123")
+    assert not ref.hydrated
+
+    assert ref.external_id == "ext-b"
+    assert ref.metadata == dict(name="b")
+    assert ref.public_encryption_key == "key-b"
+    client.get_identity.assert_called_once_with("id-a", "id-b",
+                                                deadline=None)
@@ -0,0 +1,174 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import os
+import stat
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+
+from covata.delta import Client, IdentityJournal, crypto
+
+
+class Crash(BaseException):
+    pass
+
+
+@pytest.fixture(scope="function")
+def journal(temp_directory):
+    return IdentityJournal(os.path.join(temp_directory, "journal"),
+                           "passphrase")
+
+
+@pytest.fixture(scope="function")
+def delta(mocker, delta_client):
+    # keys are generated in threads, so generation can be patched
+    mocker.patch("covata.delta.client.ProcessPoolExecutor",
+                 ThreadPoolExecutor)
+    return delta_client()
+
+
+def specs(count):
+    return [dict(external_id="device-{}".format(i),
+                 metadata=dict(fleet="a")) for i in range(count)]
+
+
+def test_journal_records(journal, private_key):
+    journal.generated(0, "device-0", private_key, private_key)
+    journal.generated(1, None, private_key, private_key)
+    journal.registered(0, "identity-0")
+    journal.stored([0])
+    journal.close()
+
+    entries = journal.load()
+    assert entries[0]["identity_id"] == "identity-0"
+    assert entries[0]["stored"]
+    assert entries[0]["public_encryption_key"] == \
+        crypto.serialize_public_key(private_key.public_key())
+    assert entries[0]["private_signing_key"] is None
+    assert entries[1]["private_signing_key"].private_numbers() == \
+        private_key.private_numbers()
+    assert entries[1]["external_id"] is None
+    assert entries[1]["identity_id"] is None
+    assert not entries[1]["stored"]
+    with open(journal.path) as f:
+        content = f.read()
+    assert "BEGIN ENCRYPTED PRIVATE KEY" in content
+    assert "BEGIN PRIVATE KEY" not in content
+
+
+def test_journal_is_private(journal, private_key):
+    journal.generated(0, "device-0", private_key, private_key)
+    journal.close()
+
+    assert stat.S_IMODE(os.stat(journal.path).st_mode) == 0o600
+
+
+def test_journal_decrypts_only_unstored_keys(journal, private_key, mocker):
+    for index in range(3):
+        journal.generated(index, None, private_key, private_key)
+    journal.stored([0, 1])
+    journal.close()
+    load = mocker.spy(serialization, "load_pem_private_key")
+
+    entries = journal.load()
+    assert load.call_count == 2
+    assert entries[2]["private_encryption_key"] is not None
+
+
+def test_journal_ignores_incomplete_record(journal, private_key):
+    journal.generated(0, "device-0", private_key, private_key)
+    journal.close()
+    with open(journal.path, "a") as f:
+        f.write('{"index": 0, "identity_')
+
+    journal.registered(0, "identity-0")
+    assert journal.load()[0]["identity_id"] == "identity-0"
+
+
+def test_create_identities(delta):
+    results = delta.client.create_identities(specs(5), workers=2,
+                                             batch_size=2)
+
+    assert [r.error for r in results] == [None] * 5
+    assert [r.identity.external_id for r in results] == \
+        ["device-{}".format(i) for i in range(5)]
+    assert delta.key_store.batches == [2, 2, 1]
+    assert sorted(delta.key_store.keys) == \
+        sorted(r.identity.id for r in results)
+    assert len(delta.server.identities) == 5
+
+
+def test_create_identities_reports_failures(delta, mocker):
+    register = delta.api_client.register_identity
+
+    def failing(encryption_key, signing_key, external_id, metadata,
+                deadline=None):
+        if external_id == "device-1":
+            raise ValueError("rejected")
+        return register(encryption_key, signing_key, external_id, metadata,
+                        deadline=deadline)
+
+    mocker.patch.object(delta.api_client, "register_identity",
+                        side_effect=failing)
+    results = delta.client.create_identities(specs(3))
+
+    assert isinstance(results[1].error, ValueError)
+    assert results[0].identity is not None
+    assert results[2].identity is not None
+
+
+def test_create_identities_resumes(delta, journal, mocker):
+    key_store = delta.key_store
+    store_keys_many = key_store.store_keys_many
+    mocker.patch.object(key_store, "store_keys_many", side_effect=Crash)
+    with pytest.raises(Crash):
+        delta.client.create_identities(specs(2), journal=journal)
+    assert len(delta.server.identities) == 2
+    assert key_store.keys == {}
+
+    key_store.store_keys_many = store_keys_many
+    results = delta.client.create_identities(specs(2), journal=journal)
+    assert [r.error for r in results] == [None] * 2
+    assert len(delta.server.identities) == 2
+    assert sorted(key_store.keys) == sorted(r.identity.id for r in results)
+
+    again = delta.client.create_identities(specs(2), journal=journal)
+    assert [r.identity.id for r in again] == [r.identity.id for r in results]
+    assert len(delta.server.identities) == 2
+
+
+def test_create_identities_resumes_after_keys_stored(delta, journal, mocker):
+    key_store = delta.key_store
+    mocker.patch.object(journal, "stored", side_effect=Crash)
+    with pytest.raises(Crash):
+        delta.client.create_identities(specs(2), journal=journal)
+    assert len(key_store.keys) == 2
+
+    mocker.stopall()
+    results = IdentityJournal(journal.path, "passphrase").load()
+    assert all(entry["identity_id"] for entry in results.values())
+    results = Client(dict(key_store=key_store,
+                          api_client=delta.api_client)) \
+        .create_identities(specs(2), journal=IdentityJournal(journal.path,
+                                                             "passphrase"))
+    assert [r.error for r in results] == [None, None]
+
+
+def test_create_identities_rejects_other_journal(delta, journal):
+    delta.client.create_identities(specs(1), journal=journal)
+    with pytest.raises(ValueError):
+        delta.client.create_identities(
+            [dict(external_id="other")], journal=journal)
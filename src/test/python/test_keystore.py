@@ -14,7 +14,7 @@
 
 import pytest
 
-from covata.delta.keystore import FileSystemKeyStore
+from covata.delta.keystore import CachingKeyStore, FileSystemKeyStore
 
 
 @pytest.fixture(scope="function")
@@ -84,3 +84,23 @@ def test_get_encryption_key__should__fail_when_id_is_invalid(
         fs_key_store.get_private_encryption_key(id)
     expected = "identity_id must be a non-empty string"
     assert expected in str(excinfo.value)
+
+
+def test_caching_key_store(mocker, private_key):
+    key_store = mocker.MagicMock()
+    key_store.get_private_signing_key.return_value = private_key
+    caching_key_store = CachingKeyStore(key_store)
+
+    assert caching_key_store.get_private_signing_key("1") is private_key
+    assert caching_key_store.get_private_signing_key("1") is private_key
+    assert key_store.get_private_signing_key.call_count == 1
+
+    caching_key_store.store_keys("2", private_key, private_key)
+    assert caching_key_store.get_private_encryption_key("2") is private_key
+    key_store.store_keys.assert_called_once_with("2", private_key,
+                                                 private_key)
+    key_store.get_private_encryption_key.assert_not_called()
+
+    caching_key_store.clear()
+    caching_key_store.get_private_signing_key("1")
+    assert key_store.get_private_signing_key.call_count == 2
@@ -0,0 +1,175 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import threading
+
+import pytest
+import requests
+
+from covata.delta import ApiClient, ConcurrencyLimiter, \
+    ConcurrencyLimitExceeded, InMemoryTransport
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(scope="function")
+def clock():
+    return Clock()
+
+
+def test_queue_timeout(clock):
+    limiter = ConcurrencyLimiter(initial_limit=1, clock=clock)
+    limiter.acquire()
+
+    with pytest.raises(ConcurrencyLimitExceeded):
+        limiter.acquire(timeout=0)
+    assert limiter.metrics == dict(limit=1, in_flight=1, queue_depth=0,
+                                   rejections=1, min_latency=None)
+
+
+def test_queue_full(clock):
+    limiter = ConcurrencyLimiter(initial_limit=1, max_queue=0, clock=clock)
+    limiter.acquire()
+
+    with pytest.raises(ConcurrencyLimitExceeded):
+        limiter.acquire()
+    assert limiter.rejections == 1
+
+
+def test_queued_request_admitted_on_release(clock):
+    limiter = ConcurrencyLimiter(initial_limit=1, clock=clock)
+    started = limiter.acquire()
+    admitted = threading.Event()
+
+    def waiter():
+        limiter.acquire()
+        admitted.set()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    while limiter.queue_depth == 0:
+        pass
+    assert not admitted.is_set()
+
+    limiter.release(started)
+    thread.join(5)
+    assert admitted.is_set()
+    assert limiter.in_flight == 1
+
+
+def test_limit_decreases_when_dropped(clock):
+    limiter = ConcurrencyLimiter(initial_limit=10, clock=clock)
+    limiter.release(limiter.acquire(), dropped=True)
+    assert limiter.limit == 9
+
+
+def test_limit_decreases_when_slow(clock):
+    limiter = ConcurrencyLimiter(initial_limit=10, clock=clock)
+    limiter.release(limiter.acquire())
+
+    started = limiter.acquire()
+    clock.now += 1
+    limiter.release(started)
+    assert limiter.limit == 9
+
+
+def test_limit_decreases_once_per_window(clock):
+    limiter = ConcurrencyLimiter(initial_limit=10, clock=clock)
+    in_flight = [limiter.acquire() for _ in range(5)]
+    clock.now += 1
+    for started in in_flight:
+        limiter.release(started, dropped=True)
+    assert limiter.limit == 9
+
+    clock.now += 1
+    limiter.release(limiter.acquire(), dropped=True)
+    assert limiter.limit == 8
+
+
+def test_limit_unchanged_when_failed_for_other_reasons(clock):
+    limiter = ConcurrencyLimiter(initial_limit=10, clock=clock)
+    limiter.release(limiter.acquire(), dropped=None)
+    assert limiter.limit == 10
+
+
+def test_limit_increases_when_saturated(clock):
+    limiter = ConcurrencyLimiter(initial_limit=2, max_limit=3, clock=clock)
+    for _ in range(20):
+        started = [limiter.acquire() for _ in range(limiter.limit)]
+        for s in started:
+            limiter.release(s)
+    assert limiter.limit == 3
+
+
+@pytest.mark.parametrize("limits", [(0, 1, 1), (2, 1, 3), (1, 4, 3)])
+def test_invalid_limits(limits):
+    min_limit, initial_limit, max_limit = limits
+    with pytest.raises(ValueError):
+        ConcurrencyLimiter(initial_limit=initial_limit, min_limit=min_limit,
+                           max_limit=max_limit)
+
+
+@pytest.mark.parametrize("status, expected_limit", [(200, 10), (503, 9)])
+def test_api_client_limited(mocker, key_store, status, expected_limit):
+    limiter = ConcurrencyLimiter(initial_limit=10)
+    release = mocker.spy(limiter, "release")
+    transport = InMemoryTransport(
+        lambda *args: (status, {}, b'{"identityId": 1}'))
+    api_client = ApiClient(key_store, transport, concurrency_limiter=limiter)
+
+    try:
+        api_client.register_identity("encryption_key", "signing_key")
+    except requests.HTTPError:
+        pass
+
+    assert release.call_args[0][1] is (status == 503)
+    assert limiter.limit == expected_limit
+    assert limiter.in_flight == 0
+
+
+def test_api_client_connection_error(key_store):
+    limiter = ConcurrencyLimiter(initial_limit=10)
+
+    def handler(*args):
+        raise requests.ConnectionError()
+
+    api_client = ApiClient(key_store, InMemoryTransport(handler),
+                           concurrency_limiter=limiter)
+    with pytest.raises(requests.ConnectionError):
+        api_client.register_identity("encryption_key", "signing_key")
+    assert limiter.limit == 9
+
+
+def test_api_client_keeps_queue_timeout_within_deadline(mocker, key_store):
+    limiter = ConcurrencyLimiter(initial_limit=1, max_limit=1,
+                                 queue_timeout=0.2)
+    acquire = mocker.spy(limiter, "acquire")
+    transport = InMemoryTransport(
+        lambda *args: (201, {}, b'{"identityId": "1"}'))
+    api_client = ApiClient(key_store, transport, concurrency_limiter=limiter)
+
+    api_client.register_identity("encryption_key", "signing_key",
+                                 deadline=30)
+    assert acquire.call_args[0][0] == 0.2
+
+    limiter.acquire()
+    with pytest.raises(ConcurrencyLimitExceeded):
+        api_client.register_identity("encryption_key", "signing_key",
+                                     deadline=30)
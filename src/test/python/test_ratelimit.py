@@ -0,0 +1,180 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import pytest
+
+from covata.delta import ApiClient, InMemoryTransport, RateLimiter, \
+    RateLimitExceeded, TokenBucket
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture(scope="function")
+def clock():
+    return Clock()
+
+
+def test_try_acquire(clock):
+    bucket = TokenBucket(2, clock=clock, sleep=clock.sleep)
+
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert bucket.wait_time() == 0.5
+
+    clock.now += 0.5
+    assert bucket.try_acquire()
+
+
+def test_refill_bounded_by_capacity(clock):
+    bucket = TokenBucket(2, capacity=3, clock=clock, sleep=clock.sleep)
+    clock.now += 100
+    assert bucket.tokens == 3
+
+
+def test_acquire_waits(clock):
+    bucket = TokenBucket(1, clock=clock, sleep=clock.sleep)
+
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 1
+    assert clock.now == 1
+
+
+def test_acquire_reserves_tokens(clock):
+    sleeps = []
+    bucket = TokenBucket(1, clock=clock, sleep=sleeps.append)
+    bucket.acquire()
+
+    bucket.acquire()
+    bucket.acquire()
+
+    assert sleeps == [1, 2]
+    assert bucket.tokens == -2
+
+
+def test_acquire_timeout(clock):
+    bucket = TokenBucket(1, clock=clock, sleep=clock.sleep)
+    bucket.acquire()
+
+    with pytest.raises(RateLimitExceeded):
+        bucket.acquire(timeout=0.5)
+    assert bucket.tokens == 0
+
+
+def test_release(clock):
+    bucket = TokenBucket(2, clock=clock, sleep=clock.sleep)
+    bucket.acquire()
+    bucket.release()
+    bucket.release()
+    assert bucket.tokens == 2
+
+
+def test_invalid_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+
+def test_rate_limiter_keys(clock):
+    limiter = RateLimiter(1, by_identity=True, by_resource=True,
+                          resource_rates={"/events": 5},
+                          clock=clock, sleep=clock.sleep)
+
+    assert limiter.bucket("a", "/secrets") is limiter.bucket("a", "/secrets")
+    assert limiter.bucket("a", "/secrets") is not \
+        limiter.bucket("b", "/secrets")
+    assert limiter.bucket("a", "/events").rate == 5
+    assert limiter.bucket("a", "/identities").rate == 1
+
+
+def test_rate_limiter_evicts_least_recently_used_bucket(clock):
+    limiter = RateLimiter(1, max_buckets=2, clock=clock, sleep=clock.sleep)
+    a = limiter.bucket("a", "/secrets")
+    b = limiter.bucket("b", "/secrets")
+    assert limiter.bucket("a", "/secrets") is a
+
+    limiter.bucket("c", "/secrets")
+    assert limiter.bucket("a", "/secrets") is a
+    assert limiter.bucket("b", "/secrets") is not b
+
+
+def test_rate_limiter_shared_bucket(clock):
+    limiter = RateLimiter(1, by_identity=False, clock=clock, sleep=clock.sleep)
+    assert limiter.bucket("a", "/secrets") is limiter.bucket("b", "/events")
+
+
+def test_rate_limiter_non_blocking(clock):
+    limiter = RateLimiter(1, blocking=False, clock=clock, sleep=clock.sleep)
+    limiter.acquire("a", "/secrets")
+
+    assert not limiter.try_acquire("a", "/secrets")
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire("a", "/secrets")
+    limiter.acquire("b", "/secrets")
+
+
+def test_api_client_rate_limited(mocker, key_store, clock):
+    limiter = RateLimiter(1, by_resource=True, blocking=False, clock=clock,
+                          sleep=clock.sleep)
+    transport = InMemoryTransport(
+        lambda *args: (200, {}, b'{"identityId": "1"}'))
+    signer = mocker.patch.object(ApiClient, "signer")
+    api_client = ApiClient(key_store, transport, rate_limiters=[limiter])
+
+    api_client.get_identity("requestor_id", "identity_id")
+    with pytest.raises(RateLimitExceeded):
+        api_client.get_identity("requestor_id", "identity_id")
+    api_client.get_events("requestor_id")
+
+    assert signer.call_count == 2
+
+
+def test_api_client_keeps_rate_limiter_timeout_within_deadline(
+        mocker, key_store, clock):
+    limiter = RateLimiter(1, timeout=0.5, clock=clock, sleep=clock.sleep)
+    transport = InMemoryTransport(
+        lambda *args: (200, {}, b'{"identityId": "1"}'))
+    mocker.patch.object(ApiClient, "signer")
+    api_client = ApiClient(key_store, transport, rate_limiters=[limiter])
+
+    api_client.get_identity("requestor_id", "identity_id", deadline=30)
+    with pytest.raises(RateLimitExceeded):
+        api_client.get_identity("requestor_id", "identity_id", deadline=30)
+
+
+def test_api_client_refunds_tokens_of_refused_requests(mocker, key_store,
+                                                       clock):
+    by_identity = RateLimiter(2, clock=clock, sleep=clock.sleep)
+    by_resource = RateLimiter(1, by_identity=False, by_resource=True,
+                              blocking=False, clock=clock, sleep=clock.sleep)
+    transport = InMemoryTransport(
+        lambda *args: (200, {}, b'{"identityId": "1"}'))
+    mocker.patch.object(ApiClient, "signer")
+    api_client = ApiClient(key_store, transport,
+                           rate_limiters=[by_identity, by_resource])
+
+    api_client.get_identity("requestor_id", "identity_id")
+    for _ in range(3):
+        with pytest.raises(RateLimitExceeded):
+            api_client.get_identity("requestor_id", "identity_id")
+    assert by_identity.bucket("requestor_id", "/identities").tokens == 1
+    assert clock.now == 0
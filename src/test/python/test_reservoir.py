@@ -0,0 +1,119 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+from concurrent.futures import Executor, Future
+
+import pytest
+
+from covata.delta import KeyReservoir
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ManualExecutor(Executor):
+    """
+    Holds submitted tasks until they are run.
+    """
+
+    def __init__(self):
+        self.tasks = []
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        self.tasks.append((future, fn, args, kwargs))
+        return future
+
+    def run(self, count=None):
+        tasks = self.tasks[:count]
+        self.tasks = self.tasks[len(tasks):]
+        for future, fn, args, kwargs in tasks:
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+
+
+@pytest.fixture(scope="function")
+def clock():
+    return Clock()
+
+
+@pytest.fixture(scope="function")
+def executor(generate_private_key):
+    return ManualExecutor()
+
+
+def test_fills_to_depth(executor, clock, private_key):
+    reservoir = KeyReservoir(depth=3, executor=executor, clock=clock)
+    assert len(executor.tasks) == 3
+    clock.now += 2
+    executor.run()
+
+    assert reservoir.metrics == dict(available=3, pending=0, depth=3,
+                                     generated=3, taken=0, misses=0,
+                                     errors=0, refill_rate=1.5)
+    key = reservoir.take()
+    assert key.private_numbers() == private_key.private_numbers()
+    assert len(executor.tasks) == 1
+
+
+def test_take_when_dry(executor, clock):
+    reservoir = KeyReservoir(depth=2, executor=executor, clock=clock)
+    assert reservoir.take() is None
+    assert reservoir.metrics["misses"] == 1
+    assert len(executor.tasks) == 2
+
+    executor.run(1)
+    assert reservoir.take() is not None
+    assert reservoir.metrics["pending"] == 2
+
+
+def test_failures_not_retried_until_take(executor, generate_private_key,
+                                         clock):
+    reservoir = KeyReservoir(depth=1, executor=executor, clock=clock)
+    generate_private_key.side_effect = ValueError
+    executor.run()
+    assert reservoir.metrics["errors"] == 1
+    assert executor.tasks == []
+
+    assert reservoir.take() is None
+    assert len(executor.tasks) == 1
+
+
+def test_close(executor, clock):
+    reservoir = KeyReservoir(depth=1, executor=executor, clock=clock)
+    executor.run()
+    reservoir.close()
+    assert reservoir.take() is None
+    assert executor.tasks == []
+
+
+def test_client_takes_keys_from_reservoir(executor, delta_client,
+                                          generate_private_key):
+    reservoir = KeyReservoir(depth=2, executor=executor)
+    executor.run()
+    client = delta_client(key_reservoir=reservoir).client
+    generate_private_key.reset_mock()
+
+    client.create_identity()
+    assert generate_private_key.call_count == 0
+    client.create_identity()
+    assert generate_private_key.call_count == 2
+    assert reservoir.metrics["taken"] == 2
@@ -0,0 +1,250 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import time
+from collections import Counter
+
+import pytest
+import requests
+import six.moves.urllib as urllib
+
+from covata.delta import ApiClient, CircuitBreakerRegistry, EndpointRouter, \
+    FakeDeltaServer, InMemoryTransport, TransportResponse
+
+EU = "https://eu.delta.example.com/v1"
+US = "https://us.delta.example.com/v1"
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(scope="function")
+def clock():
+    return Clock()
+
+
+@pytest.fixture(scope="function")
+def router(clock):
+    return EndpointRouter([EU, US], probe_ratio=0, clock=clock)
+
+
+def test_unmeasured_endpoints_first(router):
+    eu, us = router.endpoints
+    assert router.select() is eu
+    router.record(eu, 0.01, False)
+    assert router.select() is us
+
+
+def test_prefers_lowest_latency(router):
+    eu, us = router.endpoints
+    router.record(eu, 0.2, False)
+    router.record(us, 0.05, False)
+    assert router.select() is us
+    assert router.select(exclude=[us]) is eu
+    assert router.select(exclude=[eu, us]) is None
+
+
+def test_errors_penalise_latency(router):
+    eu, us = router.endpoints
+    router.record(eu, 0.05, False)
+    router.record(us, 0.06, False)
+    router.record(eu, 0.05, True)
+    assert router.select() is us
+
+
+def test_ejection(router, clock):
+    eu, us = router.endpoints
+    router.record(us, 1.0, False)
+    router.record(eu, 0.01, True)
+    router.record(eu, 0.01, True)
+    assert router.metrics[EU]["ejected"]
+    assert router.select() is us
+
+    clock.now += 30
+    assert router.select() is eu
+    router.record(eu, 0.01, True)
+    router.record(eu, 0.01, True)
+    assert eu.ejected_until == clock.now + 60
+
+
+def test_all_ejected_uses_first_due_back(router, clock):
+    eu, us = router.endpoints
+    for endpoint in (us, us, eu, eu):
+        router.record(endpoint, 0.01, True)
+        clock.now += 1
+    assert router.select() is us
+
+
+def test_unrelated_failures_ignored(router):
+    eu, _ = router.endpoints
+    router.record(eu, 0.01, None)
+    assert router.metrics[EU] == dict(latency=None, error_rate=0.0,
+                                      requests=0, failures=0, ejections=0,
+                                      ejected=False)
+
+
+def test_probes_other_endpoints(clock):
+    router = EndpointRouter([EU, US], probe_ratio=1, clock=clock)
+    eu, us = router.endpoints
+    router.record(eu, 0.01, False)
+    router.record(us, 0.5, False)
+    assert router.select() is us
+
+
+def test_base_urls_share_path():
+    with pytest.raises(ValueError):
+        EndpointRouter([EU, "https://us.delta.example.com/v2"])
+
+
+@pytest.fixture(scope="function")
+def regions(mocker, private_key):
+    """
+    One fake server behind two hosts, so identities are shared between them,
+    with per-host latency and errors.
+    """
+    server = FakeDeltaServer()
+    latency = {"eu.delta.example.com": 0.0, "us.delta.example.com": 0.0}
+    down = set()
+    requests_by_host = Counter()
+
+    def handler(method, url, headers, body):
+        host = urllib.parse.urlparse(url).netloc
+        requests_by_host[host] += 1
+        if host in down:
+            return TransportResponse(503, {}, b"")
+        time.sleep(latency[host])
+        return server.handle(method, url, headers, body)
+
+    key_store = mocker.MagicMock()
+    key_store.get_private_signing_key.return_value = private_key
+    return dict(key_store=key_store, transport=InMemoryTransport(handler),
+                latency=latency, down=down, requests=requests_by_host)
+
+
+def register(api_client, key2bytes, private_key):
+    public_key = key2bytes(private_key.public_key())
+    return api_client.register_identity(public_key, public_key)
+
+
+def test_api_client_prefers_fastest(regions, key2bytes, private_key):
+    regions["latency"]["eu.delta.example.com"] = 0.02
+    api_client = ApiClient(regions["key_store"], regions["transport"],
+                           endpoint_router=EndpointRouter([EU, US],
+                                                          probe_ratio=0))
+    identity_id = register(api_client, key2bytes, private_key)
+    for _ in range(10):
+        api_client.get_identity(identity_id, identity_id)
+
+    assert regions["requests"]["eu.delta.example.com"] == 1
+    assert regions["requests"]["us.delta.example.com"] == 10
+
+
+def test_api_client_fails_over(regions, key2bytes, private_key):
+    router = EndpointRouter([EU, US], probe_ratio=0)
+    api_client = ApiClient(regions["key_store"], regions["transport"],
+                           endpoint_router=router)
+    identity_id = register(api_client, key2bytes, private_key)
+    router.record(router.endpoints[1], 1.0, False)
+    regions["down"].add("eu.delta.example.com")
+
+    for _ in range(5):
+        api_client.get_identity(identity_id, identity_id)
+    assert router.metrics[EU]["ejected"]
+    assert regions["requests"]["eu.delta.example.com"] == 3
+    assert regions["requests"]["us.delta.example.com"] == 5
+
+
+def test_api_client_does_not_repeat_posts(regions):
+    regions["down"].add("eu.delta.example.com")
+    api_client = ApiClient(regions["key_store"], regions["transport"],
+                           endpoint_router=EndpointRouter([EU, US],
+                                                          probe_ratio=0))
+    with pytest.raises(requests.HTTPError):
+        api_client.register_identity("encryption_key", "signing_key")
+    assert regions["requests"]["us.delta.example.com"] == 0
+
+
+def test_api_client_fails_over_connection_errors(private_key, mocker):
+    hosts = []
+
+    def handler(method, url, headers, body):
+        hosts.append(urllib.parse.urlparse(url).netloc)
+        if len(hosts) == 1:
+            raise requests.ConnectTimeout()
+        return TransportResponse(201, {}, b'{"identityId": "1"}')
+
+    api_client = ApiClient(mocker.MagicMock(), InMemoryTransport(handler),
+                           endpoint_router=EndpointRouter([EU, US],
+                                                          probe_ratio=0))
+    assert api_client.register_identity("encryption_key",
+                                        "signing_key") == "1"
+    assert hosts == ["eu.delta.example.com", "us.delta.example.com"]
+
+
+def test_api_client_fails_over_streamed_bodies(private_key, mocker):
+    bodies = []
+
+    def handler(method, url, headers, body):
+        bodies.append(next(body))
+        if len(bodies) == 1:
+            raise requests.ConnectTimeout()
+        bodies[-1] += b"".join(body)
+        return TransportResponse(201, {}, b'{"id": "1"}')
+
+    key_store = mocker.MagicMock()
+    key_store.get_private_signing_key.return_value = private_key
+    api_client = ApiClient(key_store, InMemoryTransport(handler),
+                           endpoint_router=EndpointRouter([EU, US],
+                                                          probe_ratio=0))
+    assert api_client.create_secret_from_stream(
+        "requestor_id", lambda: iter([b"MTIz", b"NDU2"]),
+        dict(symmetricKey="1234", initialisationVector="1312")) == \
+        dict(id="1")
+    assert bodies[1].startswith(b'{"content":"MTIzNDU2"')
+
+
+def test_api_client_skips_open_circuits(regions, key2bytes, private_key):
+    breakers = CircuitBreakerRegistry(minimum_requests=1)
+    router = EndpointRouter([EU, US], probe_ratio=0)
+    api_client = ApiClient(regions["key_store"], regions["transport"],
+                           endpoint_router=router, circuit_breakers=breakers)
+    identity_id = register(api_client, key2bytes, private_key)
+    router.record(router.endpoints[1], 1.0, False)
+    breakers.breaker("eu.delta.example.com", ApiClient.RESOURCE_IDENTITIES) \
+        .release(True)
+
+    api_client.get_identity(identity_id, identity_id)
+    assert regions["requests"]["eu.delta.example.com"] == 1
+    assert regions["requests"]["us.delta.example.com"] == 1
+
+
+def test_api_client_records_only_transport_latency(mocker):
+    def slow_signer(identity_id):
+        time.sleep(0.2)
+        return mocker.Mock()
+
+    router = EndpointRouter([EU], probe_ratio=0)
+    transport = InMemoryTransport(
+        lambda *args: TransportResponse(200, {}, b'{"id": "1"}'))
+    api_client = ApiClient(mocker.MagicMock(), transport,
+                           endpoint_router=router)
+    mocker.patch.object(api_client, "signer", side_effect=slow_signer)
+
+    api_client.get_identity("requestor_id", "identity_id")
+    assert router.endpoints[0].latency < 0.1
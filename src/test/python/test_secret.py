@@ -16,6 +16,8 @@ import pytest
 from covata.delta import Identity
 from covata.delta import Secret
 from covata.delta import EncryptionDetails
+from covata.delta import SecretRef
+from covata.delta import IdentityRef
 
 
 @pytest.fixture(scope="function")
@@ -63,6 +65,17 @@ def test_get_content(secret, client):
         secret.encryption_details.initialisation_vector)
 
 
+def test_get_content_into(secret, client):
+    output = bytearray()
+    secret.get_content_into(output)
+    client.get_secret_content_into.assert_called_with(
+        secret.rsa_key_owner,
+        secret.id,
+        secret.encryption_details.symmetric_key,
+        secret.encryption_details.initialisation_vector,
+        output)
+
+
 def test_share_with(secret, identity_b, client):
     secret.share_with(identity_b.id)
     client.share_secret.assert_called_with(secret.created_by,
@@ -70,6 +83,14 @@ def test_share_with(secret, identity_b, client):
                                            secret.id)
 
 
+def test_share_with_many(secret, identity_b, client):
+    secret.share_with_many([identity_b.id], max_concurrency=4)
+    client.share_secret_with_many.assert_called_with(secret.created_by,
+                                                     secret.id,
+                                                     [identity_b.id],
+                                                     4)
+
+
 def test_get_metadata(secret, client):
     client.get_secret_metadata.return_value = {}, 1
     secret.get_metadata()
@@ -86,3 +107,50 @@ def test_get_events(secret, rsa_key_owner_id, client):
 
 def test_repr(secret):
     assert str(secret) == "Secret(id={})".format(secret.id)
+
+
+def test_secret_ref_fetches_on_first_access(client):
+    secret = Secret(client, "secret_id", "created", "owner_id",
+                    "creator_id", EncryptionDetails("key", "iv"), "base_id")
+    client.get_secret.return_value = secret
+    client.get_secret_metadata.return_value = (dict(a="b"), 1)
+    ref = SecretRef(client, "identity_id", "secret_id")
+
+    ref.share_with("recipient_id")
+    client.share_secret.assert_called_once_with(
+        "identity_id", "recipient_id", "secret_id")
+    assert ref.get_metadata() == dict(a="b")
+    client.get_secret_metadata.assert_called_once_with("identity_id",
+                                                       "secret_id")
+    assert not ref.hydrated
+    client.get_secret.assert_not_called()
+
+    assert ref.rsa_key_owner == "owner_id"
+    assert ref.created_by == "creator_id"
+    assert ref.base_secret_id == "base_id"
+    assert ref.hydrated
+    client.get_secret.assert_called_once_with("identity_id", "secret_id",
+                                              deadline=None)
+
+
+def test_domain_objects_have_no_dict(client, identity_a, secret):
+    for instance in [identity_a, secret, secret.encryption_details,
+                     SecretRef(client, "id-a", "id-1"),
+                     IdentityRef(client, "id-a")]:
+        assert not hasattr(instance, "__dict__")
+
+
+def test_repeated_ids_are_shared(client):
+    def secret():
+        # built at run time, as literals are interned by the compiler
+        owner = "-".join(["id", "a"])
+        return Secret(client, id="id-1", created="123", rsa_key_owner=owner,
+                      created_by=owner, base_secret_id=owner,
+                      encryption_details=EncryptionDetails(
+                          symmetric_key="sym-a",
+                          initialisation_vector="iv-a"))
+
+    first, second = secret(), secret()
+    assert first.rsa_key_owner is second.rsa_key_owner
+    assert first.created_by is second.created_by
+    assert first.base_secret_id is second.base_secret_id
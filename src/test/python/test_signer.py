@@ -18,6 +18,7 @@ import json
 import re
 from datetime import datetime
 from freezegun import freeze_time
+from cryptography.exceptions import InvalidSignature
 
 SIGNING_ALGORITHM = "CVT1-RSA4096-SHA256"
 CVT_DATE_FORMAT = "%Y%m%dT%H%M%SZ"
@@ -169,3 +170,36 @@ def test_updated_headers(private_key):
 
     assert "Authorization" in updated_headers
     assert re.match(auth_pattern, updated_headers["Authorization"]) is not None
+
+
+@freeze_time()
+def test_signature_material_with_hashed_payload():
+    url = "https://delta.covata.io/v1/secrets"
+    payload = b'{"content": "abc", "encryptionDetails": {}}'
+    hashed_payload = signer.__get_hashed_payload(payload)
+
+    materials = signer.__get_signature_materials(
+        "POST", url, {}, iter([payload]), hashed_payload)
+
+    assert materials.hashed_payload == hashed_payload
+    assert materials.canonical_request == signer.__get_signature_materials(
+        "POST", url, {}, payload).canonical_request
+
+
+def test_verify_signature(private_key):
+    url = "https://delta.covata.io/v1/secrets?baseSecret=false"
+    payload = b'{"content": "abc"}'
+    headers = signer.get_updated_headers(
+        "identity_id", "POST", url, {"Content-Type": "application/json"},
+        payload, private_key)
+    headers["Content-Length"] = "18"
+
+    assert signer.verify_signature(
+        "POST", url, headers, payload, private_key.public_key()) == \
+        "identity_id"
+    with pytest.raises(InvalidSignature):
+        signer.verify_signature("POST", url, headers, b'{"content": "xyz"}',
+                                private_key.public_key())
+    with pytest.raises(InvalidSignature):
+        signer.verify_signature("POST", url, {}, payload,
+                                private_key.public_key())
@@ -0,0 +1,233 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+import responses
+
+from covata.delta import ApiClient, CachingKeyStore, FakeDeltaServer, \
+    Http2Adapter, InMemoryTransport, RequestsTransport, TransportResponse
+
+
+@pytest.fixture(scope="function")
+def received():
+    return []
+
+
+@pytest.fixture(scope="function")
+def http2_session(received):
+    httpx = pytest.importorskip("httpx")
+
+    def handler(request):
+        received.append(request)
+        if request.url.path.endswith("/fail"):
+            raise httpx.ConnectError("connection refused", request=request)
+        if request.url.path.endswith("/events"):
+            return httpx.Response(200, content=iter(
+                [b"[", b", ".join([b'{"id": "1"}'] * 10000), b"]"]))
+        return httpx.Response(200,
+                              headers={"ETag": "3"},
+                              json=dict(identityId="identity_id"))
+
+    session = requests.Session()
+    session.mount("https://", Http2Adapter(
+        client=httpx.Client(transport=httpx.MockTransport(handler))))
+    return session
+
+
+@responses.activate
+def test_requests_transport_send():
+    responses.add(responses.PUT, "https://test.com/v1/secrets",
+                  status=201, json=dict(id="1"), headers={"ETag": "2"})
+
+    response = RequestsTransport().send("PUT", "https://test.com/v1/secrets",
+                                        {"if-match": "1"}, b'{"a": "b"}')
+
+    assert response.status == 201
+    assert response.headers["etag"] == "2"
+    assert response.json() == dict(id="1")
+    assert responses.calls[0].request.headers["if-match"] == "1"
+    assert responses.calls[0].request.body == b'{"a": "b"}'
+
+
+def test_in_memory_transport_send():
+    calls = []
+
+    def handler(method, url, headers, body):
+        calls.append((method, url, headers, body))
+        return 200, {"Content-Type": "text/plain"}, b"content"
+
+    response = InMemoryTransport(handler).send(
+        "GET", "https://test.com/v1/secrets/1/content", {"a": "b"}, None)
+
+    assert calls == [("GET", "https://test.com/v1/secrets/1/content",
+                      {"a": "b"}, None)]
+    assert response.status == 200
+    assert response.headers == {"content-type": "text/plain"}
+    assert response.text == "content"
+
+
+@pytest.mark.parametrize("status", [400, 404, 500])
+def test_raise_for_status(status):
+    with pytest.raises(requests.HTTPError) as excinfo:
+        TransportResponse(status, {}, b"").raise_for_status()
+    assert excinfo.value.response.status == status
+
+
+def test_api_client_signs_requests(key_store, private_key):
+    calls = []
+
+    def handler(method, url, headers, body):
+        calls.append((method, url, headers, body))
+        return 200, {}, json.dumps([]).encode("utf-8")
+
+    key_store.store_keys("requestor_id", private_key, private_key)
+    api_client = ApiClient(key_store, InMemoryTransport(handler))
+
+    api_client.get_secrets("requestor_id", created_by="creator_id")
+
+    method, url, headers, body = calls[0]
+    assert method == "GET"
+    assert url == ApiClient.DELTA_URL + "/secrets?createdBy=creator_id"
+    assert headers["Authorization"].startswith(
+        "CVT1-RSA4096-SHA256 Identity=requestor_id, ")
+    assert "Cvt-Date" in headers
+    assert body is None
+
+
+def test_http2_adapter_send(http2_session, received):
+    response = http2_session.post("https://test.com/v1/identities",
+                                  json=dict(name="Bob"),
+                                  timeout=(1, 2))
+
+    assert response.status_code == 200
+    assert response.headers["etag"] == "3"
+    assert response.json() == dict(identityId="identity_id")
+
+    assert len(received) == 1
+    assert received[0].method == "POST"
+    assert json.loads(received[0].content.decode("utf-8")) == dict(name="Bob")
+    assert received[0].headers["content-type"] == "application/json"
+
+
+def test_http2_adapter_send__should__raise_requests_exception(http2_session):
+    with pytest.raises(requests.ConnectionError):
+        http2_session.get("https://test.com/v1/fail")
+
+
+def test_api_client_with_http2_session(http2_session, received):
+    api_client = ApiClient(None, RequestsTransport(http2_session))
+    identity_id = api_client.register_identity("encryption", "signing")
+
+    assert identity_id == "identity_id"
+    assert len(received) == 1
+
+
+def test_http2_adapter_stream(http2_session):
+    response = RequestsTransport(http2_session).stream(
+        "GET", "https://test.com/v1/events", {}, None)
+    chunks = list(response.iter_content())
+
+    assert response.status == 200
+    assert len(chunks) > 1
+    assert json.loads(b"".join(chunks).decode("utf-8")) == \
+        [dict(id="1")] * 10000
+
+
+def test_api_client_streams_with_http2_session(mocker, http2_session):
+    api_client = ApiClient(None, RequestsTransport(http2_session))
+    mocker.patch.object(api_client, "signer", return_value=mocker.Mock())
+
+    events = api_client.get_events("requestor_id", stream=True)
+
+    assert list(events) == [dict(id="1")] * 10000
+
+
+@responses.activate
+def test_requests_transport_stream():
+    responses.add(responses.GET, "https://test.com/v1/secrets/1/content",
+                  body=b"a" * 100000)
+
+    response = RequestsTransport().stream(
+        "GET", "https://test.com/v1/secrets/1/content", {}, None)
+    chunks = list(response.iter_content())
+
+    assert response.status == 200
+    assert len(chunks) > 1
+    assert b"".join(chunks) == b"a" * 100000
+
+
+def test_in_memory_transport_stream():
+    response = InMemoryTransport(
+        lambda method, url, headers, body: (200, {}, b"a" * 100000)) \
+        .stream("GET", "https://test.com/v1/secrets/1/content", {}, None)
+
+    assert b"".join(response.iter_content()) == b"a" * 100000
+
+
+def test_requests_transport_warm_up():
+    with FakeDeltaServer() as server:
+        url = server.start()
+        transport = RequestsTransport()
+
+        assert transport.warm_up(url, connections=3) == 3
+        transport.send("GET", url + "/identities/1", {}, None)
+
+        pools = transport.session.get_adapter(url).poolmanager.pools
+        assert [pools[key].num_connections for key in pools.keys()] == [3]
+
+
+def test_requests_transport_warm_up__should__count_failed_connections():
+    with FakeDeltaServer() as server:
+        url = server.start()
+    assert RequestsTransport().warm_up(url, connections=2, timeout=1) == 0
+
+
+def test_api_client_warm_up(mocker, private_key):
+    key_store = mocker.MagicMock()
+    key_store.get_private_signing_key.return_value = private_key
+    key_store.get_private_encryption_key.return_value = private_key
+    transport = mocker.MagicMock()
+    transport.warm_up.return_value = 2
+    api_client = ApiClient(
+        CachingKeyStore(key_store), transport,
+        base_url=["https://eu.test.com/v1", "https://us.test.com/v1"])
+
+    report = api_client.warm_up(connections=2, identity_ids=["1", "2"])
+
+    assert report["connections"] == 4
+    assert report["identities"] == 2
+    assert report["seconds"] >= 0
+    transport.warm_up.assert_any_call("https://us.test.com/v1", 2,
+                                      mocker.ANY)
+    api_client.key_store.get_private_signing_key("1")
+    assert key_store.get_private_signing_key.call_count == 2
+
+
+def test_api_client_warm_up__should__bound_its_threads(mocker):
+    key_store = mocker.MagicMock()
+    transport = mocker.MagicMock()
+    transport.warm_up.return_value = 1
+    executor = mocker.patch("covata.delta.apiclient.ThreadPoolExecutor",
+                            wraps=ThreadPoolExecutor)
+    api_client = ApiClient(key_store, transport)
+
+    report = api_client.warm_up(
+        identity_ids=[str(i) for i in range(100)], max_workers=4)
+
+    assert report["identities"] == 100
+    assert executor.call_args[1]["max_workers"] == 4
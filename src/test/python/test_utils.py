@@ -0,0 +1,120 @@
+#   Copyright 2017 Covata Limited or its affiliates
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import json
+from base64 import b64encode
+from datetime import datetime
+
+import pytest
+
+from covata.delta import utils
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 4, 1000])
+@pytest.mark.parametrize("length", [0, 1, 2, 3, 100])
+def test_b64encode_stream(chunk_size, length):
+    data = bytes(bytearray(range(length)))
+    chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+
+    assert b"".join(utils.b64encode_stream(chunks)) == b64encode(data)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 4, 5, 1000])
+@pytest.mark.parametrize("length", [0, 1, 2, 3, 100])
+def test_b64decode_stream(chunk_size, length):
+    data = bytes(bytearray(range(length)))
+    encoded = b64encode(data)
+    chunks = [encoded[i:i + chunk_size]
+              for i in range(0, len(encoded), chunk_size)]
+
+    assert b"".join(utils.b64decode_stream(chunks)) == data
+
+
+def test_b64decode_stream__should__accept_text_and_whitespace():
+    chunks = [u"aGVs", u"bG8g\n", b"d29y", b"bGQ=\r\n"]
+    assert b"".join(utils.b64decode_stream(chunks)) == b"hello world"
+
+
+@pytest.mark.parametrize("value", [
+    "2017-02-28T22:20:39.097Z",
+    "2017-02-28T22:20:39.1Z",
+    "2016-02-29T00:00:00.123456Z",
+    "1969-12-31T23:59:59.5Z",
+])
+def test_parse_timestamp(value):
+    expected = datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%fZ")
+    assert utils.timestamp_to_datetime(utils.parse_timestamp(value)) == \
+        expected
+
+
+def test_parse_timestamp_without_fraction():
+    assert utils.parse_timestamp("1970-01-01T00:01:00Z") == 60000000
+
+
+@pytest.mark.parametrize("value", [
+    "2017-02-29T22:20:39.097Z",
+    "2017-02-28 22:20:39.097Z",
+    "2017-02-28T24:20:39.097Z",
+    "2017-02-28T22:20:39.1234567Z",
+    "2017-02-28T22:20:39.Z",
+    "2017-02-28T22:20:39.097",
+])
+def test_parse_timestamp_rejects_other_formats(value):
+    with pytest.raises(ValueError):
+        utils.parse_timestamp(value)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 4096])
+def test_iter_json_array(chunk_size):
+    elements = [dict(id=str(i), name=u"é" * i, values=[1.5, -2e10, None])
+                for i in range(20)] + [12345, u"x", [], {}, True]
+    encoded = json.dumps(elements, ensure_ascii=False).encode("utf-8")
+    chunks = [encoded[i:i + chunk_size]
+              for i in range(0, len(encoded), chunk_size)]
+
+    assert list(utils.iter_json_array(chunks)) == elements
+
+
+def test_iter_json_array__should__yield_before_the_end_arrives():
+    def chunks():
+        yield b' [{"id": "1"}, '
+        raise AssertionError("read past the first element")
+
+    assert next(utils.iter_json_array(chunks())) == dict(id="1")
+
+
+@pytest.mark.parametrize("chunks", [
+    [b"[]"], [b" [ ", b"\n]\r\n"], [u"[1, ", u"2]"]
+])
+def test_iter_json_array__should__accept_whitespace_and_text(chunks):
+    assert list(utils.iter_json_array(chunks)) == \
+        json.loads(b"".join(c if isinstance(c, bytes) else c.encode("utf-8")
+                            for c in chunks).decode("utf-8"))
+
+
+@pytest.mark.parametrize("encoded", [
+    b"", b"{}", b"[1", b"[1,]", b"[,1]", b"[1 2]", b"[1.]", b"[1] x",
+])
+def test_iter_json_array__should__fail_when_not_an_array(encoded):
+    with pytest.raises(ValueError):
+        list(utils.iter_json_array([encoded]))
+
+
+def test_intern_id():
+    # built at run time, as literals are interned by the compiler
+    first, second = ("-".join(["identity", "a"]) for _ in range(2))
+    assert first is not second
+
+    assert utils.intern_id(first) is utils.intern_id(second)
+    assert utils.intern_id(None) is None